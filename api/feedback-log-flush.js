@@ -0,0 +1,30 @@
+import { flushFeedbackLog, getFeedbackLog } from './utils/feedback-log.js';
+
+// Flushes the buffered feedback log (FEEDBACK_LOG_MODE=segments) into segments,
+// so records from quiet periods do not wait for the next submission.
+// Called by the Vercel cron in vercel.json, which sends CRON_SECRET as a bearer token.
+export default async function handler(req, res) {
+  if (req.method !== 'GET') return res.status(405).json({ error: 'Method Not Allowed' });
+
+  const secret = process.env.CRON_SECRET;
+  if (!secret || req.headers.authorization !== `Bearer ${secret}`) {
+    return res.status(401).json({ error: 'Unauthorized' });
+  }
+
+  const redis = getFeedbackLog();
+  if (!redis) {
+    return res.status(200).json({ message: 'Feedback log not enabled', segments: [] });
+  }
+
+  try {
+    const segments = [];
+    // Drain the buffer one segment at a time
+    for (let segment = await flushFeedbackLog(redis, { force: true }); segment; segment = await flushFeedbackLog(redis, { force: true })) {
+      segments.push(segment);
+    }
+    return res.status(200).json({ message: `Flushed ${segments.length} segments`, segments });
+  } catch (error) {
+    console.error('[FeedbackLog] Cron flush failed:', error);
+    return res.status(503).json({ error: 'Feedback log flush failed' });
+  }
+}
@@ -2,11 +2,61 @@ import { put } from '@vercel/blob';
 import { v4 as uuidv4 } from 'uuid';
 import { handleCorsPreflightAndValidate } from './utils/cors.js';
 import { checkFeedbackRateLimit, getClientIp, setRateLimitHeaders } from './utils/ratelimit.js';
+import {
+  AudioUploadError, MAX_AUDIO_BYTES, isStreamingUpload, openMultipartUpload, streamAudioToBlob
+} from './utils/audio-upload.js';
+import { appendFeedbackRecord, getFeedbackLog } from './utils/feedback-log.js';
+
+/**
+ * Validates the feedback fields shared by JSON and streaming submissions.
+ * @returns {string|null} Error message, or null when valid
+ */
+function validateFeedbackFields({ freesound_urls, ratings, result_contexts }) {
+  // Validate required fields
+  if (!freesound_urls || !ratings) {
+    return 'Missing required fields: freesound_urls, ratings';
+  }
+
+  // Check if both are arrays
+  if (!Array.isArray(freesound_urls) || !Array.isArray(ratings)) {
+    return 'freesound_urls and ratings must be arrays';
+  }
+
+  // Check if arrays have the same length
+  if (freesound_urls.length !== ratings.length) {
+    return 'freesound_urls and ratings arrays must have the same length';
+  }
+
+  if (result_contexts !== undefined) {
+    if (!Array.isArray(result_contexts)) {
+      return 'result_contexts must be an array when provided';
+    }
+
+    if (result_contexts.length !== ratings.length) {
+      return 'result_contexts and ratings arrays must have the same length';
+    }
+
+    for (const context of result_contexts) {
+      if (context !== null && (typeof context !== 'object' || Array.isArray(context))) {
+        return 'Each result_contexts entry must be an object or null';
+      }
+    }
+  }
+
+  // Validate rating values (like, dislike, or null only)
+  for (const rating of ratings) {
+    if (rating !== null && rating !== 'like' && rating !== 'dislike') {
+      return 'Each rating must be either "like", "dislike", or null';
+    }
+  }
+  return null;
+}
 
 export default async function handler(req, res) {
   // SECURITY: Validate origin and set CORS headers
   const corsHandled = handleCorsPreflightAndValidate(req, res, {
     methods: 'POST,OPTIONS',
+    headers: 'Content-Type, Authorization, X-Requested-With',
   });
   if (corsHandled) return; // Either preflight response sent or origin blocked
   
@@ -26,55 +76,45 @@ export default async function handler(req, res) {
       });
     }
 
-    const { audioQuery, audioId, freesound_urls, ratings, result_contexts } = req.body;
-
-    // Validate required fields (either audioQuery OR audioId must be provided)
-    if (!freesound_urls || !ratings) {
-      return res.status(400).json({ error: 'Missing required fields: freesound_urls, ratings' });
-    }
-    
-    if (!audioQuery && !audioId) {
-      return res.status(400).json({ error: 'Either audioQuery or audioId must be provided' });
-    }
-
-    // Check if both are arrays
-    if (!Array.isArray(freesound_urls) || !Array.isArray(ratings)) {
-      return res.status(400).json({ error: 'freesound_urls and ratings must be arrays' });
-    }
-
-    // Check if arrays have the same length
-    if (freesound_urls.length !== ratings.length) {
-      return res.status(400).json({ error: 'freesound_urls and ratings arrays must have the same length' });
+    // Streaming uploads are multipart: a metadata part with the fields, then the audio part.
+    // req.body must not be touched for them, as reading it would buffer the whole stream
+    const upload = isStreamingUpload(req) ? await openMultipartUpload(req) : null;
+    const streaming = !!upload;
+    const { audioQuery, audioId, freesound_urls, ratings, result_contexts } = streaming
+      ? upload.fields
+      : req.body;
+
+    const validationError = validateFeedbackFields({ freesound_urls, ratings, result_contexts });
+    if (validationError) {
+      upload?.discard();
+      return res.status(400).json({ error: validationError });
     }
 
-    if (result_contexts !== undefined) {
-      if (!Array.isArray(result_contexts)) {
-        return res.status(400).json({ error: 'result_contexts must be an array when provided' });
-      }
-
-      if (result_contexts.length !== ratings.length) {
-        return res.status(400).json({ error: 'result_contexts and ratings arrays must have the same length' });
-      }
-
-      for (const context of result_contexts) {
-        if (context !== null && (typeof context !== 'object' || Array.isArray(context))) {
-          return res.status(400).json({ error: 'Each result_contexts entry must be an object or null' });
-        }
-      }
+    // Either audioQuery (or a streamed body) OR audioId must be provided
+    if (streaming && audioId) {
+      upload.discard();
+      return res.status(400).json({ error: 'Updates by audioId are sent as JSON without audio' });
     }
-
-    // Validate rating values (like, dislike, or null only)
-    for (const rating of ratings) {
-      if (rating !== null && rating !== 'like' && rating !== 'dislike') {
-        return res.status(400).json({ error: 'Each rating must be either "like", "dislike", or null' });
-      }
+    if (!streaming && !audioQuery && !audioId) {
+      return res.status(400).json({ error: 'Either audioQuery or audioId must be provided' });
     }
 
     let uniqueId;
     let blobAudioUrl;
     
-    // Handle update scenario (audioId provided)
-    if (audioId) {
+    if (streaming) {
+      // The audio MIME type was validated with the part headers; size is enforced while streaming
+      const { contentType } = upload;
+      uniqueId = uuidv4();
+      const audioFileName = `feedback-audio-${uniqueId}.webm`;
+
+      console.log(`[Feedback] Streaming audio upload: ${audioFileName}, type: ${contentType}`);
+      const stored = await streamAudioToBlob(upload, { fileName: audioFileName, contentType });
+      blobAudioUrl = stored.url;
+
+      console.log(`[Feedback] Successfully uploaded ${(stored.bytes / 1024).toFixed(2)}KB of audio to: ${blobAudioUrl}`);
+    } else if (audioId) {
+      // Handle update scenario (audioId provided)
       console.log(`[Feedback] Update request for audioId: ${audioId}`);
       uniqueId = audioId;
       // We don't have the audio URL stored, but we can construct a placeholder
@@ -104,9 +144,7 @@ export default async function handler(req, res) {
 
       // SECURITY: Check file size (limit to 10MB)
       const sizeInBytes = (base64Data.length * 3) / 4; // Base64 to binary size estimation
-      const maxSizeInBytes = 10 * 1024 * 1024; // 10 MB
-      
-      if (sizeInBytes > maxSizeInBytes) {
+      if (sizeInBytes > MAX_AUDIO_BYTES) {
         return res.status(413).json({ 
           error: `Audio file too large. Maximum size is 10MB, received ${(sizeInBytes / (1024 * 1024)).toFixed(2)}MB.` 
         });
@@ -134,9 +172,6 @@ export default async function handler(req, res) {
       console.log(`[Feedback] Successfully uploaded audio to: ${blobAudioUrl}`);
     }
 
-    // --- Store Metadata as JSON file in Vercel Blob ---
-    const metadataFileName = `feedback-meta-${uniqueId}.json`;
-
     const metadata = {
       audioUrl: blobAudioUrl,
       audioId: uniqueId,  // Unique identifier for the audio query
@@ -147,6 +182,23 @@ export default async function handler(req, res) {
       isUpdate: !!audioId, // Flag to indicate if this is an update
     };
 
+    // --- Append to the segment log (FEEDBACK_LOG_MODE=segments) ---
+    const feedbackLog = getFeedbackLog();
+    if (feedbackLog) {
+      const { recordId } = await appendFeedbackRecord(feedbackLog, metadata);
+      console.log(`[Feedback] Buffered feedback record ${recordId} for the segment log`);
+      return res.status(200).json({
+        message: 'Feedback submitted successfully',
+        audioId: uniqueId,
+        audioUrl: blobAudioUrl,
+        metadataUrl: null,
+        recordId,
+      });
+    }
+
+    // --- Store Metadata as JSON file in Vercel Blob ---
+    const metadataFileName = `feedback-meta-${uniqueId}.json`;
+
     // Upload metadata JSON file
     // Note: Random suffix is added by default to make URLs unguessable
     const { url: blobMetaUrl } = await put(metadataFileName, JSON.stringify(metadata, null, 2), {
@@ -165,6 +217,9 @@ export default async function handler(req, res) {
     });
 
   } catch (error) {
+    if (error instanceof AudioUploadError) {
+      return res.status(error.status).json({ error: error.message });
+    }
     console.error('[Feedback] Error occurred while handling feedback:', error);
     console.error('[Feedback] Error name:', error?.name);
     console.error('[Feedback] Error message:', error?.message);
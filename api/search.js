@@ -1,15 +1,58 @@
 import { handleCorsPreflightAndValidate } from './utils/cors.js';
-import { checkSearchRateLimit, getClientIp, setRateLimitHeaders } from './utils/ratelimit.js';
+import { getClientIp, setRateLimitHeaders, startSearchRateLimit } from './utils/ratelimit.js';
+import { getProjection, projectEmbedding } from './utils/projection.js';
+import { getCatalog } from './utils/catalog.js';
+import { getKnnTable, lookupSimilar } from './utils/knn.js';
+import { cachedSearch, searchCacheKey, setCacheHeaders } from './utils/cache.js';
+import { EmbeddingDecodeError, allFinite, decodeEmbedding, readSearchBody } from './utils/embedding.js';
+import { DeadlineError, LatencyTracker, runHedged } from './utils/fanout.js';
+import { getPoolStats, pooledRequest, warmUpConnections } from './utils/http-pool.js';
 
 // Pinecone configuration from environment variables
 // PINECONE_INDEX_HOST bypasses the control plane lookup for faster, more reliable queries
 const apiKey = process.env.PINECONE_API_KEY;
 const defaultIndexHost = process.env.PINECONE_INDEX_HOST;
 const devModeEnabled = process.env.ENABLE_DEV_MODE === 'true';
+// Optional projection artifact (db_manager/projection.py) for an index that stores reduced vectors
+const defaultProjectionPath = process.env.EMBEDDING_PROJECTION_PATH;
+// Precomputed "more like this" artifacts (db_manager/knn_table.py), relative to the project root
+const knnTablePath = process.env.KNN_TABLE_PATH || 'artifacts/knn';
+const catalogPath = process.env.CATALOG_PATH || 'artifacts/catalog';
+// Resolve freesound_url from the catalog side table and query Pinecone without metadata
+const urlsFromCatalog = process.env.SEARCH_URLS_FROM_CATALOG !== 'false';
 const TOP_K_MATCHES = 4;
+const ITEM_ID_PATTERN = /^[A-Za-z0-9_-]{1,64}$/;
+// Model outputs 960 dimensions
+const MIN_EMBEDDING_SIZE = 32;
+const MAX_EMBEDDING_SIZE = 2048;
+// Batch requests ({ embeddings: [...] }): each embedding counts as one request against the rate limit
+const MAX_BATCH_SIZE = parseInt(process.env.SEARCH_MAX_BATCH_SIZE || '10', 10);
+const BATCH_CONCURRENCY = parseInt(process.env.SEARCH_BATCH_CONCURRENCY || '4', 10);
+// When the rate limit needs Upstash, query Pinecone at the same time and drop the results if the limit is exceeded
+const rateLimitConcurrent = process.env.SEARCH_RATELIMIT_CONCURRENT === 'true';
+// Returned in place of search results that were dropped because of the rate limit
+const RATE_LIMITED = Symbol('rate limited');
+
+// Dev-mode fan-out: per-index deadline, and hedging to an index's optional replica host
+// once the primary is slower than its recent DEV_HEDGE_PERCENTILE latency
+const DEV_INDEX_TIMEOUT_MS = parseInt(process.env.DEV_INDEX_TIMEOUT_MS || '2500', 10);
+const HEDGE_PERCENTILE = parseFloat(process.env.DEV_HEDGE_PERCENTILE || '90');
+const HEDGE_MIN_SAMPLES = parseInt(process.env.DEV_HEDGE_MIN_SAMPLES || '20', 10);
+const HEDGE_DEFAULT_DELAY_MS = parseInt(process.env.DEV_HEDGE_DELAY_MS || '300', 10);
+const latencyTracker = new LatencyTracker();
+
+const defaultIndexConfig = {
+  host: defaultIndexHost,
+  indexId: 'default',
+  indexLabel: 'Default',
+  projection: defaultProjectionPath,
+  // The side table is built from the default index's data; other indexes opt in per entry
+  catalog: urlsFromCatalog ? catalogPath : undefined,
+};
 
 function normalizeHost(host) {
-  return host.startsWith('https://') ? host : `https://${host}`;
+  // Plain http:// is kept so hosts can point at a local stand-in (test/pinecone_standin.py)
+  return /^https?:\/\//.test(host) ? host : `https://${host}`;
 }
 
 function parseRequestedIndexes(indexes) {
@@ -58,6 +101,7 @@ function getDevIndexConfigs() {
         indexId,
         indexLabel: indexId,
         host: rawEntry,
+        timeoutMs: DEV_INDEX_TIMEOUT_MS,
       };
     }
 
@@ -66,6 +110,10 @@ function getDevIndexConfigs() {
         indexId,
         indexLabel: typeof rawEntry.label === 'string' && rawEntry.label.trim() ? rawEntry.label.trim() : indexId,
         host: rawEntry.host,
+        projection: typeof rawEntry.projection === 'string' ? rawEntry.projection : undefined,
+        catalog: urlsFromCatalog && typeof rawEntry.catalog === 'string' ? rawEntry.catalog : undefined,
+        replicaHost: typeof rawEntry.replica === 'string' ? rawEntry.replica : undefined,
+        timeoutMs: Number.isFinite(rawEntry.timeoutMs) && rawEntry.timeoutMs > 0 ? rawEntry.timeoutMs : DEV_INDEX_TIMEOUT_MS,
       };
     }
 
@@ -73,111 +121,392 @@ function getDevIndexConfigs() {
   });
 }
 
-async function queryIndex({ host, indexId, indexLabel }, embedding) {
+// Parsed once per instance; a broken config only fails dev-mode requests
+function loadDevIndexConfigs() {
+  if (!devModeEnabled) return { configs: [] };
+  try {
+    return { configs: getDevIndexConfigs() };
+  } catch (error) {
+    console.error('[Search] Invalid dev index configuration:', error);
+    return { error };
+  }
+}
+
+const devIndexConfigs = loadDevIndexConfigs();
+
+// Open connections to every configured host on cold start, so the first queries skip the handshakes
+if (apiKey && process.env.PINECONE_WARMUP !== 'false') {
+  const warmHosts = [defaultIndexHost, ...(devIndexConfigs.configs || []).flatMap(config => [config.host, config.replicaHost])];
+  warmUpConnections(warmHosts.filter(Boolean).map(normalizeHost), { 'Api-Key': apiKey });
+}
+
+/**
+ * Returns an error message for an invalid embedding, or null when it is valid.
+ * @param {number} [expectedSize] - Exact size required, e.g. the input size of a projection
+ */
+function validateEmbedding(embedding, expectedSize) {
+  // SECURITY: Validate embedding exists and is an array (JSON) or a decoded Float32Array (binary)
+  const isTyped = embedding instanceof Float32Array;
+  if (!embedding || !(isTyped || Array.isArray(embedding))) {
+    return 'Missing or invalid embedding vector';
+  }
+
+  // SECURITY: Validate embedding size
+  if (embedding.length < MIN_EMBEDDING_SIZE || embedding.length > MAX_EMBEDDING_SIZE) {
+    return `Invalid embedding size. Expected between ${MIN_EMBEDDING_SIZE} and ${MAX_EMBEDDING_SIZE}, got ${embedding.length}`;
+  }
+
+  // SECURITY: Validate all values are valid numbers
+  const valid = isTyped
+    ? allFinite(embedding)
+    : embedding.every(v => typeof v === 'number' && !isNaN(v) && isFinite(v));
+  if (!valid) {
+    return 'Embedding contains invalid values (must be finite numbers)';
+  }
+
+  if (expectedSize && embedding.length !== expectedSize) {
+    return `Invalid embedding size. Expected ${expectedSize}, got ${embedding.length}`;
+  }
+  return null;
+}
+
+function defaultEmbeddingSize() {
+  return getProjection(defaultProjectionPath)?.inputDim;
+}
+
+/**
+ * Like Promise.allSettled(items.map(worker)), but with at most `limit` workers running at once.
+ */
+async function settleWithConcurrency(items, limit, worker) {
+  const settled = new Array(items.length);
+  let next = 0;
+  async function run() {
+    while (next < items.length) {
+      const index = next++;
+      try {
+        settled[index] = { status: 'fulfilled', value: await worker(items[index]) };
+      } catch (reason) {
+        settled[index] = { status: 'rejected', reason };
+      }
+    }
+  }
+  await Promise.all(Array.from({ length: Math.min(limit, items.length) }, run));
+  return settled;
+}
+
+/**
+ * Returns the catalog side table at dir, or null when URLs should come from
+ * Pinecone metadata (no catalog configured for the index, or it fails to load).
+ */
+const brokenCatalogs = new Set();
+
+function loadUrlCatalog(dir) {
+  if (!dir || brokenCatalogs.has(dir)) return null;
+  try {
+    return getCatalog(dir);
+  } catch (e) {
+    brokenCatalogs.add(dir);
+    console.error(`[Search] Ignoring catalog side table ${dir}, falling back to Pinecone metadata: ${e.message}`);
+    return null;
+  }
+}
+
+// Loaded once per instance at cold start; dev-mode catalogs load on first use
+loadUrlCatalog(defaultIndexConfig.catalog);
+
+// Log connection reuse per host every POOL_STATS_EVERY queries
+const POOL_STATS_EVERY = 100;
+let queriesSinceStats = 0;
+
+async function postQuery(host, indexId, body, signal) {
   let response;
   try {
-    response = await fetch(`${normalizeHost(host)}/query`, {
+    // Pooled keep-alive connection per host (api/utils/http-pool.js)
+    response = await pooledRequest(`${normalizeHost(host)}/query`, {
       method: 'POST',
       headers: {
         'Api-Key': apiKey,
         'Content-Type': 'application/json',
       },
-      body: JSON.stringify({
-        topK: TOP_K_MATCHES,
-        vector: embedding,
-        includeMetadata: true,
-      }),
+      body: JSON.stringify(body),
+      signal,
     });
   } catch (e) {
+    if (e.name === 'AbortError') throw e;
     throw new Error(`Pinecone network error for ${indexId}: ${e.message}`);
   }
 
+  if (++queriesSinceStats >= POOL_STATS_EVERY) {
+    queriesSinceStats = 0;
+    console.log('[Pool] Connection reuse:', JSON.stringify(getPoolStats()));
+  }
+
   if (!response.ok) {
-    const errorText = await response.text();
-    throw new Error(`Pinecone API error for ${indexId}: ${response.status} - ${errorText}`);
+    throw new Error(`Pinecone API error for ${indexId}: ${response.status} - ${response.body}`);
+  }
+
+  const queryResponse = JSON.parse(response.body);
+  return {
+    results: (queryResponse.matches || []).map(match => ({
+      id: match.id,
+      score: match.score,
+      freesound_url: match.metadata?.freesound_url || '',
+    })),
+    connectionReused: response.reused,
+  };
+}
+
+/**
+ * Runs a Pinecone query and fills in freesound_url for every match. When the
+ * index has a catalog side table the query skips metadata and URLs are looked
+ * up locally; ids the table does not know (a stale artifact) trigger one
+ * re-query with metadata. Indexes without a catalog always use metadata.
+ */
+async function queryWithUrls(host, indexId, body, signal, catalogDir) {
+  const urlCatalog = loadUrlCatalog(catalogDir);
+  if (!urlCatalog) {
+    return postQuery(host, indexId, { ...body, includeMetadata: true }, signal);
   }
 
-  const queryResponse = await response.json();
-  const results = (queryResponse.matches || []).map(match => ({
-    id: match.id,
-    score: match.score,
-    freesound_url: match.metadata?.freesound_url || '',
-  }));
+  const response = await postQuery(host, indexId, { ...body, includeMetadata: false }, signal);
+  for (const match of response.results) {
+    const row = urlCatalog.rowOf(match.id);
+    if (row === undefined) {
+      console.warn(`[Search] Id ${match.id} from ${indexId} is not in the catalog side table; re-querying with metadata`);
+      return postQuery(host, indexId, { ...body, includeMetadata: true }, signal);
+    }
+    match.freesound_url = urlCatalog.url(row);
+  }
+  return response;
+}
+
+async function queryIndex({ host, indexId, indexLabel, projection, catalog, replicaHost, timeoutMs }, embedding) {
+  const startedAt = Date.now();
+  let servedBy = null;
+  let connectionReused = null;
+  const { value: results, cache } = await cachedSearch(searchCacheKey(host, TOP_K_MATCHES, embedding), async () => {
+    // Indexes built from reduced vectors are queried with the same projection
+    const vector = projection
+      ? projectEmbedding(getProjection(projection), embedding)
+      : ArrayBuffer.isView(embedding) ? Array.from(embedding) : embedding;
+    const body = {
+      topK: TOP_K_MATCHES,
+      vector,
+    };
+
+    const outcome = await runHedged({
+      attempt: (targetHost, signal) => queryWithUrls(targetHost, indexId, body, signal, catalog),
+      host,
+      replicaHost,
+      timeoutMs,
+      hedgeDelayMs: latencyTracker.percentile(host, HEDGE_PERCENTILE, HEDGE_MIN_SAMPLES) ?? HEDGE_DEFAULT_DELAY_MS,
+      tracker: latencyTracker,
+    });
+    servedBy = outcome.servedBy;
+    connectionReused = outcome.value.connectionReused;
+    return outcome.value.results;
+  });
 
   return {
     indexId,
     indexLabel,
     results,
+    latencyMs: Date.now() - startedAt,
+    cache,
+    servedBy,
+    connectionReused,
+    timedOut: false,
     error: null,
   };
 }
 
+let warnedStaleKnnTable = false;
+
+async function findSimilarById(itemId) {
+  const table = getKnnTable(knnTablePath);
+  const catalog = table && getCatalog(catalogPath);
+  if (table && catalog && table.fingerprint !== catalog.fingerprint) {
+    // Vectors were re-packed after the table was built; its neighbours may be stale
+    if (!warnedStaleKnnTable) {
+      warnedStaleKnnTable = true;
+      console.warn('[Search] k-NN table was built from different data than the catalog; rebuild it with db_manager/knn_table.py');
+    }
+  } else if (table && catalog) {
+    const results = lookupSimilar(table, catalog, itemId, TOP_K_MATCHES);
+    if (results) return { results, source: 'knn-table' };
+  }
+
+  // Not in the table (or no table deployed): let Pinecone query with the item's stored vector
+  if (!defaultIndexHost) {
+    throw new Error('PINECONE_INDEX_HOST not set; cannot look up ids outside the k-NN table');
+  }
+  const { results: matches } = await queryWithUrls(defaultIndexHost, 'default', {
+    topK: TOP_K_MATCHES + 1,
+    id: itemId,
+  }, undefined, defaultIndexConfig.catalog);
+  if (!matches.length) return null;
+  return { results: matches.filter(match => match.id !== itemId).slice(0, TOP_K_MATCHES), source: 'index' };
+}
+
+/**
+ * Sets the rate limit headers and sends the 429 response when the limit is exceeded.
+ * @returns {boolean} true when the request was rejected
+ */
+function rejectIfRateLimited(res, rateLimit, clientIp) {
+  setRateLimitHeaders(res, rateLimit);
+  if (!rateLimit.success) {
+    console.log(`[Search] Rate limit exceeded for IP: ${clientIp}`);
+    res.status(429).json({
+      error: 'Too many requests. Please try again later.',
+      retryAfter: Math.ceil((rateLimit.reset - Date.now()) / 1000)
+    });
+    return true;
+  }
+  console.log(`[Search] Request from IP: ${clientIp}, remaining: ${rateLimit.remaining}/${rateLimit.limit}`);
+  return false;
+}
+
 export default async function handler(req, res) {
   // SECURITY: Validate origin and set CORS headers
   const corsHandled = handleCorsPreflightAndValidate(req, res, {
     methods: 'POST,OPTIONS',
+    headers: 'Content-Type, Authorization, X-Requested-With, X-Embedding-Dtype',
   });
   if (corsHandled) return;
   
   if (req.method !== 'POST') return res.status(405).json({ error: 'Method Not Allowed' });
 
   try {
-    // SECURITY: Rate limiting - 10 requests per minute per IP
+    // SECURITY: Rate limiting - 10 requests per minute per IP (a batch costs one per embedding)
     const clientIp = getClientIp(req);
-    const rateLimit = await checkSearchRateLimit(clientIp);
-    setRateLimitHeaders(res, rateLimit);
-    
-    if (!rateLimit.success) {
-      console.log(`[Search] Rate limit exceeded for IP: ${clientIp}`);
-      return res.status(429).json({ 
-        error: 'Too many requests. Please try again later.',
-        retryAfter: Math.ceil((rateLimit.reset - Date.now()) / 1000)
-      });
+    const body = readSearchBody(req);
+    const batchSize = Array.isArray(body.embeddings) ? body.embeddings.length : 0;
+    const rateLimitCheck = startSearchRateLimit(clientIp, Math.min(Math.max(batchSize, 1), MAX_BATCH_SIZE));
+
+    // Decided in-process, or waited for before any search work unless SEARCH_RATELIMIT_CONCURRENT is set
+    let pendingRateLimit = null;
+    if (rateLimitCheck.local || !rateLimitConcurrent) {
+      if (rejectIfRateLimited(res, rateLimitCheck.local || await rateLimitCheck.remote, clientIp)) return;
+    } else {
+      pendingRateLimit = rateLimitCheck.remote;
     }
-    
-    console.log(`[Search] Request from IP: ${clientIp}, remaining: ${rateLimit.remaining}/${rateLimit.limit}`);
+    // Resolves to the search work's value, or RATE_LIMITED after sending the 429
+    const afterRateLimit = async work => {
+      if (!pendingRateLimit) return work;
+      const [rateLimit, outcome] = await Promise.all([pendingRateLimit, Promise.allSettled([work])]);
+      if (rejectIfRateLimited(res, rateLimit, clientIp)) return RATE_LIMITED;
+      if (outcome[0].status === 'rejected') throw outcome[0].reason;
+      return outcome[0].value;
+    };
 
     if (!apiKey) {
       console.error('[Search] ERROR: PINECONE_API_KEY not set');
       return res.status(500).json({ error: 'Server configuration error: Pinecone API key not configured' });
     }
 
-    const { embedding } = req.body;
-    const requestedMode = typeof req.body?.mode === 'string' ? req.body.mode : 'single';
-    const requestedIndexes = parseRequestedIndexes(req.body?.indexes);
+    const { id: itemId } = body;
+    const requestedMode = typeof body.mode === 'string' ? body.mode : 'single';
+    const requestedIndexes = parseRequestedIndexes(body.indexes);
+    const dtype = typeof body.dtype === 'string' ? body.dtype : 'float32';
+
+    // Base64 strings and binary bodies become Float32Arrays; JSON arrays pass through
+    let embedding;
+    let embeddings;
+    try {
+      embedding = decodeEmbedding(body.embedding, dtype, MAX_EMBEDDING_SIZE);
+      embeddings = Array.isArray(body.embeddings)
+        ? body.embeddings.map(value => decodeEmbedding(value, dtype, MAX_EMBEDDING_SIZE))
+        : body.embeddings;
+    } catch (error) {
+      if (error instanceof EmbeddingDecodeError) {
+        return res.status(400).json({ error: error.message });
+      }
+      throw error;
+    }
 
     if (requestedIndexes === null) {
       return res.status(400).json({ error: 'indexes must be an array of strings when provided' });
     }
     
-    // SECURITY: Validate embedding exists and is an array
-    if (!embedding || !Array.isArray(embedding)) {
-      return res.status(400).json({ error: 'Missing or invalid embedding vector' });
+    // "More like this": look up neighbours of a catalog item by id instead of an embedding
+    if (itemId !== undefined) {
+      if (typeof itemId !== 'string' || !ITEM_ID_PATTERN.test(itemId)) {
+        return res.status(400).json({ error: 'id must be a catalog item id' });
+      }
+      if (requestedMode === 'dev' || requestedIndexes.length > 0) {
+        return res.status(400).json({ error: 'id lookups are only supported in single-index mode' });
+      }
+
+      const similar = await afterRateLimit(findSimilarById(itemId));
+      if (similar === RATE_LIMITED) return;
+      if (!similar) {
+        return res.status(404).json({ error: `Unknown id: ${itemId}` });
+      }
+      res.setHeader('X-Search-Source', similar.source);
+      return res.status(200).json({ results: similar.results });
     }
 
-    // SECURITY: Validate embedding size (model outputs 960 dimensions)
-    const MIN_EMBEDDING_SIZE = 32;
-    const MAX_EMBEDDING_SIZE = 2048;
-    if (embedding.length < MIN_EMBEDDING_SIZE || embedding.length > MAX_EMBEDDING_SIZE) {
-      return res.status(400).json({ 
-        error: `Invalid embedding size. Expected between ${MIN_EMBEDDING_SIZE} and ${MAX_EMBEDDING_SIZE}, got ${embedding.length}` 
+    const isDevRequest = requestedMode === 'dev' || requestedIndexes.length > 0;
+
+    // Batch: several embeddings (e.g. segments of one imitation) against the default index
+    if (embeddings !== undefined) {
+      if (!Array.isArray(embeddings) || embeddings.length === 0 || embeddings.length > MAX_BATCH_SIZE) {
+        return res.status(400).json({ error: `embeddings must be an array of 1 to ${MAX_BATCH_SIZE} embedding vectors` });
+      }
+      if (isDevRequest) {
+        return res.status(400).json({ error: 'Batch requests are only supported in single-index mode' });
+      }
+      for (let i = 0; i < embeddings.length; i++) {
+        const validationError = validateEmbedding(embeddings[i], defaultEmbeddingSize());
+        if (validationError) {
+          return res.status(400).json({ error: `embeddings[${i}]: ${validationError}` });
+        }
+      }
+      if (!defaultIndexHost) {
+        console.error('[Search] ERROR: PINECONE_INDEX_HOST not set');
+        return res.status(500).json({ error: 'Server configuration error: Pinecone index host not configured' });
+      }
+
+      console.log(`[Search] Batch of ${embeddings.length} embeddings`);
+      const settledQueries = await afterRateLimit(settleWithConcurrency(
+        embeddings, BATCH_CONCURRENCY, batchEmbedding => queryIndex(defaultIndexConfig, batchEmbedding)
+      ));
+      if (settledQueries === RATE_LIMITED) return;
+      const queries = settledQueries.map((result, index) => {
+        if (result.status === 'fulfilled') {
+          return { results: result.value.results, error: null };
+        }
+        console.error(`[Search] Batch query ${index} failed:`, result.reason);
+        return { results: [], error: result.reason instanceof Error ? result.reason.message : 'Unknown error' };
+      });
+
+      if (queries.every(query => query.error)) {
+        // Same handling as a failed single query (503 for Pinecone outages)
+        throw settledQueries[0].reason;
+      }
+      setCacheHeaders(res, settledQueries.filter(result => result.status === 'fulfilled').map(result => result.value.cache));
+      return res.status(200).json({
+        mode: 'batch',
+        queries,
       });
     }
 
-    // SECURITY: Validate all values are valid numbers
-    if (!embedding.every(v => typeof v === 'number' && !isNaN(v) && isFinite(v))) {
-      return res.status(400).json({ error: 'Embedding contains invalid values (must be finite numbers)' });
+    const validationError = validateEmbedding(embedding);
+    if (validationError) {
+      return res.status(400).json({ error: validationError });
     }
 
     console.log(`[Search] Embedding size: ${embedding.length}`);
 
-    const isDevRequest = requestedMode === 'dev' || requestedIndexes.length > 0;
     if (isDevRequest) {
       if (!devModeEnabled) {
         return res.status(403).json({ error: 'Dev mode is not enabled on this backend deployment' });
       }
 
-      const availableIndexConfigs = getDevIndexConfigs();
+      if (devIndexConfigs.error) {
+        throw devIndexConfigs.error;
+      }
+      const availableIndexConfigs = devIndexConfigs.configs;
       const selectedIndexConfigs = requestedIndexes.length
         ? requestedIndexes.map(indexId => {
             const match = availableIndexConfigs.find(config => config.indexId === indexId);
@@ -188,9 +517,10 @@ export default async function handler(req, res) {
           })
         : availableIndexConfigs;
 
-      const settledRows = await Promise.allSettled(
+      const settledRows = await afterRateLimit(Promise.allSettled(
         selectedIndexConfigs.map(config => queryIndex(config, embedding))
-      );
+      ));
+      if (settledRows === RATE_LIMITED) return;
 
       const rows = settledRows.map((result, index) => {
         const config = selectedIndexConfigs[index];
@@ -198,17 +528,21 @@ export default async function handler(req, res) {
           return result.value;
         }
 
-        console.error(`[Search] Dev index query failed for ${config.indexId}:`, result.reason);
+        const timedOut = result.reason instanceof DeadlineError;
+        console.error(`[Search] Dev index query ${timedOut ? 'timed out' : 'failed'} for ${config.indexId}:`, result.reason);
         return {
           indexId: config.indexId,
           indexLabel: config.indexLabel,
           results: [],
+          timedOut,
           error: result.reason instanceof Error ? result.reason.message : 'Unknown error',
         };
       });
 
+      setCacheHeaders(res, settledRows.filter(result => result.status === 'fulfilled').map(result => result.value.cache));
       return res.status(200).json({
         mode: 'multi-index',
+        partial: rows.some(row => row.timedOut),
         rows,
       });
     }
@@ -218,12 +552,18 @@ export default async function handler(req, res) {
       return res.status(500).json({ error: 'Server configuration error: Pinecone index host not configured' });
     }
 
-    const defaultResult = await queryIndex({
-      host: defaultIndexHost,
-      indexId: 'default',
-      indexLabel: 'Default',
-    }, embedding);
+    const defaultSizeError = validateEmbedding(embedding, defaultEmbeddingSize());
+    if (defaultSizeError) {
+      return res.status(400).json({ error: defaultSizeError });
+    }
 
+    const defaultResult = await afterRateLimit(queryIndex(defaultIndexConfig, embedding));
+    if (defaultResult === RATE_LIMITED) return;
+
+    setCacheHeaders(res, [defaultResult.cache]);
+    if (defaultResult.connectionReused !== null) {
+      res.setHeader('X-Pinecone-Connection', defaultResult.connectionReused ? 'reused' : 'new');
+    }
     return res.status(200).json({ results: defaultResult.results });
 
   } catch (error) {
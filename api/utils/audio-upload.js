@@ -0,0 +1,279 @@
+import { Transform } from 'stream';
+import { put } from '@vercel/blob';
+
+// Streaming audio upload for /api/feedback. The request is multipart/form-data
+// with two parts in this order: `metadata` (the feedback fields as JSON) and
+// `audio` (the recording). The metadata is read first; the audio part is then
+// piped through a byte counter straight into Vercel Blob, so memory per request
+// stays constant and oversized uploads are cut off as soon as they pass the limit.
+
+export const MAX_AUDIO_BYTES = 10 * 1024 * 1024; // 10 MB
+// Everything before the audio bytes: boundaries, part headers and the metadata JSON
+export const MAX_METADATA_BYTES = 256 * 1024;
+const SUPPORTED_AUDIO_TYPES = /^audio\/(?:webm|wav|mp3|ogg|mpeg)$/;
+const HEADER_END = Buffer.from('\r\n\r\n');
+const CRLF = Buffer.from('\r\n');
+
+export class AudioUploadError extends Error {
+  constructor(message, status = 400) {
+    super(message);
+    this.name = 'AudioUploadError';
+    this.status = status;
+  }
+}
+
+function tooLarge(bytes, partial = false) {
+  const received = `${partial ? 'more than ' : ''}${(bytes / (1024 * 1024)).toFixed(2)}MB`;
+  return new AudioUploadError(`Audio file too large. Maximum size is 10MB, received ${received}.`, 413);
+}
+
+function malformed(reason) {
+  return new AudioUploadError(`Malformed multipart body: ${reason}`);
+}
+
+/**
+ * True when the request uses the streaming upload instead of a JSON body.
+ * Must be checked before touching req.body, which would buffer the stream.
+ */
+export function isStreamingUpload(req) {
+  const contentType = (req.headers['content-type'] || '').toLowerCase();
+  return contentType.startsWith('multipart/form-data');
+}
+
+function multipartBoundary(req) {
+  const match = (req.headers['content-type'] || '').match(/boundary=(?:"([^"]+)"|([^;\s]+))/i);
+  if (!match) {
+    throw malformed('missing boundary in Content-Type');
+  }
+  return match[1] || match[2];
+}
+
+/**
+ * Parses the headers of one part.
+ * @returns {{name: string|undefined, contentType: string}}
+ */
+function parsePartHeaders(block) {
+  let name;
+  let contentType = '';
+  for (const line of block.toString('latin1').split('\r\n')) {
+    const separator = line.indexOf(':');
+    const key = line.slice(0, separator).trim().toLowerCase();
+    const value = line.slice(separator + 1).trim();
+    if (key === 'content-disposition') {
+      name = value.match(/;\s*name="([^"]*)"/i)?.[1];
+    } else if (key === 'content-type') {
+      contentType = value.split(';')[0].trim().toLowerCase();
+    }
+  }
+  return { name, contentType };
+}
+
+/**
+ * Parses everything up to the first audio byte: the metadata part and the
+ * headers of the audio part.
+ * @returns {null|{fields: object, contentType: string, rest: Buffer}} null until more data is needed
+ */
+function parseHead(head, boundary) {
+  const opening = Buffer.from(`--${boundary}\r\n`);
+  const delimiter = Buffer.from(`\r\n--${boundary}`);
+
+  const metaStart = head.indexOf(opening);
+  if (metaStart < 0) return null;
+  const metaHeadersStart = metaStart + opening.length;
+  const metaHeadersEnd = head.indexOf(HEADER_END, metaHeadersStart);
+  if (metaHeadersEnd < 0) return null;
+  if (parsePartHeaders(head.subarray(metaHeadersStart, metaHeadersEnd)).name !== 'metadata') {
+    throw malformed('the first part must be "metadata"');
+  }
+
+  const metaBodyStart = metaHeadersEnd + HEADER_END.length;
+  const metaBodyEnd = head.indexOf(delimiter, metaBodyStart);
+  // Wait for the two bytes after the delimiter as well: CRLF (next part) or "--" (end)
+  if (metaBodyEnd < 0 || head.length < metaBodyEnd + delimiter.length + 2) return null;
+  const afterDelimiter = metaBodyEnd + delimiter.length;
+  if (!head.subarray(afterDelimiter, afterDelimiter + 2).equals(CRLF)) {
+    throw new AudioUploadError('Missing audio part');
+  }
+
+  const audioHeadersStart = afterDelimiter + CRLF.length;
+  const audioHeadersEnd = head.indexOf(HEADER_END, audioHeadersStart);
+  if (audioHeadersEnd < 0) return null;
+  const { name, contentType } = parsePartHeaders(head.subarray(audioHeadersStart, audioHeadersEnd));
+  if (name !== 'audio') {
+    throw malformed('the second part must be "audio"');
+  }
+
+  let fields;
+  try {
+    fields = JSON.parse(head.subarray(metaBodyStart, metaBodyEnd).toString('utf8'));
+  } catch {
+    throw new AudioUploadError('The metadata part must be JSON');
+  }
+  if (!fields || typeof fields !== 'object' || Array.isArray(fields)) {
+    throw new AudioUploadError('The metadata part must be a JSON object');
+  }
+  // SECURITY: Validate audio MIME type (webm, wav, mp3, ogg)
+  if (!SUPPORTED_AUDIO_TYPES.test(contentType)) {
+    throw new AudioUploadError('Unsupported audio format. Supported formats: webm, wav, mp3, ogg.');
+  }
+  return { fields, contentType, rest: head.subarray(audioHeadersEnd + HEADER_END.length) };
+}
+
+/**
+ * Transform stream that reads a metadata-then-audio multipart body. It emits
+ * 'metadata' with { fields, contentType } once the audio part starts, and then
+ * passes through only the audio bytes. Failures are also kept on
+ * `parser.failure`, like the size limiter's.
+ */
+function createMultipartParser(boundary) {
+  const delimiter = Buffer.from(`\r\n--${boundary}`);
+  let state = 'head';
+  let pending = Buffer.alloc(0);
+
+  const fail = (callback, error) => {
+    parser.failure = error;
+    callback(error);
+  };
+
+  // Pushes audio bytes, holding back a tail that could be the start of the closing delimiter
+  const pushAudio = data => {
+    const end = data.indexOf(delimiter);
+    if (end >= 0) {
+      parser.push(data.subarray(0, end));
+      state = 'done';
+      pending = Buffer.alloc(0);
+      return;
+    }
+    const keep = Math.min(data.length, delimiter.length - 1);
+    parser.push(data.subarray(0, data.length - keep));
+    pending = data.subarray(data.length - keep);
+  };
+
+  const parser = new Transform({
+    transform(chunk, encoding, callback) {
+      if (state === 'done') return callback(); // Epilogue
+
+      pending = pending.length ? Buffer.concat([pending, chunk]) : chunk;
+      if (state === 'audio') {
+        pushAudio(pending);
+        return callback();
+      }
+
+      let head;
+      try {
+        head = parseHead(pending, boundary);
+      } catch (error) {
+        return fail(callback, error);
+      }
+      if (!head) {
+        if (pending.length > MAX_METADATA_BYTES) {
+          return fail(callback, new AudioUploadError('Feedback metadata too large. Maximum size is 256KB.', 413));
+        }
+        return callback();
+      }
+      state = 'audio';
+      parser.emit('metadata', { fields: head.fields, contentType: head.contentType });
+      pushAudio(head.rest);
+      callback();
+    },
+    flush(callback) {
+      if (state === 'head') return fail(callback, new AudioUploadError('Missing audio part'));
+      if (state === 'audio') return fail(callback, malformed('missing closing boundary'));
+      callback();
+    },
+  });
+  parser.failure = null;
+  return parser;
+}
+
+/**
+ * Starts reading a streaming upload and waits for the metadata part.
+ * The caller must either pass the result to streamAudioToBlob or call discard().
+ * @param {import('http').IncomingMessage} req
+ * @returns {Promise<{fields: object, contentType: string, parser: Transform, discard: () => void}>}
+ */
+export async function openMultipartUpload(req) {
+  // Reject declared oversized bodies before reading a single byte
+  const declaredLength = parseInt(req.headers['content-length'] || '', 10);
+  if (declaredLength > MAX_AUDIO_BYTES + MAX_METADATA_BYTES) {
+    throw tooLarge(declaredLength);
+  }
+
+  const parser = createMultipartParser(multipartBoundary(req));
+  // Stop forwarding and drain the rest of the body, so an error response can still be sent
+  const discard = () => {
+    req.unpipe(parser);
+    req.resume();
+  };
+  req.on('error', error => parser.destroy(error));
+
+  const head = new Promise((resolve, reject) => {
+    parser.once('metadata', resolve);
+    parser.once('error', reject);
+  });
+  req.pipe(parser);
+  try {
+    const { fields, contentType } = await head;
+    return { fields, contentType, parser, discard };
+  } catch (error) {
+    discard();
+    throw error;
+  }
+}
+
+/**
+ * Transform stream that passes bytes through until maxBytes is exceeded,
+ * then fails with a 413 AudioUploadError. The failure is also kept on
+ * `limiter.failure`, since upload clients may wrap stream errors.
+ */
+export function createSizeLimiter(maxBytes = MAX_AUDIO_BYTES) {
+  let bytes = 0;
+  const limiter = new Transform({
+    transform(chunk, encoding, callback) {
+      bytes += chunk.length;
+      if (bytes > maxBytes) {
+        limiter.failure = tooLarge(maxBytes, true);
+        return callback(limiter.failure);
+      }
+      callback(null, chunk);
+    },
+    flush(callback) {
+      if (!bytes) {
+        limiter.failure = new AudioUploadError('Invalid audio data: empty audio part.');
+        return callback(limiter.failure);
+      }
+      callback();
+    },
+  });
+  limiter.failure = null;
+  limiter.bytesSeen = () => bytes;
+  return limiter;
+}
+
+/**
+ * Streams the audio part of an opened upload into a public Vercel Blob.
+ * @param {{parser: Transform, discard: () => void}} upload - Result of openMultipartUpload
+ * @param {{fileName: string, contentType: string}} options
+ * @returns {Promise<{url: string, bytes: number}>}
+ */
+export async function streamAudioToBlob({ parser, discard }, { fileName, contentType }) {
+  const limiter = createSizeLimiter(MAX_AUDIO_BYTES);
+  limiter.on('error', discard);
+  parser.on('error', error => {
+    discard();
+    limiter.destroy(error);
+  });
+  parser.pipe(limiter);
+
+  try {
+    // Note: Random suffix is added by default to make URLs unguessable
+    const { url } = await put(fileName, limiter, {
+      access: 'public',
+      contentType,
+      addRandomSuffix: true,
+    });
+    return { url, bytes: limiter.bytesSeen() };
+  } catch (error) {
+    throw parser.failure || limiter.failure || error;
+  }
+}
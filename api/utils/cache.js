@@ -0,0 +1,144 @@
+import { createHash } from 'crypto';
+import { getRedisClient } from './ratelimit.js';
+
+// Search result cache: an in-process LRU with TTL in front of an optional
+// shared copy in the Upstash Redis used for rate limiting.
+// Keys are built from the index host, topK and a hash of the L2-normalised
+// embedding rounded to SEARCH_CACHE_DECIMALS, so retries and near-identical
+// re-submissions map to the same entry.
+const cacheEnabled = process.env.SEARCH_CACHE_ENABLED !== 'false';
+const sharedCacheEnabled = process.env.SEARCH_CACHE_REDIS === 'true';
+const TTL_SECONDS = parseInt(process.env.SEARCH_CACHE_TTL_SECONDS || '300', 10);
+const MAX_ENTRIES = parseInt(process.env.SEARCH_CACHE_MAX_ENTRIES || '500', 10);
+const DECIMALS = parseInt(process.env.SEARCH_CACHE_DECIMALS || '4', 10);
+// Budget for the shared read; a slower Upstash answer counts as a miss so it never delays the query
+const REDIS_READ_TIMEOUT_MS = parseInt(process.env.SEARCH_CACHE_REDIS_TIMEOUT_MS || '50', 10);
+const KEY_PREFIX = 'searchcache:v1';
+
+// Map keeps insertion order; re-inserting on every hit makes the first key the least recently used
+const memoryCache = new Map();
+const pendingLookups = new Map();
+
+/**
+ * Builds the cache key for one index query.
+ * @param {string} host - Index host
+ * @param {number} topK
+ * @param {number[]} embedding
+ */
+export function searchCacheKey(host, topK, embedding) {
+  let norm = 0;
+  for (const v of embedding) norm += v * v;
+  norm = Math.sqrt(norm) || 1;
+
+  const scale = 10 ** DECIMALS;
+  const rounded = new Int32Array(embedding.length);
+  for (let i = 0; i < embedding.length; i++) {
+    rounded[i] = Math.round((embedding[i] / norm) * scale);
+  }
+
+  const digest = createHash('sha256')
+    .update(Buffer.from(rounded.buffer))
+    .digest('hex')
+    .slice(0, 32);
+  return `${KEY_PREFIX}:${host}:${topK}:${DECIMALS}:${digest}`;
+}
+
+function readMemory(key) {
+  const entry = memoryCache.get(key);
+  if (!entry) return undefined;
+  if (entry.expiresAt <= Date.now()) {
+    memoryCache.delete(key);
+    return undefined;
+  }
+  memoryCache.delete(key);
+  memoryCache.set(key, entry);
+  return entry.value;
+}
+
+function writeMemory(key, value) {
+  memoryCache.delete(key);
+  memoryCache.set(key, { value, expiresAt: Date.now() + TTL_SECONDS * 1000 });
+  while (memoryCache.size > MAX_ENTRIES) {
+    memoryCache.delete(memoryCache.keys().next().value);
+  }
+}
+
+async function readShared(key) {
+  const redis = sharedCacheEnabled ? getRedisClient() : null;
+  if (!redis) return undefined;
+  let timer;
+  const timeout = new Promise(resolve => {
+    timer = setTimeout(() => resolve(undefined), REDIS_READ_TIMEOUT_MS);
+  });
+  try {
+    const read = redis.get(key);
+    // A read that loses the race may still fail later; it must not become an unhandled rejection
+    read.catch(() => {});
+    const value = await Promise.race([read, timeout]);
+    return value ?? undefined;
+  } catch (error) {
+    // Fail-open: a Redis problem only costs a cache miss
+    console.error('[Cache] Upstash Redis read failed:', error);
+    return undefined;
+  } finally {
+    clearTimeout(timer);
+  }
+}
+
+function writeShared(key, value) {
+  const redis = sharedCacheEnabled ? getRedisClient() : null;
+  if (!redis) return;
+  // Not awaited so a miss does not pay for the extra round trip
+  redis.set(key, value, { ex: TTL_SECONDS }).catch(error => {
+    console.error('[Cache] Upstash Redis write failed:', error);
+  });
+}
+
+/**
+ * Returns the cached value for key, or runs compute() and caches its result.
+ * Concurrent lookups of the same key share one compute() call.
+ * @param {string} key
+ * @param {() => Promise<any>} compute - Only successful results are cached
+ * @returns {Promise<{value: any, cache: 'memory'|'redis'|'miss'|'off'}>}
+ */
+export async function cachedSearch(key, compute) {
+  if (!cacheEnabled) {
+    return { value: await compute(), cache: 'off' };
+  }
+
+  const cachedValue = readMemory(key);
+  if (cachedValue !== undefined) {
+    return { value: cachedValue, cache: 'memory' };
+  }
+
+  if (!pendingLookups.has(key)) {
+    const lookup = (async () => {
+      const sharedValue = await readShared(key);
+      if (sharedValue !== undefined) {
+        writeMemory(key, sharedValue);
+        return { value: sharedValue, cache: 'redis' };
+      }
+      const value = await compute();
+      writeMemory(key, value);
+      writeShared(key, value);
+      return { value, cache: 'miss' };
+    })();
+    pendingLookups.set(key, lookup);
+    lookup.finally(() => pendingLookups.delete(key)).catch(() => {});
+  }
+  return pendingLookups.get(key);
+}
+
+/**
+ * Sets X-Cache (HIT, MISS or PARTIAL across several lookups) and X-Cache-Layer headers.
+ * @param {Array<'memory'|'redis'|'miss'|'off'>} statuses - One per index lookup
+ */
+export function setCacheHeaders(res, statuses) {
+  if (!statuses.length || statuses.includes('off')) return;
+  const hits = statuses.filter(status => status !== 'miss');
+  const summary = hits.length === statuses.length ? 'HIT' : hits.length ? 'PARTIAL' : 'MISS';
+  res.setHeader('X-Cache', summary);
+  if (hits.length) {
+    res.setHeader('X-Cache-Layer', [...new Set(hits)].join(','));
+  }
+}
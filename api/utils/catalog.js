@@ -0,0 +1,89 @@
+import { existsSync, readFileSync } from 'fs';
+import path from 'path';
+
+// Row-aligned id/url side table written by db_manager/catalog_artifact.py:
+// UTF-8 strings concatenated back to back plus (count + 1) little-endian
+// uint32 byte offsets per column. Ids are looked up by arithmetic when they
+// are dense integers (header.idBase), by binary search when they are sorted,
+// and through a lazily built Map otherwise.
+const FORMAT_VERSION = 1;
+const catalogCache = new Map();
+
+function readUint32Array(filePath) {
+  const data = readFileSync(filePath);
+  return new Uint32Array(data.buffer.slice(data.byteOffset, data.byteOffset + data.byteLength));
+}
+
+function loadColumn(dir, name, count) {
+  const offsets = readUint32Array(path.join(dir, `${name}.offsets.bin`));
+  if (offsets.length !== count + 1) {
+    throw new Error(`${name}.offsets.bin in ${dir} does not match the catalog size`);
+  }
+  return { offsets, data: readFileSync(path.join(dir, `${name}.bin`)) };
+}
+
+function loadCatalog(dir) {
+  const resolvedDir = path.resolve(process.cwd(), dir);
+  const headerPath = path.join(resolvedDir, 'header.json');
+  if (!existsSync(headerPath)) return null;
+
+  const header = JSON.parse(readFileSync(headerPath, 'utf8'));
+  if (header.version !== FORMAT_VERSION) {
+    throw new Error(`Unsupported catalog version in ${dir}: ${header.version}`);
+  }
+
+  const ids = loadColumn(resolvedDir, 'ids', header.count);
+  const urls = loadColumn(resolvedDir, 'urls', header.count);
+  const read = ({ offsets, data }, row) => data.toString('utf8', offsets[row], offsets[row + 1]);
+  const idBase = Number.isSafeInteger(header.idBase) ? header.idBase : null;
+  let rowsById = null;
+
+  const binarySearch = itemId => {
+    let low = 0;
+    let high = header.count - 1;
+    while (low <= high) {
+      const mid = (low + high) >>> 1;
+      const candidate = read(ids, mid);
+      if (candidate === itemId) return mid;
+      if (candidate < itemId) low = mid + 1;
+      else high = mid - 1;
+    }
+    return undefined;
+  };
+
+  console.log(`[Catalog] Loaded ${header.count} items from ${dir}`);
+  return {
+    count: header.count,
+    fingerprint: header.fingerprint,
+    id: row => read(ids, row),
+    url: row => read(urls, row),
+    rowOf(itemId) {
+      if (idBase !== null) {
+        const row = Number(itemId) - idBase;
+        // Compare the stored id too, so different zero-padding never matches
+        return Number.isInteger(row) && row >= 0 && row < header.count && read(ids, row) === itemId
+          ? row
+          : undefined;
+      }
+      if (header.sorted) return binarySearch(itemId);
+      // The id -> row map is built on the first lookup and kept for the instance lifetime
+      if (!rowsById) {
+        rowsById = new Map();
+        for (let row = 0; row < header.count; row++) rowsById.set(read(ids, row), row);
+      }
+      return rowsById.get(itemId);
+    },
+  };
+}
+
+/**
+ * Returns the catalog side table in dir (relative to the project root), or
+ * null when it has not been deployed. Loaded once per instance.
+ * @param {string} dir
+ */
+export function getCatalog(dir) {
+  if (!catalogCache.has(dir)) {
+    catalogCache.set(dir, loadCatalog(dir));
+  }
+  return catalogCache.get(dir);
+}
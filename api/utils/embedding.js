@@ -0,0 +1,125 @@
+// Compact embedding transport for /api/search.
+// Besides JSON number arrays, an embedding can be sent as
+//   - a base64 string of little-endian float32 or float16 values
+//     ({ "embedding": "<base64>", "dtype": "float16" }; dtype defaults to float32), or
+//   - a raw application/octet-stream body, with the dtype in the X-Embedding-Dtype
+//     header and mode/indexes in the query string.
+// Decoded embeddings are Float32Arrays. Every platform Vercel runs on is little-endian,
+// so the bytes are viewed directly without swapping.
+
+const BYTES_PER_VALUE = { float32: 4, float16: 2 };
+
+export class EmbeddingDecodeError extends Error {}
+
+let float16Table = null;
+
+function getFloat16Table() {
+  // All 65536 half-precision bit patterns, decoded once (256 KB); decoding is then one lookup per value
+  if (!float16Table) {
+    float16Table = new Float32Array(65536);
+    for (let bits = 0; bits < 65536; bits++) {
+      const sign = bits & 0x8000 ? -1 : 1;
+      const exponent = (bits >> 10) & 0x1f;
+      const fraction = bits & 0x03ff;
+      if (exponent === 0) {
+        float16Table[bits] = sign * 2 ** -14 * (fraction / 1024);
+      } else if (exponent === 0x1f) {
+        float16Table[bits] = fraction ? NaN : sign * Infinity;
+      } else {
+        float16Table[bits] = sign * 2 ** (exponent - 15) * (1 + fraction / 1024);
+      }
+    }
+  }
+  return float16Table;
+}
+
+/**
+ * Converts raw float16 bit patterns to float32 values.
+ * @param {Uint16Array} halves
+ * @returns {Float32Array}
+ */
+export function decodeFloat16(halves) {
+  const table = getFloat16Table();
+  const values = new Float32Array(halves.length);
+  for (let i = 0; i < halves.length; i++) {
+    values[i] = table[halves[i]];
+  }
+  return values;
+}
+
+/**
+ * Views little-endian bytes as a Float32Array.
+ * @param {Buffer} bytes
+ * @param {string} dtype - float32 or float16
+ * @param {number} maxValues - Reject before copying anything larger
+ */
+export function decodeEmbeddingBytes(bytes, dtype, maxValues) {
+  const bytesPerValue = BYTES_PER_VALUE[dtype];
+  if (!bytesPerValue) {
+    throw new EmbeddingDecodeError(`Unsupported embedding dtype: ${dtype} (expected float32 or float16)`);
+  }
+  if (bytes.byteLength % bytesPerValue !== 0) {
+    throw new EmbeddingDecodeError(`Embedding byte length ${bytes.byteLength} is not a multiple of ${bytesPerValue}`);
+  }
+  if (bytes.byteLength / bytesPerValue > maxValues) {
+    throw new EmbeddingDecodeError(`Embedding has more than ${maxValues} values`);
+  }
+
+  // Copy into a fresh, aligned buffer; Buffers may be unaligned slices of a shared pool
+  const aligned = bytes.buffer.slice(bytes.byteOffset, bytes.byteOffset + bytes.byteLength);
+  return dtype === 'float16' ? decodeFloat16(new Uint16Array(aligned)) : new Float32Array(aligned);
+}
+
+/**
+ * Decodes one embedding from the request: arrays pass through unchanged for
+ * the existing validation, strings are base64 and Buffers are raw bytes.
+ * @param {number[]|string|Buffer} value
+ * @param {string} [dtype='float32']
+ * @param {number} maxValues
+ */
+export function decodeEmbedding(value, dtype = 'float32', maxValues) {
+  if (typeof value === 'string') {
+    // Check the encoded length first so oversized strings are never decoded
+    if (value.length > Math.ceil((maxValues * 4) / 3) * 4 + 4) {
+      throw new EmbeddingDecodeError(`Embedding has more than ${maxValues} values`);
+    }
+    return decodeEmbeddingBytes(Buffer.from(value, 'base64'), dtype, maxValues);
+  }
+  if (Buffer.isBuffer(value)) {
+    return decodeEmbeddingBytes(value, dtype, maxValues);
+  }
+  return value;
+}
+
+/**
+ * True when every value is finite. Multiplying by zero maps finite values to
+ * 0 and NaN/Infinity to NaN, so one accumulating pass without branches checks
+ * the whole array.
+ * @param {Float32Array} values
+ */
+export function allFinite(values) {
+  let acc = 0;
+  for (let i = 0; i < values.length; i++) {
+    acc += values[i] * 0;
+  }
+  return acc === 0;
+}
+
+/**
+ * Normalises JSON and octet-stream requests to one body object.
+ * For octet-stream, Vercel hands over the raw body as a Buffer.
+ */
+export function readSearchBody(req) {
+  if (!Buffer.isBuffer(req.body)) {
+    return req.body || {};
+  }
+  const indexes = typeof req.query?.indexes === 'string'
+    ? req.query.indexes.split(',')
+    : undefined;
+  return {
+    embedding: req.body,
+    dtype: req.headers['x-embedding-dtype'] || 'float32',
+    mode: req.query?.mode,
+    indexes,
+  };
+}
@@ -0,0 +1,124 @@
+// Deadline and hedging helpers for the dev-mode index fan-out.
+// Each index query runs under its own AbortController. If a replica host is
+// configured and the primary has not answered within its recent latency
+// percentile, the same query is sent to the replica and the first answer wins.
+// Whatever is still running when the deadline passes is aborted.
+
+const LATENCY_WINDOW = 100;
+
+export class DeadlineError extends Error {
+  constructor(timeoutMs) {
+    super(`Timed out after ${timeoutMs} ms`);
+    this.name = 'DeadlineError';
+    this.timeoutMs = timeoutMs;
+  }
+}
+
+/**
+ * Recent latencies per host in a fixed-size ring buffer, for hedge delays.
+ */
+export class LatencyTracker {
+  constructor(windowSize = LATENCY_WINDOW) {
+    this.windowSize = windowSize;
+    this.samples = new Map();
+  }
+
+  record(host, latencyMs) {
+    let entry = this.samples.get(host);
+    if (!entry) {
+      entry = { values: new Float64Array(this.windowSize), count: 0, next: 0 };
+      this.samples.set(host, entry);
+    }
+    entry.values[entry.next] = latencyMs;
+    entry.next = (entry.next + 1) % this.windowSize;
+    entry.count = Math.min(entry.count + 1, this.windowSize);
+  }
+
+  /**
+   * @returns {number|null} The p-th percentile, or null with fewer than minSamples samples
+   */
+  percentile(host, p, minSamples) {
+    const entry = this.samples.get(host);
+    if (!entry || entry.count < minSamples) return null;
+    const sorted = Array.from(entry.values.subarray(0, entry.count)).sort((a, b) => a - b);
+    return sorted[Math.min(sorted.length - 1, Math.floor((p / 100) * sorted.length))];
+  }
+}
+
+/**
+ * Runs attempt(host, signal) against the primary host, hedging to a replica
+ * after hedgeDelayMs and giving up after timeoutMs.
+ * @param {object} options
+ * @param {(host: string, signal: AbortSignal) => Promise<any>} options.attempt
+ * @param {string} options.host - Primary host
+ * @param {string} [options.replicaHost] - Optional replica for hedged requests
+ * @param {number} [options.timeoutMs] - Overall deadline; no deadline when unset
+ * @param {number|null} [options.hedgeDelayMs] - When to send the hedged request
+ * @param {LatencyTracker} [options.tracker] - Receives the latency of every successful attempt, and the
+ *   elapsed time (at least timeoutMs for the primary) of attempts still running at the deadline
+ * @returns {Promise<{value: any, servedBy: 'primary'|'replica', hedged: boolean}>}
+ */
+export function runHedged({ attempt, host, replicaHost, timeoutMs, hedgeDelayMs, tracker }) {
+  const controller = new AbortController();
+  const timers = [];
+  // Start time of every attempt that has not answered yet, by host
+  const inFlight = new Map();
+
+  return new Promise((resolve, reject) => {
+    let settled = false;
+    let pending = 0;
+    let hedged = false;
+
+    const finish = (callback, value) => {
+      if (settled) return;
+      settled = true;
+      timers.forEach(clearTimeout);
+      // Cancel the losing attempt (or everything, on timeout)
+      controller.abort();
+      callback(value);
+    };
+
+    const hedge = () => {
+      if (settled || hedged || !replicaHost) return;
+      hedged = true;
+      start(replicaHost, 'replica');
+    };
+
+    function start(targetHost, servedBy) {
+      pending++;
+      const startedAt = Date.now();
+      inFlight.set(targetHost, startedAt);
+      attempt(targetHost, controller.signal).then(
+        value => {
+          inFlight.delete(targetHost);
+          tracker?.record(targetHost, Date.now() - startedAt);
+          finish(resolve, { value, servedBy, hedged });
+        },
+        error => {
+          inFlight.delete(targetHost);
+          pending--;
+          if (servedBy === 'primary' && replicaHost && !hedged) {
+            // A failed primary is retried on the replica right away
+            hedge();
+          } else if (!pending) {
+            finish(reject, error);
+          }
+        }
+      );
+    }
+
+    start(host, 'primary');
+    if (replicaHost) {
+      timers.push(setTimeout(hedge, Math.max(0, hedgeDelayMs ?? 0)));
+    }
+    if (timeoutMs) {
+      timers.push(setTimeout(() => {
+        // Count timed-out attempts as (censored) samples, or the hedge percentile would only see fast answers
+        for (const [targetHost, startedAt] of inFlight) {
+          tracker?.record(targetHost, Date.now() - startedAt);
+        }
+        finish(reject, new DeadlineError(timeoutMs));
+      }, timeoutMs));
+    }
+  });
+}
@@ -0,0 +1,219 @@
+import { put, del } from '@vercel/blob';
+import { v4 as uuidv4 } from 'uuid';
+import { getRedisClient } from './ratelimit.js';
+
+// Append-only feedback log (FEEDBACK_LOG_MODE=segments). Instead of one
+// feedback-meta-<uuid>.json blob per submission, each submission pushes one
+// compact JSON record onto a buffer list in the Upstash Redis used for rate
+// limiting. Once the buffer holds FEEDBACK_LOG_FLUSH_RECORDS records, or its
+// oldest record is FEEDBACK_LOG_FLUSH_SECONDS old, it is written as one NDJSON
+// segment blob, partitioned by date:
+//   feedback-log/segments/<yyyy>/<mm>/<dd>/<HHMMSSmmm>-<records>.ndjson
+// Every segment is recorded in the segment index (a Redis list, mirrored to
+// the feedback-log/index.json blob after each flush), so readers fetch one
+// index plus the segments instead of listing every submission.
+
+const logMode = process.env.FEEDBACK_LOG_MODE || 'blob';
+const FLUSH_RECORDS = parseInt(process.env.FEEDBACK_LOG_FLUSH_RECORDS || '200', 10);
+const FLUSH_SECONDS = parseInt(process.env.FEEDBACK_LOG_FLUSH_SECONDS || '300', 10);
+const MAX_SEGMENT_RECORDS = 1000;
+const LOCK_TTL_MS = 30_000;
+
+export const LOG_PREFIX = 'feedback-log/';
+const INDEX_VERSION = 1;
+const KEYS = {
+  buffer: 'feedback:log:buffer',
+  // Records claimed by the running (or a crashed) flush, until their segment is in the index
+  processing: 'feedback:log:processing',
+  since: 'feedback:log:buffer-since',
+  segments: 'feedback:log:segments',
+  indexUrl: 'feedback:log:index-url',
+  lock: 'feedback:log:flush-lock',
+};
+
+// The scripts below only act while the caller still holds the flush lock, so a
+// flush that outlived LOCK_TTL_MS cannot touch records another flush has taken over.
+
+// Moves up to ARGV[2] records from the buffer to the processing list. Records
+// left there by a crashed flush are flushed first. Returns the number of
+// records to flush, or -1 when the lock was lost.
+const CLAIM_SCRIPT = `
+if redis.call('GET', KEYS[1]) ~= ARGV[1] then return -1 end
+local claimed = redis.call('LLEN', KEYS[3])
+if claimed > 0 then return claimed end
+local lines = redis.call('LRANGE', KEYS[2], 0, tonumber(ARGV[2]) - 1)
+if #lines == 0 then return 0 end
+redis.call('RPUSH', KEYS[3], unpack(lines))
+redis.call('LTRIM', KEYS[2], #lines, -1)
+if redis.call('LLEN', KEYS[2]) > 0 then
+  redis.call('SET', KEYS[4], ARGV[3])
+else
+  redis.call('DEL', KEYS[4])
+end
+return #lines
+`;
+
+// Records the segment in the index and drops the processing list in one step.
+// Returns 0 when the lock was lost.
+const COMMIT_SCRIPT = `
+if redis.call('GET', KEYS[1]) ~= ARGV[1] then return 0 end
+redis.call('RPUSH', KEYS[3], ARGV[2])
+redis.call('DEL', KEYS[2])
+return 1
+`;
+
+const UNLOCK_SCRIPT = `
+if redis.call('GET', KEYS[1]) == ARGV[1] then return redis.call('DEL', KEYS[1]) end
+return 0
+`;
+
+let warnedNoRedis = false;
+
+/**
+ * Returns the Redis client when the segment log is enabled and usable, or
+ * null when submissions should be stored as individual metadata blobs.
+ */
+export function getFeedbackLog() {
+  if (logMode !== 'segments') return null;
+  const redis = getRedisClient();
+  if (!redis && !warnedNoRedis) {
+    warnedNoRedis = true;
+    console.warn('[FeedbackLog] FEEDBACK_LOG_MODE=segments needs Upstash Redis; writing one metadata blob per submission');
+  }
+  return redis;
+}
+
+function segmentPath(date, records) {
+  const iso = date.toISOString(); // 2025-09-06T23:07:01.123Z
+  const [day, time] = iso.split('T');
+  return `${LOG_PREFIX}segments/${day.replace(/-/g, '/')}/${time.slice(0, 12).replace(/[:.]/g, '')}-${records}.ndjson`;
+}
+
+// Upstash deserialises JSON values on read; records are stored as JSON strings either way
+function asLine(entry) {
+  return typeof entry === 'string' ? entry : JSON.stringify(entry);
+}
+
+async function writeIndex(redis) {
+  const segments = (await redis.lrange(KEYS.segments, 0, -1)).map(entry => JSON.parse(asLine(entry)));
+  const index = {
+    version: INDEX_VERSION,
+    updatedAt: new Date().toISOString(),
+    records: segments.reduce((total, segment) => total + segment.records, 0),
+    segments,
+  };
+  // Note: Random suffix is added by default to make URLs unguessable
+  const { url } = await put(`${LOG_PREFIX}index.json`, JSON.stringify(index), {
+    access: 'public',
+    contentType: 'application/json',
+    addRandomSuffix: true,
+  });
+  const previousUrl = await redis.getset(KEYS.indexUrl, url);
+  if (previousUrl && previousUrl !== url) {
+    await del(previousUrl).catch(error => console.warn('[FeedbackLog] Could not delete old index:', error?.message));
+  }
+  return url;
+}
+
+/**
+ * Writes up to MAX_SEGMENT_RECORDS buffered records as one segment and adds
+ * it to the index. Only one flush runs at a time across instances.
+ * @param {{force?: boolean}} [options] - Flush even below the thresholds
+ * @returns {Promise<object|null>} The new segment's index entry, or null
+ */
+export async function flushFeedbackLog(redis, { force = false } = {}) {
+  const token = uuidv4();
+  const locked = await redis.set(KEYS.lock, token, { nx: true, px: LOCK_TTL_MS });
+  if (!locked) return null;
+
+  try {
+    // Records left behind by a crashed flush are written regardless of the thresholds
+    const recovering = (await redis.llen(KEYS.processing)) > 0;
+    if (!recovering && !force) {
+      const buffered = await redis.llen(KEYS.buffer);
+      if (!buffered || (buffered < FLUSH_RECORDS && !(await bufferIsStale(redis)))) {
+        return null;
+      }
+    }
+
+    const claimed = await redis.eval(
+      CLAIM_SCRIPT,
+      [KEYS.lock, KEYS.buffer, KEYS.processing, KEYS.since],
+      [token, String(MAX_SEGMENT_RECORDS), String(Date.now())]
+    );
+    if (claimed <= 0) return null;
+
+    const lines = (await redis.lrange(KEYS.processing, 0, -1)).map(asLine);
+    const records = lines.map(line => JSON.parse(line));
+    const firstAt = records[0].createdAt;
+    const lastAt = records[records.length - 1].createdAt;
+    const body = `${lines.join('\n')}\n`;
+    const { url, pathname } = await put(segmentPath(new Date(firstAt), records.length), body, {
+      access: 'public',
+      contentType: 'application/x-ndjson',
+      addRandomSuffix: true,
+    });
+
+    const segment = {
+      url,
+      pathname,
+      records: records.length,
+      bytes: Buffer.byteLength(body),
+      firstAt,
+      lastAt,
+      flushedAt: new Date().toISOString(),
+    };
+    // The claimed records stay in the processing list until the segment is indexed.
+    // A crash before this point makes the next flush write them again.
+    const committed = await redis.eval(
+      COMMIT_SCRIPT,
+      [KEYS.lock, KEYS.processing, KEYS.segments],
+      [token, JSON.stringify(segment)]
+    );
+    if (!committed) {
+      // The lock expired and another flush owns these records now; drop our copy
+      console.warn(`[FeedbackLog] Flush lock lost before ${pathname} was indexed; discarding it`);
+      await del(url).catch(error => console.warn('[FeedbackLog] Could not delete unindexed segment:', error?.message));
+      return null;
+    }
+    if (recovering) {
+      console.warn(`[FeedbackLog] Recovered ${records.length} records from an interrupted flush`);
+    }
+
+    await writeIndex(redis);
+    console.log(`[FeedbackLog] Flushed ${records.length} records to ${pathname}`);
+    return segment;
+  } finally {
+    await redis.eval(UNLOCK_SCRIPT, [KEYS.lock], [token]);
+  }
+}
+
+async function bufferIsStale(redis) {
+  const since = Number(await redis.get(KEYS.since));
+  return since > 0 && Date.now() - since >= FLUSH_SECONDS * 1000;
+}
+
+/**
+ * Appends one feedback record to the buffer and flushes a segment when the
+ * buffer is full or old enough.
+ * @param {object} metadata - The fields that used to go into feedback-meta-*.json
+ * @returns {Promise<{recordId: string, segment: object|null}>}
+ */
+export async function appendFeedbackRecord(redis, metadata) {
+  const record = { recordId: uuidv4(), ...metadata };
+  const length = await redis.rpush(KEYS.buffer, JSON.stringify(record));
+  if (length === 1) {
+    await redis.set(KEYS.since, Date.now());
+  }
+
+  let segment = null;
+  if (length >= FLUSH_RECORDS || await bufferIsStale(redis)) {
+    try {
+      segment = await flushFeedbackLog(redis);
+    } catch (error) {
+      // The record is safely buffered; the next submission or the cron flush retries
+      console.error('[FeedbackLog] Flush failed:', error);
+    }
+  }
+  return { recordId: record.recordId, segment };
+}
@@ -0,0 +1,172 @@
+import http from 'http';
+import https from 'https';
+import http2 from 'http2';
+
+// Persistent connections to Pinecone hosts. Each origin gets its own
+// keep-alive Agent (HTTP/1.1) or a shared session (HTTP/2 with
+// PINECONE_HTTP2=true), so a warm instance stops paying TCP/TLS handshakes
+// per query. Per-origin counters show how often a connection was reused.
+const POOL_SIZE = parseInt(process.env.PINECONE_POOL_SIZE || '8', 10);
+const KEEPALIVE_MS = parseInt(process.env.PINECONE_KEEPALIVE_MS || '15000', 10);
+const useHttp2 = process.env.PINECONE_HTTP2 === 'true';
+
+const agents = new Map();
+const sessions = new Map();
+const stats = new Map();
+
+function statsFor(origin) {
+  let entry = stats.get(origin);
+  if (!entry) {
+    entry = { requests: 0, reused: 0, newConnections: 0, errors: 0 };
+    stats.set(origin, entry);
+  }
+  return entry;
+}
+
+function getAgent(url) {
+  let agent = agents.get(url.origin);
+  if (!agent) {
+    const Agent = url.protocol === 'http:' ? http.Agent : https.Agent;
+    agent = new Agent({
+      keepAlive: true,
+      keepAliveMsecs: KEEPALIVE_MS,
+      maxSockets: POOL_SIZE,
+      maxFreeSockets: POOL_SIZE,
+      // Reuse the most recently used socket first; it is the least likely to have been closed by the server
+      scheduling: 'lifo',
+    });
+    agents.set(url.origin, agent);
+  }
+  return agent;
+}
+
+function getSession(origin) {
+  const existing = sessions.get(origin);
+  if (existing && !existing.closed && !existing.destroyed) {
+    return { session: existing, reused: true };
+  }
+
+  const session = http2.connect(origin);
+  const forget = () => {
+    if (sessions.get(origin) === session) sessions.delete(origin);
+  };
+  session.on('error', forget);
+  session.on('close', forget);
+  session.on('goaway', forget);
+  session.setTimeout(KEEPALIVE_MS * 4, () => session.close());
+  // An idle session must not keep the process alive
+  session.unref();
+  sessions.set(origin, session);
+  return { session, reused: false };
+}
+
+function requestHttp1(url, { method, headers, body, signal }) {
+  return new Promise((resolve, reject) => {
+    const transport = url.protocol === 'http:' ? http : https;
+    const req = transport.request(url, {
+      method,
+      headers: body ? { ...headers, 'Content-Length': Buffer.byteLength(body) } : headers,
+      agent: getAgent(url),
+      signal,
+    }, res => {
+      const chunks = [];
+      res.on('data', chunk => chunks.push(chunk));
+      res.on('end', () => resolve({
+        status: res.statusCode,
+        body: Buffer.concat(chunks).toString('utf8'),
+        reused: req.reusedSocket,
+      }));
+      res.on('error', reject);
+    });
+    req.on('error', reject);
+    req.end(body);
+  });
+}
+
+function requestHttp2(url, { method, headers, body, signal }) {
+  return new Promise((resolve, reject) => {
+    const { session, reused } = getSession(url.origin);
+    const stream = session.request({
+      ':method': method,
+      ':path': `${url.pathname}${url.search}`,
+      ...Object.fromEntries(Object.entries(headers).map(([name, value]) => [name.toLowerCase(), value])),
+    });
+
+    const onAbort = () => {
+      stream.close(http2.constants.NGHTTP2_CANCEL);
+      reject(Object.assign(new Error('The operation was aborted'), { name: 'AbortError' }));
+    };
+    if (signal?.aborted) return onAbort();
+    signal?.addEventListener('abort', onAbort, { once: true });
+
+    let status = 0;
+    const chunks = [];
+    stream.on('response', responseHeaders => {
+      status = responseHeaders[':status'];
+    });
+    stream.on('data', chunk => chunks.push(chunk));
+    stream.on('end', () => {
+      signal?.removeEventListener('abort', onAbort);
+      resolve({ status, body: Buffer.concat(chunks).toString('utf8'), reused });
+    });
+    stream.on('error', error => {
+      signal?.removeEventListener('abort', onAbort);
+      reject(error);
+    });
+    stream.end(body);
+  });
+}
+
+/**
+ * Sends a request over the pooled connection for the URL's origin.
+ * @param {string} target - Absolute URL
+ * @param {{method: string, headers: object, body?: string, signal?: AbortSignal}} options
+ * @returns {Promise<{status: number, ok: boolean, body: string, reused: boolean}>}
+ */
+export async function pooledRequest(target, options) {
+  const url = new URL(target);
+  const entry = statsFor(url.origin);
+  entry.requests++;
+  try {
+    // HTTP/2 needs TLS here; plain http:// hosts (local stand-ins) stay on HTTP/1.1
+    const response = useHttp2 && url.protocol === 'https:'
+      ? await requestHttp2(url, options)
+      : await requestHttp1(url, options);
+    if (response.reused) entry.reused++;
+    else entry.newConnections++;
+    return { ...response, ok: response.status >= 200 && response.status < 300 };
+  } catch (error) {
+    entry.errors++;
+    throw error;
+  }
+}
+
+/**
+ * Opens connections to the given hosts ahead of the first query, e.g. on
+ * cold start. Failures are only logged; queries reconnect on their own.
+ * @param {string[]} origins - Absolute URLs or origins
+ * @param {object} headers - Sent with the warm-up request (e.g. the API key)
+ */
+export function warmUpConnections(origins, headers) {
+  const unique = [...new Set(origins.map(origin => new URL(origin).origin))];
+  return Promise.allSettled(unique.map(async origin => {
+    const startedAt = Date.now();
+    try {
+      const response = await pooledRequest(`${origin}/describe_index_stats`, { method: 'GET', headers });
+      console.log(`[Pool] Warmed up ${origin} in ${Date.now() - startedAt} ms (status ${response.status})`);
+    } catch (error) {
+      console.warn(`[Pool] Warm-up failed for ${origin}: ${error.message}`);
+    }
+  }));
+}
+
+/**
+ * Connection-reuse counters per origin since the instance started.
+ * @returns {Object<string, {requests: number, reused: number, newConnections: number, errors: number, reuseRatio: number}>}
+ */
+export function getPoolStats() {
+  return Object.fromEntries([...stats].map(([origin, entry]) => {
+    const completed = entry.reused + entry.newConnections;
+    return [origin, { ...entry, reuseRatio: completed ? entry.reused / completed : 0 }];
+  }));
+}
@@ -0,0 +1,70 @@
+import { existsSync, readFileSync } from 'fs';
+import path from 'path';
+import { decodeFloat16 } from './embedding.js';
+
+// Precomputed "more like this" table written by db_manager/knn_table.py:
+// (count, k) little-endian int32 catalog rows and float16 scores, best first.
+const FORMAT_VERSION = 1;
+const tableCache = new Map();
+
+function readTyped(filePath, TypedArray) {
+  const data = readFileSync(filePath);
+  return new TypedArray(data.buffer.slice(data.byteOffset, data.byteOffset + data.byteLength));
+}
+
+function loadKnnTable(dir) {
+  const resolvedDir = path.resolve(process.cwd(), dir);
+  const headerPath = path.join(resolvedDir, 'header.json');
+  if (!existsSync(headerPath)) return null;
+
+  const header = JSON.parse(readFileSync(headerPath, 'utf8'));
+  if (header.version !== FORMAT_VERSION) {
+    throw new Error(`Unsupported k-NN table version in ${dir}: ${header.version}`);
+  }
+
+  const neighbors = readTyped(path.join(resolvedDir, 'neighbors.bin'), Int32Array);
+  const scores = decodeFloat16(readTyped(path.join(resolvedDir, 'scores.bin'), Uint16Array));
+  if (neighbors.length !== header.count * header.k || scores.length !== neighbors.length) {
+    throw new Error(`k-NN table files in ${dir} do not match its header`);
+  }
+
+  console.log(`[KNN] Loaded ${header.k}-NN table for ${header.count} items from ${dir}`);
+  return { ...header, neighbors, scores };
+}
+
+/**
+ * Returns the k-NN table in dir (relative to the project root), or null when
+ * it has not been deployed. Loaded once per instance.
+ * @param {string} dir
+ */
+export function getKnnTable(dir) {
+  if (!tableCache.has(dir)) {
+    tableCache.set(dir, loadKnnTable(dir));
+  }
+  return tableCache.get(dir);
+}
+
+/**
+ * Looks up the stored neighbours of an item in O(1).
+ * @returns {Array<{id: string, score: number, freesound_url: string}>|null} null when the id is unknown
+ */
+export function lookupSimilar(table, catalog, itemId, topK) {
+  if (table.fingerprint !== catalog.fingerprint) {
+    throw new Error('The k-NN table and the catalog side table were built from different data');
+  }
+
+  const row = catalog.rowOf(itemId);
+  if (row === undefined) return null;
+
+  const results = [];
+  const start = row * table.k;
+  for (let j = 0; j < Math.min(topK, table.k); j++) {
+    const neighbor = table.neighbors[start + j];
+    results.push({
+      id: catalog.id(neighbor),
+      score: table.scores[start + j],
+      freesound_url: catalog.url(neighbor),
+    });
+  }
+  return results;
+}
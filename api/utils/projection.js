@@ -0,0 +1,77 @@
+import { readFileSync } from 'fs';
+import path from 'path';
+
+// Dimensionality-reduction artifacts written by db_manager/projection.py:
+// a JSON header plus a raw little-endian float32 file holding the mean
+// (inputDim) followed by the components (outputDim x inputDim, row-major).
+const FORMAT_VERSION = 1;
+const projectionCache = new Map();
+
+function loadProjection(headerPath) {
+  const resolvedPath = path.resolve(process.cwd(), headerPath);
+  const header = JSON.parse(readFileSync(resolvedPath, 'utf8'));
+  if (header.version !== FORMAT_VERSION) {
+    throw new Error(`Unsupported projection version in ${headerPath}: ${header.version}`);
+  }
+  if (header.dtype !== 'float32' || header.byteOrder !== 'little') {
+    throw new Error(`Projection ${headerPath} must be little-endian float32`);
+  }
+
+  const data = readFileSync(path.join(path.dirname(resolvedPath), header.dataFile));
+  const { inputDim, outputDim } = header;
+  if (data.byteLength !== 4 * inputDim * (outputDim + 1)) {
+    throw new Error(`${header.dataFile} does not match the dimensions in ${headerPath}`);
+  }
+
+  // Copy into a fresh, aligned buffer; Node may hand back a slice of a shared pool.
+  const values = new Float32Array(data.buffer.slice(data.byteOffset, data.byteOffset + data.byteLength));
+  console.log(`[Projection] Loaded ${header.method} projection ${inputDim} -> ${outputDim} from ${headerPath}`);
+  return {
+    inputDim,
+    outputDim,
+    mean: values.subarray(0, inputDim),
+    components: values.subarray(inputDim),
+  };
+}
+
+/**
+ * Returns the projection stored at headerPath (relative to the project root),
+ * loading it on first use and keeping it for the lifetime of the instance.
+ * @param {string|undefined} headerPath
+ * @returns {object|null} null when no path is given
+ */
+export function getProjection(headerPath) {
+  if (!headerPath) return null;
+  if (!projectionCache.has(headerPath)) {
+    projectionCache.set(headerPath, loadProjection(headerPath));
+  }
+  return projectionCache.get(headerPath);
+}
+
+/**
+ * Reduces an embedding: components @ (embedding - mean).
+ * @param {number[]} embedding - Must have projection.inputDim values
+ * @returns {number[]} outputDim values, ready to send to Pinecone
+ */
+export function projectEmbedding(projection, embedding) {
+  const { inputDim, outputDim, mean, components } = projection;
+  if (embedding.length !== inputDim) {
+    throw new RangeError(`Embedding has ${embedding.length} values, the projection expects ${inputDim}`);
+  }
+
+  const centered = new Float32Array(inputDim);
+  for (let j = 0; j < inputDim; j++) {
+    centered[j] = embedding[j] - mean[j];
+  }
+
+  const reduced = new Array(outputDim);
+  for (let i = 0; i < outputDim; i++) {
+    const row = i * inputDim;
+    let sum = 0;
+    for (let j = 0; j < inputDim; j++) {
+      sum += components[row + j] * centered[j];
+    }
+    reduced[i] = sum;
+  }
+  return reduced;
+}
@@ -1,6 +1,24 @@
 import { Ratelimit } from '@upstash/ratelimit';
 import { Redis } from '@upstash/redis';
 
+// Search API: 10 requests per minute per IP
+const SEARCH_LIMIT = 10;
+const SEARCH_WINDOW_MS = 60_000;
+
+// Local tier for the search limit: an in-process token bucket per IP answers
+// the obvious cases, and Upstash is only consulted synchronously near the limit.
+// Locally allowed requests are counted in Upstash in batches, once SYNC_MS has
+// passed: by a timer while the instance runs, or by the next request after a freeze.
+// While Upstash is down, unsynced counts are capped at the limit, retried with
+// backoff and dropped once they fall out of the window.
+const tieredSearchLimit = process.env.SEARCH_RATELIMIT_TIERED !== 'false';
+const SYNC_MS = parseInt(process.env.SEARCH_RATELIMIT_SYNC_MS || '2000', 10);
+// Ask Upstash before allowing a request that would leave fewer than this many requests
+const NEAR_LIMIT_MARGIN = parseInt(process.env.SEARCH_RATELIMIT_MARGIN || '3', 10);
+// How long an Upstash answer is trusted for the estimate (other instances keep counting)
+const SNAPSHOT_TTL_MS = parseInt(process.env.SEARCH_RATELIMIT_SNAPSHOT_MS || '10000', 10);
+const MAX_TRACKED_CLIENTS = 10000;
+
 // Initialize Redis client
 // Upstash automatically reads UPSTASH_REDIS_REST_URL and UPSTASH_REDIS_REST_TOKEN from env
 let redis;
@@ -11,10 +29,9 @@ if (process.env.UPSTASH_REDIS_REST_URL && process.env.UPSTASH_REDIS_REST_TOKEN)
   try {
     redis = Redis.fromEnv();
     
-    // Search API: 10 requests per minute per IP
     searchRateLimiter = new Ratelimit({
       redis,
-      limiter: Ratelimit.slidingWindow(10, '1 m'),
+      limiter: Ratelimit.slidingWindow(SEARCH_LIMIT, `${SEARCH_WINDOW_MS / 1000} s`),
       analytics: true,
       prefix: 'ratelimit:search',
     });
@@ -33,6 +50,14 @@ if (process.env.UPSTASH_REDIS_REST_URL && process.env.UPSTASH_REDIS_REST_TOKEN)
   console.warn('Rate limiting not configured. Missing UPSTASH_REDIS_REST_URL or UPSTASH_REDIS_REST_TOKEN.');
 }
 
+/**
+ * Shared Upstash Redis client, or null when Upstash is not configured.
+ * Other utilities (e.g. the search result cache) reuse this connection.
+ */
+export function getRedisClient() {
+  return redis || null;
+}
+
 /**
  * Get client IP from request, handling Vercel's forwarded headers
  */
@@ -54,25 +79,180 @@ export function getClientIp(req) {
   return req.socket?.remoteAddress || 'unknown';
 }
 
+async function limitSearchInRedis(identifier, cost) {
+  try {
+    return await searchRateLimiter.limit(identifier, { rate: cost });
+  } catch (error) {
+    console.error('[RateLimit] Upstash Redis failure for Search API:', error);
+    // Fail-open strategy: allow the request if the rate limiter is down
+    return { success: true, limit: 0, remaining: 0, reset: 0 };
+  }
+}
+
+// Per-IP state of the local tier: token bucket, last Upstash answer, and
+// locally allowed requests not yet counted in Upstash
+const searchClients = new Map();
+let flushTimer = null;
+let flushDueAt = 0;
+// Consecutive flushes that could not reach Upstash; each one doubles the retry delay
+let flushFailures = 0;
+
+function getSearchClient(identifier, now) {
+  let client = searchClients.get(identifier);
+  if (client) {
+    const refill = ((now - client.updatedAt) / SEARCH_WINDOW_MS) * SEARCH_LIMIT;
+    client.tokens = Math.min(SEARCH_LIMIT, client.tokens + refill);
+    client.updatedAt = now;
+    return client;
+  }
+
+  if (searchClients.size >= MAX_TRACKED_CLIENTS) {
+    // Forget the oldest client that has nothing left to sync
+    for (const [key, entry] of searchClients) {
+      if (!entry.pending) {
+        searchClients.delete(key);
+        break;
+      }
+    }
+  }
+  client = { tokens: SEARCH_LIMIT, updatedAt: now, snapshot: null, pending: 0, pendingSince: 0 };
+  searchClients.set(identifier, client);
+  return client;
+}
+
+function addPending(client, cost, since) {
+  client.pendingSince = client.pending ? Math.min(client.pendingSince, since) : since;
+  // More than the limit would only lock the client out for longer than one window
+  client.pending = Math.min(SEARCH_LIMIT, client.pending + cost);
+}
+
 /**
- * Check rate limit for search API
+ * Applies an Upstash answer to the local state.
+ * @returns {boolean} false for the fail-open placeholder, whose cost is kept as pending
+ */
+function recordRedisResult(client, result, syncedCost, since) {
+  if (!result.limit) {
+    // Fail-open placeholder: Upstash never saw these requests, so keep them for the next sync
+    addPending(client, syncedCost, since);
+    return false;
+  }
+  client.snapshot = { remaining: result.remaining, reset: result.reset, at: Date.now() };
+  // Never hand out more locally than Upstash says is left
+  client.tokens = Math.min(client.tokens, result.remaining);
+  return true;
+}
+
+async function flushPendingSearchCounts() {
+  clearTimeout(flushTimer);
+  flushTimer = null;
+  flushDueAt = 0;
+  const now = Date.now();
+  const synced = await Promise.all([...searchClients].filter(([, client]) => client.pending).map(async ([identifier, client]) => {
+    const { pending: cost, pendingSince: since } = client;
+    client.pending = 0;
+    if (now - since >= SEARCH_WINDOW_MS) {
+      // Requests older than the sliding window no longer count against the client
+      return true;
+    }
+    return recordRedisResult(client, await limitSearchInRedis(identifier, cost), cost, since);
+  }));
+
+  if (synced.every(Boolean)) {
+    flushFailures = 0;
+  } else {
+    // Upstash is down: retry with backoff instead of every SYNC_MS
+    flushFailures++;
+    scheduleFlush();
+  }
+}
+
+function scheduleFlush() {
+  if (flushTimer) return;
+  const delay = Math.min(SYNC_MS * 2 ** flushFailures, SEARCH_WINDOW_MS);
+  flushDueAt = Date.now() + delay;
+  flushTimer = setTimeout(flushPendingSearchCounts, delay);
+  // Pending counts must not keep an otherwise idle process alive
+  flushTimer.unref?.();
+}
+
+/**
+ * Sends pending counts if the sync interval has passed. Timers do not fire
+ * while a serverless instance is frozen between requests, so every request
+ * checks this before relying on the timer.
+ */
+function flushIfDue(now) {
+  if (flushDueAt && now >= flushDueAt) {
+    flushPendingSearchCounts();
+  }
+}
+
+/**
+ * Starts the search rate limit check. Returns { local } when this instance
+ * could decide on its own, or { remote } with the pending Upstash check when
+ * the client is near the limit (or the local tier is disabled).
  * @param {string} identifier - Usually the IP address
- * @returns {Promise<{success: boolean, limit: number, remaining: number, reset: number}>}
+ * @param {number} [cost=1] - Requests to count, e.g. the number of embeddings in a batch
+ * @returns {{local: object|null, remote: Promise<object>|null}}
  */
-export async function checkSearchRateLimit(identifier) {
+export function startSearchRateLimit(identifier, cost = 1) {
   if (!searchRateLimiter) {
     // If rate limiting is not configured, allow all requests
     console.warn('[RateLimit] Search rate limiter not initialized, allowing request');
-    return { success: true, limit: 0, remaining: 0, reset: 0 };
+    return { local: { success: true, limit: 0, remaining: 0, reset: 0 }, remote: null };
   }
-  
-  try {
-    return await searchRateLimiter.limit(identifier);
-  } catch (error) {
-    console.error('[RateLimit] Upstash Redis failure for Search API:', error);
-    // Fail-open strategy: allow the request if the rate limiter is down
-    return { success: true, limit: 0, remaining: 0, reset: 0 };
+  if (!tieredSearchLimit) {
+    return { local: null, remote: limitSearchInRedis(identifier, cost) };
+  }
+
+  const now = Date.now();
+  flushIfDue(now);
+  const client = getSearchClient(identifier, now);
+
+  // This instance alone has already seen too many requests: Upstash would say no as well
+  if (client.tokens < cost) {
+    const refillMs = Math.ceil(((cost - client.tokens) / SEARCH_LIMIT) * SEARCH_WINDOW_MS);
+    const reset = client.snapshot && client.snapshot.reset > now ? client.snapshot.reset : now + refillMs;
+    return { local: { success: false, limit: SEARCH_LIMIT, remaining: 0, reset }, remote: null };
   }
+  client.tokens -= cost;
+
+  const snapshot = client.snapshot;
+  const known = snapshot && now < snapshot.reset && now - snapshot.at < SNAPSHOT_TTL_MS;
+  const estimatedRemaining = known
+    ? snapshot.remaining - client.pending - cost
+    : Math.floor(client.tokens);
+
+  if (estimatedRemaining >= NEAR_LIMIT_MARGIN) {
+    addPending(client, cost, now);
+    scheduleFlush();
+    return {
+      local: { success: true, limit: SEARCH_LIMIT, remaining: estimatedRemaining, reset: known ? snapshot.reset : now + SEARCH_WINDOW_MS },
+      remote: null,
+    };
+  }
+
+  // Near the limit: let Upstash decide, counting what this instance has not synced yet
+  const syncedCost = client.pending + cost;
+  const since = client.pending ? client.pendingSince : now;
+  client.pending = 0;
+  const remote = limitSearchInRedis(identifier, syncedCost).then(result => {
+    if (!recordRedisResult(client, result, syncedCost, since)) {
+      scheduleFlush();
+    }
+    return result;
+  });
+  return { local: null, remote };
+}
+
+/**
+ * Check rate limit for search API
+ * @param {string} identifier - Usually the IP address
+ * @param {number} [cost=1] - Requests to count, e.g. the number of embeddings in a batch
+ * @returns {Promise<{success: boolean, limit: number, remaining: number, reset: number}>}
+ */
+export async function checkSearchRateLimit(identifier, cost = 1) {
+  const { local, remote } = startSearchRateLimit(identifier, cost);
+  return local || remote;
 }
 
 /**
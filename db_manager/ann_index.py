@@ -0,0 +1,285 @@
+import os
+import json
+import time
+import argparse
+import numpy as np
+from embedding_store import PACKED_DIR, PackedEmbeddings
+from local_search import TOP_K_MATCHES, ExactSearch, format_results, load_normalized_matrix, normalize_rows
+
+# --- Configuration ---
+ANN_DIR = "../data/ann_index"
+FORMAT_VERSION = 1
+DEFAULT_NPROBE = 8
+KMEANS_ITERATIONS = 20
+TRAIN_POINTS_PER_LIST = 64
+PQ_CENTROIDS = 256
+CHUNK_ROWS = 8192
+
+# File layout inside an index directory (all .npy files are memory-mappable):
+#   header.json       -> {"version", "kind", "count", "dim", "n_lists", "pq_m"}
+#   centroids.npy     -> (n_lists, dim) unit-norm coarse centroids
+#   list_offsets.npy  -> (n_lists + 1,) start of each inverted list in list order
+#   list_rows.npy     -> (count,) packed-store row of each entry, in list order
+#   list_vectors.npy  -> (count, dim) normalised vectors in list order   (IVF-Flat)
+#   pq_codebooks.npy  -> (pq_m, 256, dim / pq_m) residual codebooks        (IVF-PQ)
+#   pq_codes.npy      -> (count, pq_m) uint8 codes in list order           (IVF-PQ)
+HEADER_FILE = "header.json"
+
+
+def _assign(data, centroids, spherical):
+    """
+    Nearest centroid for each row of `data`, chunked to bound memory.
+    """
+    labels = np.empty(data.shape[0], dtype=np.int64)
+    centroid_norms = None if spherical else (centroids ** 2).sum(axis=1)
+    for start in range(0, data.shape[0], CHUNK_ROWS):
+        scores = np.asarray(data[start:start + CHUNK_ROWS], dtype=np.float32) @ centroids.T
+        if not spherical:
+            scores = 2 * scores - centroid_norms
+        labels[start:start + CHUNK_ROWS] = scores.argmax(axis=1)
+    return labels
+
+
+def kmeans(data, k, iterations=KMEANS_ITERATIONS, spherical=True, seed=0):
+    """
+    Lloyd's k-means. With spherical=True, centroids are kept unit-norm and
+    assignment uses inner product (cosine); otherwise squared L2 distance.
+    Cluster sums are computed with a one-hot matrix multiply per chunk.
+    """
+    rng = np.random.default_rng(seed)
+    data = np.asarray(data, dtype=np.float32)
+    k = min(k, data.shape[0])
+    centroids = data[rng.choice(data.shape[0], k, replace=False)].copy()
+
+    for _ in range(iterations):
+        labels = _assign(data, centroids, spherical)
+        sums = np.zeros_like(centroids)
+        counts = np.bincount(labels, minlength=k)
+        for start in range(0, data.shape[0], CHUNK_ROWS):
+            chunk_labels = labels[start:start + CHUNK_ROWS]
+            one_hot = np.zeros((chunk_labels.shape[0], k), dtype=np.float32)
+            one_hot[np.arange(chunk_labels.shape[0]), chunk_labels] = 1
+            sums += one_hot.T @ data[start:start + CHUNK_ROWS]
+
+        empty = counts == 0
+        centroids = sums / np.maximum(counts, 1)[:, None]
+        if empty.any():
+            # Re-seed empty clusters with random points so every list stays useful.
+            centroids[empty] = data[rng.choice(data.shape[0], int(empty.sum()), replace=False)]
+        if spherical:
+            centroids = normalize_rows(centroids)
+    return centroids.astype(np.float32)
+
+
+def _encode_pq(residuals, codebooks):
+    m, _, dsub = codebooks.shape
+    codes = np.empty((residuals.shape[0], m), dtype=np.uint8)
+    for j in range(m):
+        codes[:, j] = _assign(residuals[:, j * dsub:(j + 1) * dsub], codebooks[j], spherical=False)
+    return codes
+
+
+def build_ivf_index(store, out_dir=ANN_DIR, n_lists=None, pq_m=0, iterations=KMEANS_ITERATIONS, seed=0):
+    """
+    Builds an IVF index (optionally with product-quantised residuals) over the
+    normalised vectors of a packed store and writes it to `out_dir`.
+    """
+    matrix = load_normalized_matrix(store)
+    count, dim = matrix.shape
+    n_lists = n_lists or max(1, int(4 * np.sqrt(count)))
+    if pq_m and dim % pq_m:
+        raise ValueError(f"--pq {pq_m} must divide the embedding dimension {dim}")
+
+    rng = np.random.default_rng(seed)
+    train_size = min(count, TRAIN_POINTS_PER_LIST * n_lists)
+    train_rows = np.sort(rng.choice(count, train_size, replace=False))
+    train = np.asarray(matrix[train_rows], dtype=np.float32)
+
+    print(f"Training {n_lists} coarse centroids on {train_size} vectors...")
+    centroids = kmeans(train, n_lists, iterations, spherical=True, seed=seed)
+    n_lists = centroids.shape[0]
+
+    print("Assigning vectors to inverted lists...")
+    labels = _assign(matrix, centroids, spherical=True)
+    order = np.argsort(labels, kind="stable")
+    offsets = np.concatenate([[0], np.cumsum(np.bincount(labels, minlength=n_lists))]).astype(np.int64)
+
+    os.makedirs(out_dir, exist_ok=True)
+    np.save(os.path.join(out_dir, "centroids.npy"), centroids)
+    np.save(os.path.join(out_dir, "list_offsets.npy"), offsets)
+    np.save(os.path.join(out_dir, "list_rows.npy"), order.astype(np.int64))
+
+    if pq_m:
+        dsub = dim // pq_m
+        print(f"Training {pq_m} PQ codebooks on residuals...")
+        residuals = train - centroids[_assign(train, centroids, spherical=True)]
+        codebooks = np.stack([
+            kmeans(residuals[:, j * dsub:(j + 1) * dsub], PQ_CENTROIDS, iterations, spherical=False, seed=seed + j)
+            for j in range(pq_m)
+        ])
+        if codebooks.shape[1] < PQ_CENTROIDS:
+            raise ValueError(f"PQ needs at least {PQ_CENTROIDS} training vectors")
+        np.save(os.path.join(out_dir, "pq_codebooks.npy"), codebooks)
+
+        codes = np.lib.format.open_memmap(
+            os.path.join(out_dir, "pq_codes.npy"), mode="w+", dtype=np.uint8, shape=(count, pq_m)
+        )
+        for start in range(0, count, CHUNK_ROWS):
+            rows = order[start:start + CHUNK_ROWS]
+            chunk = np.asarray(matrix[rows], dtype=np.float32)
+            codes[start:start + CHUNK_ROWS] = _encode_pq(chunk - centroids[labels[rows]], codebooks)
+        codes.flush()
+        del codes
+    else:
+        vectors = np.lib.format.open_memmap(
+            os.path.join(out_dir, "list_vectors.npy"), mode="w+", dtype=np.float32, shape=(count, dim)
+        )
+        for start in range(0, count, CHUNK_ROWS):
+            vectors[start:start + CHUNK_ROWS] = matrix[order[start:start + CHUNK_ROWS]]
+        vectors.flush()
+        del vectors
+
+    header = {"version": FORMAT_VERSION, "kind": "ivf-pq" if pq_m else "ivf-flat",
+              "count": count, "dim": dim, "n_lists": n_lists, "pq_m": pq_m}
+    with open(os.path.join(out_dir, HEADER_FILE), "w", encoding="utf-8") as f:
+        json.dump(header, f)
+    print(f"Wrote {header['kind']} index with {n_lists} lists to {out_dir}.")
+    return header
+
+
+class IVFIndex:
+    """
+    Memory-mapped IVF / IVF-PQ index. A query scores the coarse centroids,
+    scans the `nprobe` closest inverted lists and, for IVF-PQ, optionally
+    re-ranks the best candidates with exact vectors from the packed store.
+    """
+
+    def __init__(self, path=ANN_DIR, store=None):
+        with open(os.path.join(path, HEADER_FILE), "r", encoding="utf-8") as f:
+            self.header = json.load(f)
+        if self.header.get("version") != FORMAT_VERSION:
+            raise ValueError(f"Unsupported ANN index version: {self.header.get('version')}")
+
+        self.store = store if store is not None else PackedEmbeddings(PACKED_DIR)
+        if len(self.store) != self.header["count"]:
+            raise ValueError("The ANN index was built for a different packed store. Rebuild it.")
+
+        load = lambda name: np.load(os.path.join(path, name), mmap_mode="r")  # noqa: E731
+        self.centroids = np.asarray(load("centroids.npy"))
+        self.offsets = np.asarray(load("list_offsets.npy"))
+        self.list_rows = load("list_rows.npy")
+        self.is_pq = self.header["kind"] == "ivf-pq"
+        if self.is_pq:
+            self.codebooks = np.asarray(load("pq_codebooks.npy"))
+            self.codes = load("pq_codes.npy")
+            self.exact = load_normalized_matrix(self.store)
+        else:
+            self.list_vectors = load("list_vectors.npy")
+
+    def _candidates(self, query, probes):
+        """
+        Returns (positions in list order, approximate scores) for the probed lists.
+        """
+        spans = [(int(self.offsets[p]), int(self.offsets[p + 1])) for p in probes]
+        positions = np.concatenate([np.arange(a, b) for a, b in spans]) if spans else np.zeros(0, np.int64)
+        if not self.is_pq:
+            scores = np.concatenate([np.asarray(self.list_vectors[a:b]) @ query for a, b in spans])
+            return positions, scores
+
+        m, _, dsub = self.codebooks.shape
+        lookup = np.einsum("mkd,md->mk", self.codebooks, query.reshape(m, dsub))
+        coarse = self.centroids[probes] @ query
+        scores = []
+        for (a, b), base in zip(spans, coarse):
+            codes = np.asarray(self.codes[a:b])
+            scores.append(base + lookup[np.arange(m), codes].sum(axis=1))
+        return positions, np.concatenate(scores) if scores else np.zeros(0, np.float32)
+
+    def search(self, queries, top_k=TOP_K_MATCHES, nprobe=DEFAULT_NPROBE, rerank=0):
+        """
+        Returns (row indices, scores) like ExactSearch.search(). For IVF-PQ,
+        `rerank` > 0 re-scores that many PQ candidates with exact vectors.
+        """
+        queries = normalize_rows(np.atleast_2d(queries))
+        nprobe = min(nprobe, self.centroids.shape[0])
+        coarse = queries @ self.centroids.T
+        all_rows = np.full((queries.shape[0], top_k), -1, dtype=np.int64)
+        all_scores = np.full((queries.shape[0], top_k), -np.inf, dtype=np.float32)
+
+        for qi, query in enumerate(queries):
+            probes = np.argpartition(-coarse[qi], nprobe - 1)[:nprobe]
+            positions, scores = self._candidates(query, probes)
+            if self.is_pq and rerank:
+                keep = np.argsort(-scores)[:max(rerank, top_k)]
+                rows = np.asarray(self.list_rows[positions[keep]])
+                order = np.argsort(rows)  # sorted reads are friendlier to the memory map
+                exact_scores = np.empty(len(rows), dtype=np.float32)
+                exact_scores[order] = np.asarray(self.exact[rows[order]]) @ query
+                positions, scores = positions[keep], exact_scores
+            best = np.argsort(-scores)[:top_k]
+            all_rows[qi, :len(best)] = self.list_rows[positions[best]]
+            all_scores[qi, :len(best)] = scores[best]
+        return all_rows, all_scores
+
+    def query(self, embedding, top_k=TOP_K_MATCHES, nprobe=DEFAULT_NPROBE, rerank=0):
+        """
+        Single query; returns [{id, score, freesound_url}] like /api/search.
+        """
+        rows, scores = self.search(np.asarray([embedding], dtype=np.float32), top_k, nprobe, rerank)
+        return format_results(self.store, [r for r in rows[0] if r >= 0], scores[0])
+
+
+def benchmark(index, exact, num_queries=200, top_k=TOP_K_MATCHES, nprobes=(1, 2, 4, 8, 16, 32), rerank=0, seed=0):
+    """
+    recall@k against exact search and queries/sec for each nprobe value.
+    Queries are held-out catalog items with the item itself excluded.
+    """
+    rng = np.random.default_rng(seed)
+    rows = rng.choice(len(exact.store), min(num_queries, len(exact.store)), replace=False)
+    queries = np.asarray(exact.store.vectors[np.sort(rows)], dtype=np.float32)
+    query_rows = np.sort(rows)
+
+    started = time.perf_counter()
+    truth, _ = exact.search(queries, top_k + 1)
+    exact_qps = len(queries) / (time.perf_counter() - started)
+    truth_sets = [set(t[t != r][:top_k].tolist()) for t, r in zip(truth, query_rows)]
+
+    results = [{"nprobe": "exact", "recall": 1.0, "qps": exact_qps}]
+    for nprobe in nprobes:
+        started = time.perf_counter()
+        found, _ = index.search(queries, top_k + 1, nprobe=nprobe, rerank=rerank)
+        qps = len(queries) / (time.perf_counter() - started)
+        recall = np.mean([
+            len(set(f[(f != r) & (f >= 0)][:top_k].tolist()) & t) / top_k
+            for f, r, t in zip(found, query_rows, truth_sets)
+        ])
+        results.append({"nprobe": nprobe, "recall": float(recall), "qps": qps})
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build and benchmark an IVF / IVF-PQ index over the packed store.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    build_parser = subparsers.add_parser("build", help="Build the index.")
+    build_parser.add_argument("--lists", type=int, help="Number of inverted lists (default: 4 * sqrt(count)).")
+    build_parser.add_argument("--pq", type=int, default=0, help="PQ sub-quantisers (0 = store full vectors).")
+    build_parser.add_argument("--iterations", type=int, default=KMEANS_ITERATIONS)
+
+    bench_parser = subparsers.add_parser("bench", help="Measure recall@k and QPS against exact search.")
+    bench_parser.add_argument("--queries", type=int, default=200)
+    bench_parser.add_argument("--top-k", type=int, default=TOP_K_MATCHES)
+    bench_parser.add_argument("--nprobe", default="1,2,4,8,16,32", help="Comma-separated nprobe values.")
+    bench_parser.add_argument("--rerank", type=int, default=0, help="Exact re-rank depth for IVF-PQ.")
+    args = parser.parse_args()
+
+    packed = PackedEmbeddings(PACKED_DIR)
+    if args.command == "build":
+        build_ivf_index(packed, ANN_DIR, args.lists, args.pq, args.iterations)
+    else:
+        ivf = IVFIndex(ANN_DIR, packed)
+        print(f"Benchmarking {ivf.header['kind']} index ({ivf.header['n_lists']} lists) "
+              f"with {args.queries} queries, recall@{args.top_k}:")
+        for row in benchmark(ivf, ExactSearch(packed), args.queries, args.top_k,
+                             [int(n) for n in args.nprobe.split(",")], args.rerank):
+            print(f"  nprobe {str(row['nprobe']):>6}: recall {row['recall']:.3f}  {row['qps']:8.1f} queries/sec")
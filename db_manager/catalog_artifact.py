@@ -0,0 +1,79 @@
+import os
+import json
+import argparse
+import numpy as np
+from embedding_store import PACKED_DIR, VECTORS_FILE, PackedEmbeddings
+
+# --- Configuration ---
+CATALOG_DIR = "../artifacts/catalog"
+FORMAT_VERSION = 1
+
+# Row-aligned id/url side table read by api/utils/catalog.js. Same idea as the
+# packed store's string columns, but with raw little-endian uint32 offsets so
+# Node can read it without an .npy parser:
+#   header.json                -> {"version", "count", "fingerprint", "sorted", "idBase"}
+#   ids.bin / urls.bin         -> UTF-8 strings concatenated back to back
+#   ids.offsets.bin / urls.offsets.bin -> (count + 1,) uint32 byte offsets
+#
+# "sorted" is true when ids ascend row by row, so lookups can binary-search.
+# "idBase" is set when ids are dense, equal-width integers (id of row i is
+# idBase + i, as for our 12-digit ids); lookups then compute the row directly.
+HEADER_FILE = "header.json"
+
+
+def _write_column(out_dir, name, values):
+    offsets = [0]
+    with open(os.path.join(out_dir, f"{name}.bin"), "wb") as f:
+        for value in values:
+            encoded = (value or "").encode("utf-8")
+            f.write(encoded)
+            offsets.append(offsets[-1] + len(encoded))
+    if offsets[-1] >= 2 ** 32:
+        raise ValueError(f"{name}.bin is too large for uint32 offsets")
+    np.asarray(offsets, dtype="<u4").tofile(os.path.join(out_dir, f"{name}.offsets.bin"))
+
+
+def catalog_fingerprint(store):
+    """
+    Cheap identity of the catalog (count, first/last ids, plus size and mtime
+    of the vectors file like upload.dataset_fingerprint()) so artifacts built
+    against a different or re-embedded store can be detected at load time.
+    """
+    if not len(store):
+        return "0"
+    stat = os.stat(os.path.join(store.path, VECTORS_FILE))
+    return f"{len(store)}:{store.id(0)}:{store.id(len(store) - 1)}:{stat.st_size}:{int(stat.st_mtime)}"
+
+
+def id_layout(ids):
+    """
+    Returns (sorted, id_base) for the id column; see the layout notes above.
+    """
+    is_sorted = all(a < b for a, b in zip(ids, ids[1:]))
+    id_base = None
+    if ids and all(i.isdigit() and len(i) == len(ids[0]) for i in ids):
+        first = int(ids[0])
+        if all(int(item_id) == first + row for row, item_id in enumerate(ids)):
+            id_base = first
+    return is_sorted, id_base
+
+
+def write_catalog(store, out_dir=CATALOG_DIR):
+    os.makedirs(out_dir, exist_ok=True)
+    ids = [store.id(i) for i in range(len(store))]
+    is_sorted, id_base = id_layout(ids)
+    _write_column(out_dir, "ids", ids)
+    _write_column(out_dir, "urls", (store.url(i) for i in range(len(store))))
+    with open(os.path.join(out_dir, HEADER_FILE), "w", encoding="utf-8") as f:
+        json.dump({"version": FORMAT_VERSION, "count": len(store), "fingerprint": catalog_fingerprint(store),
+                   "sorted": is_sorted, "idBase": id_base}, f)
+    print(f"Wrote catalog side table for {len(store)} items to {out_dir}.")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Write the id -> freesound_url side table for /api/search.")
+    parser.add_argument("--packed", default=PACKED_DIR, help="Packed store the index was uploaded from.")
+    parser.add_argument("--output", default=CATALOG_DIR, help="Output directory (a dev index's \"catalog\" entry).")
+    args = parser.parse_args()
+
+    write_catalog(PackedEmbeddings(args.packed), args.output)
@@ -0,0 +1,237 @@
+import os
+import json
+import shutil
+import numpy as np
+
+# --- Configuration ---
+PACKED_DIR = "../data/embeddings_packed"
+FORMAT_VERSION = 1
+
+# File layout inside a packed directory:
+#   header.json        -> {"version", "count", "dim", "dtype"}
+#   vectors.npy        -> (count, dim) matrix in `dtype`, memory-mappable
+#   vectors.scale.npy  -> (dim,) float32 per-dimension scale   (int8 only)
+#   vectors.offset.npy -> (dim,) float32 per-dimension offset  (int8 only)
+#   ids.bin / urls.bin -> UTF-8 strings concatenated back to back
+#   ids.offsets.npy    -> (count + 1,) uint64 byte offsets into ids.bin
+#   urls.offsets.npy   -> (count + 1,) uint64 byte offsets into urls.bin
+HEADER_FILE = "header.json"
+VECTORS_NAME = "vectors"
+VECTORS_FILE = f"{VECTORS_NAME}.npy"
+COPY_CHUNK_ROWS = 4096
+STORAGE_DTYPES = ("float32", "float16", "int8")
+
+
+class QuantizedMatrix:
+    """
+    Read-only float32 view over a float16 or int8 matrix on disk. Slicing
+    dequantises only the requested rows (int8: code * scale + offset), so
+    callers can keep scanning it block by block like a float32 memmap.
+    """
+
+    def __init__(self, codes, scale=None, offset=None):
+        self.codes = codes
+        self.scale = scale
+        self.offset = offset
+        self.shape = codes.shape
+        self.dtype = np.dtype(np.float32)
+
+    def __len__(self):
+        return self.shape[0]
+
+    def __getitem__(self, key):
+        values = np.asarray(self.codes[key], dtype=np.float32)
+        if self.scale is not None:
+            values = values * self.scale + self.offset
+        return values
+
+    def block_scores(self, queries, start, stop):
+        """
+        queries @ rows[start:stop].T without materialising dequantised rows:
+        for int8 the scale is folded into the queries and the offset becomes
+        one extra dot product per query.
+        """
+        block = np.asarray(self.codes[start:stop], dtype=np.float32)
+        if self.scale is None:
+            return queries @ block.T
+        return (queries * self.scale) @ block.T + (queries @ self.offset)[:, None]
+
+    def __array__(self, dtype=None, copy=None):
+        values = self[:]
+        return values if dtype is None else values.astype(dtype)
+
+    @property
+    def nbytes(self):
+        extra = 0 if self.scale is None else self.scale.nbytes + self.offset.nbytes
+        return self.codes.nbytes + extra
+
+
+def fit_int8_params(source, transform=None):
+    """
+    Per-dimension scale and offset mapping [min, max] of each column onto the
+    int8 range. One chunked pass, so `source` may be memory-mapped.
+    """
+    low = np.full(source.shape[1], np.inf, dtype=np.float32)
+    high = np.full(source.shape[1], -np.inf, dtype=np.float32)
+    for start in range(0, source.shape[0], COPY_CHUNK_ROWS):
+        chunk = np.asarray(source[start:start + COPY_CHUNK_ROWS], dtype=np.float32)
+        if transform is not None:
+            chunk = transform(chunk)
+        low = np.minimum(low, chunk.min(axis=0))
+        high = np.maximum(high, chunk.max(axis=0))
+    scale = (high - low) / 255
+    scale[scale == 0] = 1.0  # constant columns
+    offset = low + 128 * scale
+    return scale.astype(np.float32), offset.astype(np.float32)
+
+
+def write_matrix(out_dir, name, source, dtype="float32", transform=None):
+    """
+    Writes `source` (optionally passed through `transform` chunk by chunk) as
+    `<name>.npy` in the given storage dtype, plus scale/offset files for int8.
+    """
+    if dtype not in STORAGE_DTYPES:
+        raise ValueError(f"Unsupported storage dtype: {dtype} (expected one of {', '.join(STORAGE_DTYPES)})")
+    count, dim = source.shape
+    if dtype == "int8":
+        scale, offset = fit_int8_params(source, transform)
+        np.save(os.path.join(out_dir, f"{name}.scale.npy"), scale)
+        np.save(os.path.join(out_dir, f"{name}.offset.npy"), offset)
+
+    target = np.lib.format.open_memmap(
+        os.path.join(out_dir, f"{name}.npy"), mode="w+", dtype=np.dtype(dtype), shape=(count, dim)
+    )
+    for start in range(0, count, COPY_CHUNK_ROWS):
+        chunk = np.asarray(source[start:start + COPY_CHUNK_ROWS], dtype=np.float32)
+        if transform is not None:
+            chunk = transform(chunk)
+        if dtype == "int8":
+            chunk = np.clip(np.rint((chunk - offset) / scale), -128, 127)
+        target[start:start + COPY_CHUNK_ROWS] = chunk
+    target.flush()
+    del target
+
+
+def load_matrix(path, name, dtype="float32"):
+    """
+    Opens a matrix written by write_matrix(): a plain memmap for float32,
+    a dequantising QuantizedMatrix otherwise.
+    """
+    codes = np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r")
+    if dtype == "float32":
+        return codes
+    if dtype == "int8":
+        scale = np.load(os.path.join(path, f"{name}.scale.npy"))
+        offset = np.load(os.path.join(path, f"{name}.offset.npy"))
+        return QuantizedMatrix(codes, scale, offset)
+    return QuantizedMatrix(codes)
+
+
+def _write_string_column(out_dir, name, values):
+    """
+    Writes an offset-indexed string column and returns the number of entries.
+    """
+    offsets = [0]
+    with open(os.path.join(out_dir, f"{name}.bin"), "wb") as f:
+        for value in values:
+            encoded = (value or "").encode("utf-8")
+            f.write(encoded)
+            offsets.append(offsets[-1] + len(encoded))
+    np.save(os.path.join(out_dir, f"{name}.offsets.npy"), np.asarray(offsets, dtype=np.uint64))
+    return len(offsets) - 1
+
+
+def write_packed(out_dir, embeddings, ids, urls, dtype="float32"):
+    """
+    Writes embeddings plus their id/url side table in the packed format.
+    `embeddings` may itself be memory-mapped; it is copied in chunks so the
+    full matrix is never held in memory. `dtype` selects the storage type of
+    the vectors: float32, float16, or int8 with per-dimension scale/offset.
+    The store is built in a temporary directory and renamed into place, so a
+    failed run leaves an existing store at `out_dir` untouched.
+    """
+    out_dir = os.path.normpath(out_dir)
+    tmp_dir = f"{out_dir}.tmp-{os.getpid()}"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+    try:
+        count, dim = embeddings.shape
+        write_matrix(tmp_dir, VECTORS_NAME, embeddings, dtype)
+
+        if _write_string_column(tmp_dir, "ids", ids) != count:
+            raise ValueError("The number of embeddings and ids do not match!")
+        if _write_string_column(tmp_dir, "urls", urls) != count:
+            raise ValueError("The number of embeddings and CSV rows do not match!")
+
+        with open(os.path.join(tmp_dir, HEADER_FILE), "w", encoding="utf-8") as f:
+            json.dump({"version": FORMAT_VERSION, "count": count, "dim": dim, "dtype": dtype}, f)
+    except BaseException:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+
+    old_dir = f"{out_dir}.old-{os.getpid()}"
+    if os.path.exists(out_dir):
+        os.rename(out_dir, old_dir)
+    os.rename(tmp_dir, out_dir)
+    shutil.rmtree(old_dir, ignore_errors=True)
+
+
+class PackedEmbeddings:
+    """
+    Read-only view over a packed directory. Every file is memory-mapped, so
+    opening is cheap and row i is served in O(1) without parsing anything.
+    `vectors` always yields float32 rows, dequantising quantised stores on read.
+    """
+
+    def __init__(self, path=PACKED_DIR):
+        with open(os.path.join(path, HEADER_FILE), "r", encoding="utf-8") as f:
+            self.header = json.load(f)
+        if self.header.get("version") != FORMAT_VERSION:
+            raise ValueError(f"Unsupported packed format version: {self.header.get('version')}")
+
+        self.path = path
+        self.vectors = load_matrix(path, VECTORS_NAME, self.dtype)
+        self._columns = {}
+        for name in ("ids", "urls"):
+            offsets = np.load(os.path.join(path, f"{name}.offsets.npy"), mmap_mode="r")
+            data_path = os.path.join(path, f"{name}.bin")
+            data = np.memmap(data_path, dtype=np.uint8, mode="r") if os.path.getsize(data_path) else np.zeros(0, np.uint8)
+            self._columns[name] = (offsets, data)
+
+    def __len__(self):
+        return self.header["count"]
+
+    @property
+    def dim(self):
+        return self.header["dim"]
+
+    @property
+    def dtype(self):
+        return self.header.get("dtype", "float32")
+
+    def _string(self, name, i):
+        offsets, data = self._columns[name]
+        return data[int(offsets[i]):int(offsets[i + 1])].tobytes().decode("utf-8")
+
+    def vector(self, i):
+        return self.vectors[i]
+
+    def id(self, i):
+        return self._string("ids", i)
+
+    def url(self, i):
+        return self._string("urls", i)
+
+    def __getitem__(self, i):
+        """
+        Returns row i in the same shape as an embeddings.json entry.
+        """
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError(i)
+        return {
+            "id": self.id(i),
+            "embedding": self.vector(i).tolist(),
+            "freesound_url": self.url(i),
+        }
@@ -0,0 +1,223 @@
+import os
+import json
+import time
+import random
+import argparse
+import numpy as np
+import requests
+from tqdm import tqdm
+from embedding_store import PACKED_DIR, PackedEmbeddings
+from local_search import TOP_K_MATCHES, ExactSearch
+from pinecone_io import get_pinecone_api_key
+from projection import load_projection
+
+# --- Configuration ---
+RESULTS_DIR = "../data/eval"
+NUM_QUERIES = 200
+REQUEST_TIMEOUT_SECONDS = 20
+
+
+def load_dev_index_configs():
+    """
+    Reads PINECONE_DEV_INDEXES_JSON / PINECONE_DEV_INDEX_ORDER with the same
+    rules as getDevIndexConfigs() in api/search.js.
+    """
+    raw_json = os.getenv("PINECONE_DEV_INDEXES_JSON")
+    if not raw_json:
+        raise ValueError("PINECONE_DEV_INDEXES_JSON is not configured")
+    parsed = json.loads(raw_json)
+    if not isinstance(parsed, dict):
+        raise ValueError("PINECONE_DEV_INDEXES_JSON must be an object keyed by index id")
+
+    order = [i.strip() for i in os.getenv("PINECONE_DEV_INDEX_ORDER", "").split(",") if i.strip()]
+    configs = []
+    for index_id in order or list(parsed):
+        entry = parsed.get(index_id)
+        if isinstance(entry, str):
+            configs.append({"indexId": index_id, "indexLabel": index_id, "host": entry})
+        elif isinstance(entry, dict) and isinstance(entry.get("host"), str):
+            label = entry.get("label").strip() if isinstance(entry.get("label"), str) else ""
+            projection = entry.get("projection") if isinstance(entry.get("projection"), str) else None
+            configs.append({"indexId": index_id, "indexLabel": label or index_id, "host": entry["host"],
+                            "projection": projection})
+        else:
+            raise ValueError(f"Invalid dev index config for {index_id}")
+    return configs
+
+
+def normalize_host(host):
+    return host if host.startswith(("https://", "http://")) else f"https://{host}"
+
+
+def query_index(session, host, api_key, vector, top_k):
+    """
+    Runs one /query against an index host and returns (ids, latency_ms).
+    """
+    started = time.perf_counter()
+    response = session.post(
+        f"{normalize_host(host)}/query",
+        headers={"Api-Key": api_key, "Content-Type": "application/json"},
+        json={"topK": top_k, "vector": vector, "includeMetadata": False},
+        timeout=REQUEST_TIMEOUT_SECONDS,
+    )
+    latency_ms = (time.perf_counter() - started) * 1000
+    response.raise_for_status()
+    return [match["id"] for match in response.json().get("matches", [])], latency_ms
+
+
+def drop_self(ids, query_id, top_k):
+    return [i for i in ids if i != query_id][:top_k]
+
+
+def score_results(retrieved, truth, top_k):
+    """
+    recall@k against the exact neighbours, and reciprocal rank of the exact
+    nearest neighbour (0 when it was not returned).
+    """
+    recall = len(set(retrieved) & set(truth)) / top_k
+    reciprocal_rank = 1.0 / (retrieved.index(truth[0]) + 1) if truth and truth[0] in retrieved else 0.0
+    return recall, reciprocal_rank
+
+
+def plot_results(summary, path):
+    """
+    Scatter plots of recall@k, MRR and baseline overlap against latency,
+    one point per index.
+    matplotlib is optional; without it the plot is skipped.
+    """
+    try:
+        import matplotlib
+        matplotlib.use("Agg")
+        import matplotlib.pyplot as plt
+    except ImportError:
+        print("matplotlib is not installed; skipping the plot (pip install matplotlib).")
+        return
+
+    metrics = [("recall", f"Recall@{summary['top_k']}"), ("mrr", "MRR"),
+               ("baseline_overlap", f"Overlap with {summary['baseline']}")]
+    fig, axes = plt.subplots(1, len(metrics), figsize=(15, 4.5))
+    for ax, (key, label) in zip(axes, metrics):
+        for row in summary["indexes"]:
+            latency = row["latency_ms"]
+            if latency["p50"] is None or row[key] is None:
+                continue
+            ax.errorbar(latency["p50"], row[key], xerr=[[0], [latency["p95"] - latency["p50"]]], fmt="o", capsize=4)
+            ax.annotate(row["indexLabel"], (latency["p50"], row[key]), textcoords="offset points", xytext=(6, 6))
+        ax.set_xlabel("Query latency, ms (p50, bar to p95)")
+        ax.set_ylabel(label)
+        ax.grid(True, alpha=0.3)
+    fig.suptitle("Dev indexes: quality vs latency")
+    fig.tight_layout()
+    fig.savefig(path, dpi=120)
+    print(f"Plot written to {path}")
+
+
+def evaluate(num_queries=NUM_QUERIES, top_k=TOP_K_MATCHES, noise=0.0, seed=0, baseline_id=None):
+    """
+    Builds exact ground-truth neighbours for a held-out query set, queries
+    every configured dev index with it and reports recall@k, MRR, overlap with
+    the baseline index and latency percentiles per index.
+    """
+    configs = load_dev_index_configs()
+    baseline_id = baseline_id or configs[0]["indexId"]
+    if baseline_id not in {c["indexId"] for c in configs}:
+        raise ValueError(f"Unknown baseline index: {baseline_id}")
+
+    store = PackedEmbeddings(PACKED_DIR)
+    engine = ExactSearch(store)
+    rng = np.random.default_rng(seed)
+    rows = random.Random(seed).sample(range(len(store)), min(num_queries, len(store)))
+    queries = np.asarray(store.vectors[rows], dtype=np.float32)
+    if noise:
+        # Perturb the held-out items so the query is not an exact copy of an indexed vector.
+        scale = noise * np.linalg.norm(queries, axis=1, keepdims=True) / np.sqrt(queries.shape[1])
+        queries = queries + rng.standard_normal(queries.shape).astype(np.float32) * scale
+
+    # Ask for one extra neighbour so the query item itself can be dropped everywhere.
+    print(f"Computing exact ground truth for {len(rows)} queries...")
+    truth_rows, _ = engine.search(queries, top_k + 1)
+    query_ids = [store.id(r) for r in rows]
+    truth = [drop_self([store.id(int(r)) for r in found], qid, top_k) for found, qid in zip(truth_rows, query_ids)]
+
+    api_key = get_pinecone_api_key()
+    session = requests.Session()
+    retrieved = {c["indexId"]: [] for c in configs}
+    latencies = {c["indexId"]: [] for c in configs}
+    errors = {c["indexId"]: 0 for c in configs}
+
+    for config in configs:
+        # Projection paths are relative to the project root, like in api/search.js
+        index_queries = queries
+        if config.get("projection"):
+            index_queries = load_projection(os.path.join("..", config["projection"])).apply(queries)
+        for query, qid in tqdm(zip(index_queries, query_ids), total=len(rows), desc=config["indexLabel"]):
+            try:
+                ids, latency_ms = query_index(session, config["host"], api_key, query.tolist(), top_k + 1)
+                retrieved[config["indexId"]].append(drop_self(ids, qid, top_k))
+                latencies[config["indexId"]].append(latency_ms)
+            except requests.RequestException as e:
+                errors[config["indexId"]] += 1
+                retrieved[config["indexId"]].append(None)
+                tqdm.write(f"[{config['indexId']}] query failed: {e}")
+
+    summary = {"top_k": top_k, "queries": len(rows), "noise": noise, "seed": seed, "baseline": baseline_id,
+               "indexes": []}
+    for config in configs:
+        index_id = config["indexId"]
+        recalls, reciprocal_ranks, overlaps = [], [], []
+        for i, found in enumerate(retrieved[index_id]):
+            if found is None:
+                continue
+            recall, rr = score_results(found, truth[i], top_k)
+            recalls.append(recall)
+            reciprocal_ranks.append(rr)
+            baseline = retrieved[baseline_id][i]
+            if baseline is not None:
+                overlaps.append(len(set(found) & set(baseline)) / top_k)
+        values = latencies[index_id]
+        summary["indexes"].append({
+            "indexId": index_id,
+            "indexLabel": config["indexLabel"],
+            "recall": float(np.mean(recalls)) if recalls else None,
+            "mrr": float(np.mean(reciprocal_ranks)) if reciprocal_ranks else None,
+            "baseline_overlap": float(np.mean(overlaps)) if overlaps else None,
+            "errors": errors[index_id],
+            "latency_ms": {
+                "p50": float(np.percentile(values, 50)) if values else None,
+                "p95": float(np.percentile(values, 95)) if values else None,
+                "mean": float(np.mean(values)) if values else None,
+            },
+        })
+    return summary
+
+
+def print_summary(summary):
+    print(f"\n{'index':<20}{'recall@' + str(summary['top_k']):>10}{'MRR':>8}{'overlap':>9}"
+          f"{'p50 ms':>9}{'p95 ms':>9}{'errors':>8}")
+    for row in summary["indexes"]:
+        fmt = lambda v, spec: format(v, spec) if v is not None else "-"  # noqa: E731
+        print(f"{row['indexLabel']:<20}{fmt(row['recall'], '10.3f'):>10}{fmt(row['mrr'], '8.3f'):>8}"
+              f"{fmt(row['baseline_overlap'], '9.3f'):>9}{fmt(row['latency_ms']['p50'], '9.1f'):>9}"
+              f"{fmt(row['latency_ms']['p95'], '9.1f'):>9}{row['errors']:>8}")
+    print(f"(overlap is measured against the '{summary['baseline']}' index)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare the dev-mode indexes on recall and latency.")
+    parser.add_argument("--queries", type=int, default=NUM_QUERIES, help="Number of held-out queries.")
+    parser.add_argument("--top-k", type=int, default=TOP_K_MATCHES)
+    parser.add_argument("--noise", type=float, default=0.0, help="Relative Gaussian noise added to each query.")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--baseline", help="Index id used for the overlap column (default: first configured).")
+    args = parser.parse_args()
+
+    summary = evaluate(args.queries, args.top_k, args.noise, args.seed, args.baseline)
+    print_summary(summary)
+
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    stamp = time.strftime("%Y%m%d-%H%M%S")
+    result_file = os.path.join(RESULTS_DIR, f"indexes-{stamp}.json")
+    with open(result_file, "w", encoding="utf-8") as f:
+        json.dump(summary, f, indent=2)
+    print(f"Results written to {result_file}")
+    plot_results(summary, os.path.join(RESULTS_DIR, f"indexes-{stamp}.png"))
@@ -0,0 +1,328 @@
+import os
+import json
+import getpass
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import numpy as np
+import requests
+from tqdm import tqdm
+from pinecone_io import call_with_backoff
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Parquet output is optional; NPZ needs only numpy
+    pa = pq = None
+
+# --- Configuration ---
+BLOB_API_URL = os.getenv("VERCEL_BLOB_API_URL", "https://blob.vercel-storage.com")
+BLOB_API_VERSION = "7"
+META_PREFIX = "feedback-meta-"
+# NDJSON segments written by api/utils/feedback-log.js (FEEDBACK_LOG_MODE=segments)
+SEGMENT_PREFIX = "feedback-log/segments/"
+# Segment index mirrored by the same module (feedback-log/index-<suffix>.json); segments are found through it
+INDEX_PREFIX = "feedback-log/index"
+EXPORT_DIR = "../data/feedback"
+STATE_FILE = "../data/feedback/export_state.json"
+LATEST_FILE = "../data/feedback/latest_records.ndjson"
+LIST_PAGE_SIZE = 1000
+DOWNLOAD_WORKERS = 16
+REQUEST_TIMEOUT_SECONDS = 30
+# Blobs uploaded this long before the stored cursor are re-checked (by pathname), so
+# uploads that became visible late are not skipped
+CURSOR_OVERLAP_SECONDS = 600
+COLUMNS = ("audio_id", "audio_url", "rank", "freesound_url", "rating", "result_context", "created_at", "updated_at")
+
+
+class BlobRequestError(Exception):
+    """
+    HTTP error from the Blob API or a blob download; `status` drives the retry
+    decision in call_with_backoff().
+    """
+
+    def __init__(self, status, message):
+        super().__init__(f"{status}: {message}")
+        self.status = status
+
+
+def get_blob_token():
+    """
+    Finds the Blob read/write token from the environment or prompts for it.
+    """
+    token = os.getenv("BLOB_READ_WRITE_TOKEN")
+    if not token:
+        print("BLOB_READ_WRITE_TOKEN environment variable not found.")
+        token = getpass.getpass("Please enter your Vercel Blob read/write token: ")
+    if not token:
+        raise ValueError("Vercel Blob token was not provided.")
+    return token
+
+
+_local = threading.local()
+
+
+def _session():
+    # One keep-alive session per worker thread
+    if not hasattr(_local, "session"):
+        _local.session = requests.Session()
+    return _local.session
+
+
+def _get(url, **kwargs):
+    response = _session().get(url, timeout=REQUEST_TIMEOUT_SECONDS, **kwargs)
+    if response.status_code >= 400:
+        raise BlobRequestError(response.status_code, response.text[:200])
+    return response
+
+
+def iter_blobs(token, prefix):
+    """
+    Pages through every blob under `prefix` with the Blob list API.
+    """
+    headers = {"Authorization": f"Bearer {token}", "x-api-version": BLOB_API_VERSION}
+    cursor = None
+    while True:
+        params = {"prefix": prefix, "limit": LIST_PAGE_SIZE}
+        if cursor:
+            params["cursor"] = cursor
+        page = call_with_backoff(_get, BLOB_API_URL, params=params, headers=headers).json()
+        yield from page.get("blobs", [])
+        cursor = page.get("cursor")
+        if not page.get("hasMore") or not cursor:
+            return
+
+
+def empty_state():
+    return {"uploadedAt": None, "recent": [], "segments": {"flushedAt": None, "recent": []}}
+
+
+def load_state(path=STATE_FILE):
+    """
+    Loads the export cursors: uploadedAt/recent for feedback-meta-* blobs and,
+    under "segments", flushedAt/recent for log segments. State files written
+    before segments had their own cursor reuse the blob cursor for them.
+    """
+    if not os.path.exists(path):
+        return empty_state()
+    with open(path, "r", encoding="utf-8") as f:
+        state = json.load(f)
+    state.setdefault("segments", {"flushedAt": state.get("uploadedAt"), "recent": state.get("recent", [])})
+    return state
+
+
+def save_state(state, path=STATE_FILE):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(state, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def _epoch(timestamp):
+    return np.datetime64(timestamp.rstrip("Z"), "ms").astype(np.int64) / 1000
+
+
+def select_new_blobs(blobs, state, time_key="uploadedAt"):
+    """
+    Splits blobs into those not exported yet and the next cursor state.
+    The cursor is the newest `time_key` timestamp seen; blobs within CURSOR_OVERLAP_SECONDS
+    of it are remembered by pathname so the overlap is not downloaded twice.
+    """
+    cursor = _epoch(state[time_key]) - CURSOR_OVERLAP_SECONDS if state.get(time_key) else None
+    recent = set(state.get("recent", []))
+    new_blobs = [
+        blob for blob in blobs
+        if cursor is None or (_epoch(blob[time_key]) >= cursor and blob["pathname"] not in recent)
+    ]
+
+    newest = max((blob[time_key] for blob in blobs), default=state.get(time_key), key=lambda t: _epoch(t) if t else 0)
+    if newest is None:
+        return new_blobs, state
+    horizon = _epoch(newest) - CURSOR_OVERLAP_SECONDS
+    next_recent = sorted(blob["pathname"] for blob in blobs if _epoch(blob[time_key]) >= horizon)
+    return new_blobs, {time_key: newest, "recent": next_recent}
+
+
+def load_segment_index(token):
+    """
+    Returns the segment entries ({url, pathname, records, flushedAt, ...}) of
+    the newest feedback-log index blob, or [] when the segment log was never used.
+    Only the index is listed, so the cost does not grow with the number of segments.
+    """
+    # There is normally one index blob; a second one only lives until the next flush deletes it
+    blobs = list(iter_blobs(token, INDEX_PREFIX))
+    if not blobs:
+        return []
+    newest = max(blobs, key=lambda blob: _epoch(blob["uploadedAt"]))
+    return call_with_backoff(_get, newest.get("downloadUrl") or newest["url"]).json()["segments"]
+
+
+def download_records(blob):
+    """
+    Returns the feedback records in one blob: a single JSON document for
+    feedback-meta-* blobs, one record per line for log segments.
+    """
+    text = call_with_backoff(_get, blob.get("downloadUrl") or blob["url"]).text
+    if blob["pathname"].startswith(SEGMENT_PREFIX):
+        records = [json.loads(line) for line in text.splitlines() if line.strip()]
+    else:
+        records = [json.loads(text)]
+    for record in records:
+        # Per-submission blobs have no recordId; their pathname is unique instead
+        record.setdefault("recordId", blob["pathname"])
+    return records
+
+
+def download_all(blobs, workers=DOWNLOAD_WORKERS):
+    """
+    Downloads blobs concurrently. Blobs that still fail after retries are
+    reported and left out, and the run is marked incomplete.
+    """
+    records, failed = [], []
+    with ThreadPoolExecutor(max_workers=workers) as executor, \
+            tqdm(total=len(blobs), unit="blob", desc="Downloading") as progress:
+        futures = {executor.submit(download_records, blob): blob for blob in blobs}
+        for future in as_completed(futures):
+            try:
+                records.extend(future.result())
+            except Exception as e:
+                failed.append(futures[future]["pathname"])
+                tqdm.write(f"Download failed for {futures[future]['pathname']}: {e}")
+            progress.update(1)
+    return records, failed
+
+
+def load_latest(path=LATEST_FILE):
+    latest = {}
+    if os.path.exists(path):
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    record = json.loads(line)
+                    latest[record["audioId"]] = record
+    return latest
+
+
+def save_latest(latest, path=LATEST_FILE):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        for audio_id in sorted(latest):
+            f.write(json.dumps(latest[audio_id], separators=(",", ":")) + "\n")
+    os.replace(tmp_path, path)
+
+
+def resolve_latest(latest, records):
+    """
+    Applies new records to the latest state per audioId. The newest record
+    (by createdAt) wins for ratings and results; updates (isUpdate) carry
+    no audio, so audioUrl always comes from the original submission, and
+    firstCreatedAt keeps its time.
+    """
+    seen = {record.get("recordId") for record in latest.values()}
+    for record in sorted(records, key=lambda r: r.get("createdAt") or ""):
+        audio_id = record.get("audioId")
+        if not audio_id or record.get("recordId") in seen:
+            continue
+        # Re-flushed log segments repeat records; apply each recordId once
+        seen.add(record.get("recordId"))
+        previous = latest.get(audio_id)
+        original_url = None if record.get("isUpdate") else record.get("audioUrl")
+        if previous is None or (record.get("createdAt") or "") >= (previous.get("createdAt") or ""):
+            latest[audio_id] = {
+                **record,
+                "audioUrl": original_url or (previous or {}).get("audioUrl"),
+                "firstCreatedAt": (previous or {}).get("firstCreatedAt") or record.get("createdAt"),
+            }
+        elif original_url:
+            # An original that arrived after one of its updates
+            previous["audioUrl"] = original_url
+            previous["firstCreatedAt"] = record.get("createdAt")
+    return latest
+
+
+def to_columns(latest):
+    """
+    One row per rated result slot: (audio_id, rank, freesound_url, rating, result_context, ...).
+    result_context is stored as a JSON string ("" when absent).
+    """
+    columns = {name: [] for name in COLUMNS}
+    for audio_id in sorted(latest):
+        record = latest[audio_id]
+        urls = record.get("freesound_urls") or []
+        ratings = record.get("ratings") or []
+        contexts = record.get("result_contexts") or [None] * len(urls)
+        for rank, (url, rating, context) in enumerate(zip(urls, ratings, contexts), start=1):
+            columns["audio_id"].append(audio_id)
+            columns["audio_url"].append(record.get("audioUrl") or "")
+            columns["rank"].append(rank)
+            columns["freesound_url"].append(url or "")
+            columns["rating"].append(rating or "")
+            columns["result_context"].append(json.dumps(context, separators=(",", ":")) if context else "")
+            columns["created_at"].append(record.get("firstCreatedAt") or "")
+            columns["updated_at"].append(record.get("createdAt") or "")
+    return columns
+
+
+def write_dataset(columns, out_dir=EXPORT_DIR, fmt="npz"):
+    """
+    Writes the columns as feedback.parquet (needs pyarrow) or feedback.npz.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    if fmt == "parquet":
+        if pq is None:
+            raise ImportError("Parquet output needs pyarrow (pip install pyarrow); use --format npz instead.")
+        path = os.path.join(out_dir, "feedback.parquet")
+        pq.write_table(pa.Table.from_pydict(columns), path)
+    else:
+        path = os.path.join(out_dir, "feedback.npz")
+        arrays = {
+            name: np.asarray(values, dtype=np.int32 if name == "rank" else str)
+            for name, values in columns.items()
+        }
+        np.savez_compressed(path, **arrays)
+    print(f"Wrote {len(columns['audio_id'])} rows to {path}")
+    return path
+
+
+def export_feedback(fmt="npz", workers=DOWNLOAD_WORKERS, full=False, out_dir=EXPORT_DIR):
+    """
+    Lists feedback-meta-* blobs and reads the segment index, downloads what
+    was not exported yet, folds it into the latest state per audioId and
+    rewrites the dataset. The cursors are only advanced when every download
+    succeeded.
+    """
+    token = get_blob_token()
+    state = empty_state() if full else load_state()
+    latest = {} if full else load_latest()
+
+    meta_blobs = list(tqdm(iter_blobs(token, META_PREFIX), unit="blob", desc=f"Listing {META_PREFIX}"))
+    new_meta, next_state = select_new_blobs(meta_blobs, state)
+    segments = load_segment_index(token)
+    new_segments, next_state["segments"] = select_new_blobs(segments, state["segments"], time_key="flushedAt")
+    print(f"{len(meta_blobs)} feedback blobs listed and {len(segments)} log segments indexed, "
+          f"{len(new_meta) + len(new_segments)} new since the last export.")
+    new_blobs = new_meta + new_segments
+
+    records, failed = download_all(new_blobs, workers)
+    latest = resolve_latest(latest, records)
+    save_latest(latest)
+    write_dataset(to_columns(latest), out_dir, fmt)
+
+    if failed:
+        print(f"{len(failed)} blobs could not be downloaded; the cursor was not advanced, rerun to retry them.")
+    else:
+        save_state(next_state)
+    print(f"{len(records)} new records, {len(latest)} audio queries in the dataset.")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export feedback from Vercel Blob into a columnar dataset.")
+    parser.add_argument("--format", choices=["npz", "parquet"], default="npz", help="Output format.")
+    parser.add_argument("--workers", type=int, default=DOWNLOAD_WORKERS, help="Concurrent downloads.")
+    parser.add_argument("--full", action="store_true", help="Ignore the stored cursor and re-export everything.")
+    parser.add_argument("--output", default=EXPORT_DIR, help="Output directory.")
+    args = parser.parse_args()
+
+    export_feedback(args.format, args.workers, args.full, args.output)
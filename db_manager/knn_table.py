@@ -0,0 +1,132 @@
+import os
+import json
+import time
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from tqdm import tqdm
+from embedding_store import PACKED_DIR, PackedEmbeddings
+from local_search import TOP_K_MATCHES, SEARCH_BLOCK_ROWS, format_results, load_normalized_matrix, top_k_blocked
+from catalog_artifact import CATALOG_DIR, catalog_fingerprint, write_catalog
+
+# --- Configuration ---
+KNN_DIR = "../artifacts/knn"
+FORMAT_VERSION = 1
+QUERY_BLOCK_ROWS = 1024
+
+# File layout (raw little-endian, read by api/utils/knn.js):
+#   header.json    -> {"version", "count", "k", "fingerprint", "metric"}
+#   neighbors.bin  -> (count, k) int32 catalog rows, best first
+#   scores.bin     -> (count, k) float16 cosine scores
+# Row i of the table belongs to row i of the catalog side table (catalog_artifact.py).
+HEADER_FILE = "header.json"
+
+
+def _neighbours_for_block(matrix, start, stop, k):
+    """
+    Top-k neighbours of rows [start, stop) with the row itself removed.
+    """
+    queries = np.asarray(matrix[start:stop], dtype=np.float32)
+    rows, scores = top_k_blocked(queries, matrix, k + 1, SEARCH_BLOCK_ROWS)
+    own = np.arange(start, stop)[:, None]
+    is_self = rows == own
+    # Drop the item itself; if an exact duplicate pushed it out of the top k+1, drop the last one.
+    is_self[~is_self.any(axis=1), -1] = True
+    keep = ~is_self
+    return rows[keep].reshape(len(queries), k), scores[keep].reshape(len(queries), k)
+
+
+def build_knn_table(store, out_dir=KNN_DIR, k=TOP_K_MATCHES, workers=None, block_rows=QUERY_BLOCK_ROWS):
+    """
+    Computes the top-k neighbours of every catalog item. Query blocks are
+    spread over a thread pool (numpy releases the GIL inside matmul), each
+    scanning the memory-mapped normalised matrix block by block, and results
+    go straight into memory-mapped output files.
+    """
+    matrix = load_normalized_matrix(store)
+    count = len(store)
+    if count <= k:
+        raise ValueError(f"Need more than {k} items to build a {k}-NN table")
+
+    os.makedirs(out_dir, exist_ok=True)
+    neighbours = np.memmap(os.path.join(out_dir, "neighbors.bin"), dtype="<i4", mode="w+", shape=(count, k))
+    scores = np.memmap(os.path.join(out_dir, "scores.bin"), dtype="<f2", mode="w+", shape=(count, k))
+
+    def work(start):
+        stop = min(start + block_rows, count)
+        rows, block_scores = _neighbours_for_block(matrix, start, stop, k)
+        neighbours[start:stop] = rows
+        scores[start:stop] = block_scores
+        return stop - start
+
+    started = time.perf_counter()
+    workers = workers or os.cpu_count() or 1
+    with ThreadPoolExecutor(max_workers=workers) as pool, \
+            tqdm(total=count, unit="items", desc=f"{k}-NN table") as progress:
+        for done in pool.map(work, range(0, count, block_rows)):
+            progress.update(done)
+    neighbours.flush()
+    scores.flush()
+    del neighbours, scores
+
+    with open(os.path.join(out_dir, HEADER_FILE), "w", encoding="utf-8") as f:
+        json.dump({"version": FORMAT_VERSION, "count": count, "k": k,
+                   "fingerprint": catalog_fingerprint(store), "metric": "cosine"}, f)
+    print(f"Built {k}-NN table for {count} items in {time.perf_counter() - started:.1f}s "
+          f"with {workers} workers -> {out_dir}")
+
+
+class KnnTable:
+    """
+    Read-only view over a k-NN table: neighbours of catalog row i are one
+    memory-mapped slice, so lookups are O(1).
+    """
+
+    def __init__(self, path=KNN_DIR, store=None):
+        with open(os.path.join(path, HEADER_FILE), "r", encoding="utf-8") as f:
+            self.header = json.load(f)
+        if self.header.get("version") != FORMAT_VERSION:
+            raise ValueError(f"Unsupported k-NN table version: {self.header.get('version')}")
+        self.store = store if store is not None else PackedEmbeddings(PACKED_DIR)
+        if catalog_fingerprint(self.store) != self.header["fingerprint"]:
+            raise ValueError("The k-NN table was built for a different catalog. Rebuild it.")
+
+        shape = (self.header["count"], self.header["k"])
+        self.neighbours = np.memmap(os.path.join(path, "neighbors.bin"), dtype="<i4", mode="r", shape=shape)
+        self.scores = np.memmap(os.path.join(path, "scores.bin"), dtype="<f2", mode="r", shape=shape)
+        self._rows = None
+
+    def row_of(self, item_id):
+        if self._rows is None:
+            self._rows = {self.store.id(i): i for i in range(len(self.store))}
+        return self._rows.get(item_id)
+
+    def similar(self, item_id, top_k=None):
+        """
+        Returns [{id, score, freesound_url}] for an item id, or None if unknown.
+        """
+        row = self.row_of(item_id)
+        if row is None:
+            return None
+        top_k = top_k or self.header["k"]
+        return format_results(self.store, self.neighbours[row][:top_k], self.scores[row][:top_k])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Precompute top-k neighbours for every catalog item.")
+    parser.add_argument("--k", type=int, default=TOP_K_MATCHES, help="Neighbours stored per item.")
+    parser.add_argument("--workers", type=int, help="Worker threads (default: one per CPU).")
+    parser.add_argument("--block-rows", type=int, default=QUERY_BLOCK_ROWS, help="Query rows per work item.")
+    parser.add_argument("--lookup", help="Print the stored neighbours of this id instead of building.")
+    args = parser.parse_args()
+
+    packed = PackedEmbeddings(PACKED_DIR)
+    if args.lookup:
+        results = KnnTable(KNN_DIR, packed).similar(args.lookup)
+        if results is None:
+            print(f"Unknown id: {args.lookup}")
+        for result in results or []:
+            print(f"  - {result['id']}  {result['score']:.4f}  {result['freesound_url']}")
+    else:
+        build_knn_table(packed, KNN_DIR, args.k, args.workers, args.block_rows)
+        write_catalog(packed, CATALOG_DIR)
@@ -0,0 +1,130 @@
+import os
+import argparse
+import numpy as np
+from embedding_store import PACKED_DIR, VECTORS_FILE, PackedEmbeddings, QuantizedMatrix, load_matrix, write_matrix
+
+# --- Configuration ---
+TOP_K_MATCHES = 4  # Keep in sync with api/search.js
+NORMALIZED_NAME = "vectors.normalized"
+SEARCH_BLOCK_ROWS = 16384
+
+
+def normalize_rows(matrix):
+    """
+    L2-normalises each row; all-zero rows are left as zeros.
+    """
+    matrix = np.asarray(matrix, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    return matrix / np.where(norms == 0, 1, norms)
+
+
+def load_normalized_matrix(store):
+    """
+    Returns the row-normalised embedding matrix, memory-mapped. It is built
+    once next to the packed vectors, in the same storage dtype, and rebuilt
+    whenever they change. Quantised stores come back as a QuantizedMatrix,
+    which dequantises each scanned block on the fly.
+    """
+    source = os.path.join(store.path, VECTORS_FILE)
+    target = os.path.join(store.path, f"{NORMALIZED_NAME}.npy")
+    if not os.path.exists(target) or os.path.getmtime(target) < os.path.getmtime(source):
+        write_matrix(store.path, NORMALIZED_NAME, store.vectors, store.dtype, transform=normalize_rows)
+    return load_matrix(store.path, NORMALIZED_NAME, store.dtype)
+
+
+def top_k_blocked(queries, matrix, top_k, block_rows=SEARCH_BLOCK_ROWS):
+    """
+    Exact top-k inner-product search of (n_queries, dim) against (n_rows, dim).
+    The matrix is scanned block by block with one matrix multiply per block;
+    argpartition keeps only the best candidates, so memory is bounded by the
+    block size rather than the catalog size. Returns (indices, scores), both
+    (n_queries, top_k) and sorted by descending score.
+    """
+    n_queries = queries.shape[0]
+    top_k = min(top_k, matrix.shape[0])
+    best_scores = np.full((n_queries, 0), -np.inf, dtype=np.float32)
+    best_indices = np.zeros((n_queries, 0), dtype=np.int64)
+
+    for start in range(0, matrix.shape[0], block_rows):
+        if isinstance(matrix, QuantizedMatrix):
+            scores = matrix.block_scores(queries, start, start + block_rows)
+        else:
+            scores = queries @ np.asarray(matrix[start:start + block_rows], dtype=np.float32).T
+        if scores.shape[1] > top_k:
+            candidates = np.argpartition(-scores, top_k - 1, axis=1)[:, :top_k]
+        else:
+            candidates = np.broadcast_to(np.arange(scores.shape[1]), scores.shape)
+        candidate_scores = np.take_along_axis(scores, candidates, axis=1)
+
+        merged_scores = np.concatenate([best_scores, candidate_scores], axis=1)
+        merged_indices = np.concatenate([best_indices, candidates + start], axis=1)
+        if merged_scores.shape[1] > top_k:
+            keep = np.argpartition(-merged_scores, top_k - 1, axis=1)[:, :top_k]
+            merged_scores = np.take_along_axis(merged_scores, keep, axis=1)
+            merged_indices = np.take_along_axis(merged_indices, keep, axis=1)
+        best_scores, best_indices = merged_scores, merged_indices
+
+    order = np.argsort(-best_scores, axis=1, kind="stable")
+    return np.take_along_axis(best_indices, order, axis=1), np.take_along_axis(best_scores, order, axis=1)
+
+
+def format_results(store, rows, scores):
+    """
+    Turns row indices and scores into the {id, score, freesound_url} shape of /api/search.
+    """
+    return [{
+        "id": store.id(int(row)),
+        "score": float(score),
+        "freesound_url": store.url(int(row)),
+    } for row, score in zip(rows, scores)]
+
+
+class ExactSearch:
+    """
+    Brute-force cosine search over the packed store. Answers the same query as
+    api/search.js does against Pinecone, which makes it the ground truth for
+    recall tests and a fallback when Pinecone is unavailable.
+    """
+
+    def __init__(self, store=None, path=PACKED_DIR):
+        self.store = store if store is not None else PackedEmbeddings(path)
+        self.matrix = load_normalized_matrix(self.store)
+
+    def search(self, queries, top_k=TOP_K_MATCHES):
+        """
+        Returns raw (row indices, cosine scores) for a (n_queries, dim) array.
+        """
+        queries = normalize_rows(np.atleast_2d(queries))
+        return top_k_blocked(queries, self.matrix, top_k)
+
+    def query(self, embedding, top_k=TOP_K_MATCHES):
+        """
+        Single query; returns [{id, score, freesound_url}] like /api/search.
+        """
+        return self.query_batch([embedding], top_k)[0]
+
+    def query_batch(self, embeddings, top_k=TOP_K_MATCHES):
+        """
+        Batched query; returns one result list per embedding.
+        """
+        rows, scores = self.search(np.asarray(embeddings, dtype=np.float32), top_k)
+        return [format_results(self.store, r, s) for r, s in zip(rows, scores)]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Query the local embeddings with exact cosine search.")
+    parser.add_argument("--row", type=int, help="Use the embedding of this row as the query (default: random).")
+    parser.add_argument("--top-k", type=int, default=TOP_K_MATCHES)
+    parser.add_argument(
+        "--packed", default=PACKED_DIR,
+        help="Packed store to search, e.g. a quantised copy such as ../data/embeddings_packed.int8."
+    )
+    args = parser.parse_args()
+
+    engine = ExactSearch(path=args.packed)
+    row = args.row if args.row is not None else np.random.randint(len(engine.store))
+    print(f"Querying with row {row} (ID {engine.store.id(row)}, {engine.store.url(row)}):\n")
+    for result in engine.query(engine.store.vector(row), args.top_k):
+        print(f"  - ID: {result['id']}")
+        print(f"    Score: {result['score']:.4f}")
+        print(f"    Freesound URL: {result['freesound_url']}\n")
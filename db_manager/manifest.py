@@ -0,0 +1,86 @@
+import os
+import hashlib
+import numpy as np
+
+# --- Configuration ---
+# One manifest per target index, so a projected upload never overwrites the full index's hashes
+MANIFEST_FILE = "../data/upload_manifest.{index}.npz"
+# Written before manifests were keyed by index; still read for the index it names
+LEGACY_MANIFEST_FILE = "../data/upload_manifest.npz"
+HASH_BYTES = 16
+HASH_CHUNK_ROWS = 4096
+
+
+def row_hash(vector, url):
+    """
+    Content hash of one row: the float32 vector bytes plus its metadata.
+    """
+    digest = hashlib.blake2b(np.ascontiguousarray(vector, dtype=np.float32).tobytes(), digest_size=HASH_BYTES)
+    digest.update(b"\0")
+    digest.update((url or "").encode("utf-8"))
+    return digest.digest()
+
+
+def compute_hashes(store):
+    """
+    Returns {id: hash} for every row of a packed store, reading it chunk by chunk.
+    """
+    hashes = {}
+    for start in range(0, len(store), HASH_CHUNK_ROWS):
+        end = min(start + HASH_CHUNK_ROWS, len(store))
+        chunk = np.asarray(store.vectors[start:end], dtype=np.float32)
+        for offset, vector in enumerate(chunk):
+            i = start + offset
+            hashes[store.id(i)] = row_hash(vector, store.url(i))
+    return hashes
+
+
+def manifest_path(index_name):
+    """
+    Path of the manifest for one Pinecone index.
+    """
+    return MANIFEST_FILE.format(index=index_name)
+
+
+def load_manifest(path, index_name=None):
+    """
+    Loads the {id: hash} manifest of what was last written to the index.
+    A missing manifest, or one written for another index, is treated as empty.
+    Without a per-index manifest, the legacy single manifest is used if it
+    was written for the same index.
+    """
+    if not os.path.exists(path):
+        if index_name is None or not os.path.exists(LEGACY_MANIFEST_FILE):
+            return {}
+        path = LEGACY_MANIFEST_FILE
+    with np.load(path) as data:
+        if index_name is not None and str(data["index"]) != index_name:
+            print(f"Manifest {path} was written for index '{data['index']}'. Ignoring it.")
+            return {}
+        return {vector_id: digest.tobytes() for vector_id, digest in zip(data["ids"].tolist(), data["hashes"])}
+
+
+def save_manifest(manifest, path, index_name=""):
+    """
+    Writes the manifest atomically, so an interrupted run never leaves a torn file.
+    """
+    ids = sorted(manifest)
+    tmp_path = f"{path}.tmp.npz"
+    np.savez(
+        tmp_path,
+        index=np.asarray(index_name),
+        ids=np.asarray(ids, dtype=str),
+        # Stored as raw uint8 rows: numpy "S" strings would drop trailing NUL bytes.
+        hashes=np.frombuffer(b"".join(manifest[i] for i in ids), dtype=np.uint8).reshape(len(ids), HASH_BYTES),
+    )
+    os.replace(tmp_path, path)
+
+
+def diff_manifests(old, new):
+    """
+    Returns (changed_ids, removed_ids): IDs that are new or whose content
+    changed, and IDs that are no longer present.
+    """
+    changed = [vector_id for vector_id, digest in new.items() if old.get(vector_id) != digest]
+    removed = [vector_id for vector_id in old if vector_id not in new]
+    return changed, removed
@@ -0,0 +1,227 @@
+import os
+import time
+import random
+import getpass
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from pinecone import Pinecone
+from tqdm import tqdm
+
+# --- Configuration ---
+# Pinecone rejects upsert requests above 2 MB or 1,000 vectors. We stay a bit
+# under the byte limit because our payload size is an estimate.
+MAX_REQUEST_BYTES = 2 * 1024 * 1024
+REQUEST_BYTE_BUDGET = int(MAX_REQUEST_BYTES * 0.9)
+MAX_VECTORS_PER_REQUEST = 1000
+# Pinecone's delete operation can handle up to 1,000 IDs per request.
+DELETE_BATCH_SIZE = 1000
+# IDs are sent in the query string of a fetch request, so keep batches modest.
+FETCH_BATCH_SIZE = 100
+VERIFY_TIMEOUT_SECONDS = 300
+MAX_IN_FLIGHT = 8
+MAX_RETRIES = 5
+BASE_DELAY_SECONDS = 0.5
+MAX_DELAY_SECONDS = 30
+RETRYABLE_STATUSES = {429, 500, 502, 503, 504}
+
+
+def get_pinecone_api_key():
+    """
+    Finds the API key from environment variables or securely prompts the user for it.
+    """
+    api_key = os.getenv("PINECONE_API_KEY")
+    if not api_key:
+        print("PINECONE_API_KEY environment variable not found.")
+        api_key = getpass.getpass("Please enter your Pinecone API Key: ")
+    if not api_key:
+        raise ValueError("Pinecone API Key was not provided.")
+    return api_key
+
+
+def connect_to_index(index_name):
+    """
+    Returns a handle to the Pinecone index, prompting for the API key if needed,
+    and prints the host every following write goes to. PINECONE_STANDIN_HOST
+    points the scripts at a local stand-in server (test/pinecone_standin.py)
+    instead. PINECONE_INDEX_HOST is deliberately not read here: it is the
+    production host the Vercel deployment queries.
+    """
+    pc = Pinecone(api_key=get_pinecone_api_key())
+    standin_host = os.getenv("PINECONE_STANDIN_HOST")
+    if standin_host:
+        print(f"\nPINECONE_STANDIN_HOST is set: using the stand-in at {standin_host} instead of '{index_name}'.")
+        return pc.Index(host=standin_host)
+
+    host = pc.describe_index(index_name).host
+    print(f"\nSuccessfully connected to Pinecone index '{index_name}' (host: {host}).")
+    return pc.Index(host=host)
+
+
+def is_retryable(error):
+    """
+    Rate limits (429), server errors (5xx) and network errors without an HTTP
+    status are worth retrying; anything else (bad request, auth) is not.
+    """
+    status = getattr(error, "status", None)
+    if status is None:
+        return not isinstance(error, (ValueError, TypeError))
+    return int(status) in RETRYABLE_STATUSES
+
+
+def call_with_backoff(fn, *args, max_retries=MAX_RETRIES, **kwargs):
+    """
+    Calls fn, retrying retryable errors with exponential backoff and full jitter.
+    """
+    for attempt in range(max_retries + 1):
+        try:
+            return fn(*args, **kwargs)
+        except Exception as e:
+            if attempt == max_retries or not is_retryable(e):
+                raise
+            delay = min(MAX_DELAY_SECONDS, BASE_DELAY_SECONDS * (2 ** attempt))
+            time.sleep(random.uniform(0, delay))
+
+
+def estimate_vector_bytes(vector):
+    """
+    Rough JSON size of one upsert entry: ~20 characters per float value plus
+    the id, metadata strings and field names.
+    """
+    metadata = vector.get("metadata") or {}
+    metadata_bytes = sum(len(str(k)) + len(str(v)) + 8 for k, v in metadata.items())
+    return 64 + len(vector["id"]) + 20 * len(vector["values"]) + metadata_bytes
+
+
+def iter_sized_batches(vectors, max_bytes=REQUEST_BYTE_BUDGET, max_count=MAX_VECTORS_PER_REQUEST):
+    """
+    Groups a stream of upsert entries into batches that respect both Pinecone's
+    payload size limit and its per-request vector count limit.
+    """
+    batch = []
+    batch_bytes = 0
+    for vector in vectors:
+        size = estimate_vector_bytes(vector)
+        if batch and (batch_bytes + size > max_bytes or len(batch) >= max_count):
+            yield batch
+            batch = []
+            batch_bytes = 0
+        batch.append(vector)
+        batch_bytes += size
+    if batch:
+        yield batch
+
+
+def upsert_concurrently(index, batches, total=None, max_in_flight=MAX_IN_FLIGHT, on_batch_done=None, show_progress=True):
+    """
+    Upserts batches with up to `max_in_flight` requests outstanding at once.
+    `batches` yields (key, vectors) pairs; `on_batch_done(key, vectors, error)`
+    is called on the calling thread once a batch is acknowledged (error=None)
+    or has exhausted its retries. Failed batches are recorded instead of
+    aborting the run. Returns a report dict with the throughput and the IDs
+    that could not be written.
+    """
+    report = {"upserted": 0, "failed_ids": [], "errors": [], "seconds": 0.0, "vectors_per_second": 0.0}
+    started = time.perf_counter()
+    progress = tqdm(total=total, unit="vec", disable=not show_progress)
+
+    def finish(future, key, batch):
+        error = future.exception()
+        if error is None:
+            report["upserted"] += len(batch)
+        else:
+            report["failed_ids"].extend(vector["id"] for vector in batch)
+            report["errors"].append(str(error))
+            tqdm.write(f"Upsert failed for {len(batch)} vectors starting at {batch[0]['id']}: {error}")
+        if on_batch_done:
+            on_batch_done(key, batch, error)
+        progress.update(len(batch))
+
+    with ThreadPoolExecutor(max_workers=max_in_flight) as executor:
+        in_flight = {}
+        for key, batch in batches:
+            if len(in_flight) >= max_in_flight:
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    finish(future, *in_flight.pop(future))
+            future = executor.submit(call_with_backoff, index.upsert, vectors=batch)
+            in_flight[future] = (key, batch)
+
+        for future in list(in_flight):
+            finish(future, *in_flight.pop(future))
+
+    progress.close()
+    report["seconds"] = time.perf_counter() - started
+    if report["seconds"] > 0:
+        report["vectors_per_second"] = report["upserted"] / report["seconds"]
+    return report
+
+
+def delete_in_batches(index, ids, batch_size=DELETE_BATCH_SIZE, max_in_flight=MAX_IN_FLIGHT):
+    """
+    Deletes IDs in concurrent batches, retrying each batch with backoff.
+    Returns (deleted_ids, failed_ids).
+    """
+    batches = [ids[i:i + batch_size] for i in range(0, len(ids), batch_size)]
+    deleted, failed = [], []
+    with ThreadPoolExecutor(max_workers=max_in_flight) as executor:
+        futures = [executor.submit(call_with_backoff, index.delete, ids=batch_ids) for batch_ids in batches]
+        for batch_number, (future, batch_ids) in enumerate(zip(futures, batches), start=1):
+            error = future.exception()
+            if error is None:
+                deleted.extend(batch_ids)
+            else:
+                failed.extend(batch_ids)
+                print(f"An error occurred during deletion for batch {batch_number}: {error}")
+    return deleted, failed
+
+
+def fetch_existing_ids(index, ids, max_in_flight=MAX_IN_FLIGHT):
+    """
+    Returns the subset of `ids` that the index still returns from a bulk fetch.
+    """
+    batches = [ids[i:i + FETCH_BATCH_SIZE] for i in range(0, len(ids), FETCH_BATCH_SIZE)]
+
+    def fetch_batch(batch_ids):
+        return list(call_with_backoff(index.fetch, ids=batch_ids).vectors)
+
+    with ThreadPoolExecutor(max_workers=max_in_flight) as executor:
+        return [vector_id for found in executor.map(fetch_batch, batches) for vector_id in found]
+
+
+def wait_until_deleted(index, ids, timeout=VERIFY_TIMEOUT_SECONDS):
+    """
+    Polls with bulk fetches until none of `ids` is returned any more or the
+    deadline passes. The poll interval doubles while nothing changes and is
+    kept while deletions are still propagating. Returns the IDs that were
+    still present at the deadline (empty when fully verified).
+    """
+    deadline = time.monotonic() + timeout
+    remaining = list(ids)
+    delay = BASE_DELAY_SECONDS
+    while True:
+        still_present = fetch_existing_ids(index, remaining)
+        if not still_present:
+            return []
+        if len(still_present) == len(remaining):
+            delay = min(MAX_DELAY_SECONDS, delay * 2)
+        remaining = still_present
+        if time.monotonic() + delay > deadline:
+            return remaining
+        print(f"{len(remaining)} deleted IDs are still visible. Checking again in {delay:.1f}s...")
+        time.sleep(delay)
+
+
+def print_upload_report(report, failed_ids_file=None):
+    """
+    Prints the summary of an upsert run and optionally saves the failed IDs.
+    """
+    print(f"\nUpserted {report['upserted']} vectors in {report['seconds']:.1f}s "
+          f"({report['vectors_per_second']:.0f} vectors/sec).")
+    if not report["failed_ids"]:
+        print("No failed vectors.")
+        return
+
+    print(f"{len(report['failed_ids'])} vectors failed. Sample IDs: {report['failed_ids'][:5]}")
+    if failed_ids_file:
+        with open(failed_ids_file, "w", encoding="utf-8") as f:
+            f.write("\n".join(report["failed_ids"]) + "\n")
+        print(f"Failed IDs written to {failed_ids_file}.")
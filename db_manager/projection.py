@@ -0,0 +1,195 @@
+import os
+import json
+import random
+import argparse
+import numpy as np
+from embedding_store import PACKED_DIR, COPY_CHUNK_ROWS, PackedEmbeddings
+from local_search import TOP_K_MATCHES, ExactSearch, normalize_rows, top_k_blocked
+
+# --- Configuration ---
+NPY_FILE = "../data/fsd_embeddings.npy"
+PROJECTION_FILE = "../artifacts/projection.json"
+FORMAT_VERSION = 1
+NUM_QUERIES = 500
+
+# An artifact is a JSON header plus a raw little-endian float32 file next to it
+# (same name, .bin) so api/utils/projection.js can load it without numpy:
+#   header -> {"version", "method", "inputDim", "outputDim", "dtype", "byteOrder",
+#              "dataFile", "explainedVariance"}
+#   data   -> mean (inputDim) followed by components (outputDim x inputDim, row-major)
+# A query is reduced as components @ (embedding - mean), in the API and here.
+
+
+class Projection:
+    """
+    Linear dimensionality reduction: x -> components @ (x - mean).
+    """
+
+    def __init__(self, mean, components, method="pca", explained_variance=None):
+        self.mean = np.asarray(mean, dtype=np.float32)
+        self.components = np.asarray(components, dtype=np.float32)
+        self.method = method
+        self.explained_variance = explained_variance
+
+    @property
+    def input_dim(self):
+        return self.components.shape[1]
+
+    @property
+    def output_dim(self):
+        return self.components.shape[0]
+
+    def apply(self, vectors):
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if vectors.shape[-1] != self.input_dim:
+            raise ValueError(f"Expected {self.input_dim}-d vectors, got {vectors.shape[-1]}-d")
+        return (vectors - self.mean) @ self.components.T
+
+    def view(self, source):
+        """
+        Lazily projected view of a (possibly memory-mapped) matrix, so
+        write_packed() can stream reduced vectors chunk by chunk.
+        """
+        return ProjectedMatrix(source, self)
+
+
+def projected_dir(projection, packed_dir=PACKED_DIR):
+    """
+    Where the reduced copy of a packed store lives, e.g. ../data/embeddings_packed.256.
+    The full-dimension store stays at `packed_dir` for every local tool.
+    """
+    return f"{os.path.normpath(packed_dir)}.{projection.output_dim}"
+
+
+class ProjectedMatrix:
+    def __init__(self, source, projection):
+        self.source = source
+        self.projection = projection
+        self.shape = (source.shape[0], projection.output_dim)
+
+    def __len__(self):
+        return self.shape[0]
+
+    def __getitem__(self, key):
+        return self.projection.apply(self.source[key])
+
+
+def fit_pca(source, components, sample_rows=None, seed=0):
+    """
+    PCA via the eigendecomposition of the covariance matrix, accumulated in
+    float64 chunk by chunk so `source` may be memory-mapped.
+    """
+    rows = np.arange(source.shape[0])
+    if sample_rows and sample_rows < len(rows):
+        rows = np.sort(np.random.default_rng(seed).choice(len(rows), sample_rows, replace=False))
+
+    dim = source.shape[1]
+    total = np.zeros(dim, dtype=np.float64)
+    gram = np.zeros((dim, dim), dtype=np.float64)
+    for start in range(0, len(rows), COPY_CHUNK_ROWS):
+        chunk = np.asarray(source[rows[start:start + COPY_CHUNK_ROWS]], dtype=np.float64)
+        total += chunk.sum(axis=0)
+        gram += chunk.T @ chunk
+    mean = total / len(rows)
+    covariance = gram / len(rows) - np.outer(mean, mean)
+
+    eigenvalues, eigenvectors = np.linalg.eigh(covariance)
+    order = np.argsort(eigenvalues)[::-1][:components]
+    explained = float(eigenvalues[order].sum() / max(eigenvalues.sum(), 1e-12))
+    return Projection(mean, eigenvectors[:, order].T, "pca", explained)
+
+
+def fit_random(source, components, seed=0):
+    """
+    Gaussian random projection with orthonormal rows (no training data needed
+    beyond the dimension; the mean is zero so vectors are not re-centred).
+    """
+    rng = np.random.default_rng(seed)
+    q, _ = np.linalg.qr(rng.standard_normal((source.shape[1], components)))
+    return Projection(np.zeros(source.shape[1]), q.T, "random")
+
+
+def save_projection(projection, path=PROJECTION_FILE):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    data_file = os.path.splitext(os.path.basename(path))[0] + ".bin"
+    with open(os.path.join(os.path.dirname(path), data_file), "wb") as f:
+        f.write(projection.mean.astype("<f4").tobytes())
+        f.write(projection.components.astype("<f4").tobytes())
+    header = {
+        "version": FORMAT_VERSION,
+        "method": projection.method,
+        "inputDim": projection.input_dim,
+        "outputDim": projection.output_dim,
+        "dtype": "float32",
+        "byteOrder": "little",
+        "dataFile": data_file,
+        "explainedVariance": projection.explained_variance,
+    }
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(header, f, indent=2)
+
+
+def load_projection(path=PROJECTION_FILE):
+    with open(path, "r", encoding="utf-8") as f:
+        header = json.load(f)
+    if header.get("version") != FORMAT_VERSION:
+        raise ValueError(f"Unsupported projection version: {header.get('version')}")
+    data = np.fromfile(os.path.join(os.path.dirname(path), header["dataFile"]), dtype="<f4")
+    input_dim, output_dim = header["inputDim"], header["outputDim"]
+    if data.size != input_dim * (output_dim + 1):
+        raise ValueError(f"{header['dataFile']} does not match the dimensions in {path}")
+    return Projection(data[:input_dim], data[input_dim:].reshape(output_dim, input_dim),
+                      header["method"], header.get("explainedVariance"))
+
+
+def evaluate_projection(store, projection, num_queries=NUM_QUERIES, top_k=TOP_K_MATCHES, seed=0):
+    """
+    recall@k of cosine search in the reduced space against exact full-dimension
+    search, on held-out catalog items (the item itself is excluded).
+    """
+    rows = np.asarray(sorted(random.Random(seed).sample(range(len(store)), min(num_queries, len(store)))))
+    queries = np.asarray(store.vectors[rows], dtype=np.float32)
+    truth, _ = ExactSearch(store).search(queries, top_k + 1)
+
+    reduced = np.empty((len(store), projection.output_dim), dtype=np.float32)
+    for start in range(0, len(store), COPY_CHUNK_ROWS):
+        reduced[start:start + COPY_CHUNK_ROWS] = normalize_rows(
+            projection.apply(store.vectors[start:start + COPY_CHUNK_ROWS])
+        )
+    found, _ = top_k_blocked(normalize_rows(projection.apply(queries)), reduced, top_k + 1)
+    return float(np.mean([
+        len(set(f[f != r][:top_k].tolist()) & set(t[t != r][:top_k].tolist())) / top_k
+        for f, t, r in zip(found, truth, rows)
+    ]))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fit a dimensionality-reduction projection for the embeddings.")
+    parser.add_argument("--components", type=int, default=256, help="Output dimension.")
+    parser.add_argument("--method", choices=("pca", "random"), default="pca")
+    parser.add_argument("--sample", type=int, help="Fit PCA on this many random rows (default: all).")
+    parser.add_argument("--output", default=PROJECTION_FILE)
+    parser.add_argument("--packed", default=PACKED_DIR, help="Full-dimension packed store to measure recall on.")
+    parser.add_argument("--queries", type=int, default=NUM_QUERIES)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    embeddings = np.load(NPY_FILE, mmap_mode="r")
+    if not 0 < args.components < embeddings.shape[1]:
+        parser.error(f"--components must be between 1 and {embeddings.shape[1] - 1}")
+
+    print(f"Fitting {args.method} projection {embeddings.shape[1]} -> {args.components}...")
+    if args.method == "pca":
+        fitted = fit_pca(embeddings, args.components, args.sample, args.seed)
+        print(f"Explained variance: {100 * fitted.explained_variance:.1f}%")
+    else:
+        fitted = fit_random(embeddings, args.components, args.seed)
+    save_projection(fitted, args.output)
+    print(f"Projection written to {args.output}")
+
+    store = PackedEmbeddings(args.packed) if os.path.exists(args.packed) else None
+    if store is None or store.dim != fitted.input_dim:
+        print(f"Skipping the recall check: {args.packed} is missing or not a full-dimension store.")
+    else:
+        recall = evaluate_projection(store, fitted, args.queries, seed=args.seed)
+        print(f"recall@{TOP_K_MATCHES} vs full-dimension exact search: {recall:.3f}")
@@ -0,0 +1,103 @@
+import os
+import json
+import time
+import random
+import argparse
+import numpy as np
+from embedding_store import PACKED_DIR, STORAGE_DTYPES, PackedEmbeddings, write_packed
+from local_search import TOP_K_MATCHES, ExactSearch
+
+# --- Configuration ---
+RESULTS_DIR = "../data/eval"
+NUM_QUERIES = 500
+
+
+def quantized_copy(store, dtype):
+    """
+    Writes a copy of a float32 packed store in another storage dtype next to
+    it (e.g. ../data/embeddings_packed.int8) and opens it.
+    """
+    out_dir = f"{store.path.rstrip('/')}.{dtype}"
+    print(f"Writing {dtype} copy to {out_dir}...")
+    ids = (store.id(i) for i in range(len(store)))
+    urls = (store.url(i) for i in range(len(store)))
+    write_packed(out_dir, store.vectors, ids, urls, dtype)
+    return PackedEmbeddings(out_dir)
+
+
+def measure(engine, queries, query_rows, truth, top_k):
+    """
+    recall@k of `engine` against the float32 neighbours in `truth`, plus the
+    memory held by its vectors and search matrix and its batched throughput.
+    """
+    started = time.perf_counter()
+    found, _ = engine.search(queries, top_k + 1)
+    seconds = time.perf_counter() - started
+    recalls = [
+        len(set(f[f != r][:top_k].tolist()) & t) / top_k
+        for f, r, t in zip(found, query_rows, truth)
+    ]
+    return {
+        "dtype": engine.store.dtype,
+        "vector_bytes": int(engine.store.vectors.nbytes),
+        "search_bytes": int(engine.matrix.nbytes),
+        "recall": float(np.mean(recalls)),
+        "queries_per_second": len(queries) / seconds,
+    }
+
+
+def report(dtypes, num_queries=NUM_QUERIES, top_k=TOP_K_MATCHES, seed=0):
+    """
+    Compares float32 exact search with quantised copies of the packed store on
+    held-out catalog items (the item itself is excluded from its results).
+    """
+    store = PackedEmbeddings(PACKED_DIR)
+    if store.dtype != "float32":
+        raise ValueError(f"{PACKED_DIR} is stored as {store.dtype}; the baseline must be float32.")
+
+    rows = np.asarray(sorted(random.Random(seed).sample(range(len(store)), min(num_queries, len(store)))))
+    queries = np.asarray(store.vectors[rows], dtype=np.float32)
+
+    baseline = ExactSearch(store)
+    found, _ = baseline.search(queries, top_k + 1)
+    truth = [set(f[f != r][:top_k].tolist()) for f, r in zip(found, rows)]
+
+    results = [measure(baseline, queries, rows, truth, top_k)]
+    for dtype in dtypes:
+        results.append(measure(ExactSearch(quantized_copy(store, dtype)), queries, rows, truth, top_k))
+    return {"top_k": top_k, "queries": len(rows), "count": len(store), "dim": store.dim, "results": results}
+
+
+def print_report(summary):
+    base = summary["results"][0]
+    print(f"\n{summary['count']} vectors x {summary['dim']} dims, {summary['queries']} queries\n")
+    print(f"{'dtype':<9}{'vectors MB':>12}{'saved':>8}{'recall@' + str(summary['top_k']):>11}"
+          f"{'lost':>8}{'queries/s':>11}")
+    for row in summary["results"]:
+        saved = 1 - row["vector_bytes"] / base["vector_bytes"]
+        print(f"{row['dtype']:<9}{row['vector_bytes'] / 2 ** 20:>12.1f}{100 * saved:>7.1f}%"
+              f"{row['recall']:>11.3f}{base['recall'] - row['recall']:>8.3f}{row['queries_per_second']:>11.1f}")
+    print("(the normalised search matrix next to each store shrinks by the same ratio)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Report memory saved and recall lost by quantised storage.")
+    parser.add_argument("--dtypes", default="float16,int8", help="Comma-separated storage dtypes to compare.")
+    parser.add_argument("--queries", type=int, default=NUM_QUERIES)
+    parser.add_argument("--top-k", type=int, default=TOP_K_MATCHES)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    dtypes = [d.strip() for d in args.dtypes.split(",") if d.strip()]
+    for dtype in dtypes:
+        if dtype not in STORAGE_DTYPES or dtype == "float32":
+            parser.error(f"Unsupported dtype: {dtype}")
+
+    summary = report(dtypes, args.queries, args.top_k, args.seed)
+    print_report(summary)
+
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    result_file = os.path.join(RESULTS_DIR, f"quantization-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    with open(result_file, "w", encoding="utf-8") as f:
+        json.dump(summary, f, indent=2)
+    print(f"Results written to {result_file}")
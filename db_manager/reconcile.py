@@ -0,0 +1,170 @@
+import os
+import json
+import argparse
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from tqdm import tqdm
+from embedding_store import PACKED_DIR, PackedEmbeddings
+from manifest import compute_hashes, manifest_path, row_hash, save_manifest
+from pinecone_io import (
+    FETCH_BATCH_SIZE, MAX_IN_FLIGHT, call_with_backoff, connect_to_index, delete_in_batches,
+    print_upload_report, upsert_concurrently
+)
+from upload import INDEX_NAME, iter_range_batches, rows_to_ranges
+
+# --- Configuration ---
+REPORT_FILE = "../data/reconcile_report.json"
+LIST_PAGE_SIZE = 100
+SAMPLE_SIZE = 10
+
+
+def iter_index_ids(index):
+    """
+    Pages through every vector ID in the index's default namespace.
+    """
+    token = None
+    while True:
+        kwargs = {"limit": LIST_PAGE_SIZE}
+        if token:
+            kwargs["pagination_token"] = token
+        page = call_with_backoff(index.list_paginated, **kwargs)
+        for vector in page.vectors or []:
+            yield vector.id
+        token = page.pagination.next if page.pagination else None
+        if not token:
+            return
+
+
+def fetch_remote_state(index, ids, check_vectors=False, max_in_flight=MAX_IN_FLIGHT):
+    """
+    Fetches the given IDs in concurrent batches and returns {id: (freesound_url, vector_hash)}.
+    vector_hash is None unless check_vectors is set.
+    """
+    def fetch_batch(batch_ids):
+        response = call_with_backoff(index.fetch, ids=batch_ids)
+        state = {}
+        for vector_id, vector in response.vectors.items():
+            url = (vector.metadata or {}).get("freesound_url", "")
+            digest = row_hash(np.asarray(vector.values, dtype=np.float32), url) if check_vectors else None
+            state[vector_id] = (url, digest)
+        return state
+
+    remote = {}
+    batches = [ids[i:i + FETCH_BATCH_SIZE] for i in range(0, len(ids), FETCH_BATCH_SIZE)]
+    with ThreadPoolExecutor(max_workers=max_in_flight) as executor:
+        for state in tqdm(executor.map(fetch_batch, batches), total=len(batches), desc="Fetching"):
+            remote.update(state)
+    return remote
+
+
+def reconcile(
+    packed_dir=PACKED_DIR, index_name=INDEX_NAME, check_vectors=False, fix=False, max_in_flight=MAX_IN_FLIGHT
+):
+    """
+    Compares the live index against the local packed store and reports (or
+    fixes) drift: IDs missing from the index, IDs that should not be there,
+    metadata mismatches and, optionally, vector checksum mismatches.
+    """
+    if not os.path.exists(packed_dir):
+        print(f"Error: {packed_dir} not found. Please create it first (upload.py).")
+        return
+
+    store = PackedEmbeddings(packed_dir)
+    local_ids = [store.id(i) for i in range(len(store))]
+    row_of = {vector_id: i for i, vector_id in enumerate(local_ids)}
+
+    index = connect_to_index(index_name)
+
+    print("Listing index IDs...")
+    remote_ids = set(tqdm(iter_index_ids(index), desc="Listing", unit="id"))
+
+    missing = [vector_id for vector_id in local_ids if vector_id not in remote_ids]
+    extra = sorted(remote_ids - set(row_of))
+    shared = [vector_id for vector_id in local_ids if vector_id in remote_ids]
+
+    remote = fetch_remote_state(index, shared, check_vectors=check_vectors, max_in_flight=max_in_flight)
+    local_hashes = compute_hashes(store) if check_vectors else {}
+
+    metadata_mismatch = []
+    vector_mismatch = []
+    for vector_id in shared:
+        if vector_id not in remote:
+            # Listed but not fetchable yet (eventual consistency); treat as missing.
+            missing.append(vector_id)
+            continue
+        url, digest = remote[vector_id]
+        if url != store.url(row_of[vector_id]):
+            metadata_mismatch.append(vector_id)
+        elif check_vectors and digest != local_hashes[vector_id]:
+            vector_mismatch.append(vector_id)
+
+    report = {
+        "index": index_name,
+        "local_count": len(local_ids),
+        "remote_count": len(remote_ids),
+        "missing": missing,
+        "extra": extra,
+        "metadata_mismatch": metadata_mismatch,
+        "vector_mismatch": vector_mismatch,
+        "vectors_checked": check_vectors,
+    }
+    with open(REPORT_FILE, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+
+    print(f"\nLocal vectors: {len(local_ids)}, index vectors: {len(remote_ids)}")
+    for key in ("missing", "extra", "metadata_mismatch", "vector_mismatch"):
+        print(f"  {key}: {len(report[key])} {report[key][:SAMPLE_SIZE]}")
+    print(f"Full report written to {REPORT_FILE}.")
+
+    to_upsert = missing + metadata_mismatch + vector_mismatch
+    if not to_upsert and not extra:
+        print("The index matches the local dataset.")
+        return
+    if not fix:
+        print("Run with --fix to repair the drift.")
+        return
+
+    confirm = input(
+        f"Upsert {len(to_upsert)} and delete {len(extra)} vectors in the '{index_name}' index? [y/N]: "
+    ).lower().strip()
+    if confirm != 'y':
+        print("Reconciliation cancelled by user.")
+        return
+
+    upsert_report = upsert_concurrently(
+        index, iter_range_batches(store, rows_to_ranges(sorted(row_of[i] for i in to_upsert))),
+        total=len(to_upsert), max_in_flight=max_in_flight
+    )
+    print_upload_report(upsert_report)
+    deleted, failed_deletes = delete_in_batches(index, extra)
+    print(f"Deleted {len(deleted)} vectors, {len(failed_deletes)} deletions failed.")
+
+    if check_vectors and not upsert_report["failed_ids"] and not failed_deletes:
+        # The index now provably matches the store, so it is a valid incremental baseline.
+        save_manifest(local_hashes, manifest_path(index_name), index_name)
+        print(f"Manifest updated: {manifest_path(index_name)}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare the Pinecone index against the local dataset.")
+    parser.add_argument(
+        "--check-vectors", action="store_true",
+        help="Also compare vector checksums, not just IDs and metadata."
+    )
+    parser.add_argument("--fix", action="store_true", help="Upsert missing/stale vectors and delete extra ones.")
+    parser.add_argument(
+        "--max-in-flight", type=int, default=MAX_IN_FLIGHT,
+        help="Number of fetch/upsert requests sent to Pinecone concurrently."
+    )
+    parser.add_argument(
+        "--packed", default=PACKED_DIR,
+        help="Packed store the index was uploaded from (e.g. ../data/embeddings_packed.256 after upload.py --projection)."
+    )
+    parser.add_argument(
+        "--index", default=INDEX_NAME,
+        help=f"Pinecone index to compare against (default: {INDEX_NAME}). "
+             "Use the reduced-dimension index with a projected store."
+    )
+    args = parser.parse_args()
+
+    reconcile(args.packed, args.index, check_vectors=args.check_vectors, fix=args.fix, max_in_flight=args.max_in_flight)
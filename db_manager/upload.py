@@ -2,21 +2,32 @@ import os
 import csv
 import numpy as np
 import json
-from pinecone import Pinecone
-from tqdm import tqdm
-import getpass
+import argparse
+from embedding_store import PACKED_DIR, STORAGE_DTYPES, PackedEmbeddings, write_packed
+from upload_journal import UploadJournal, journal_path
+from projection import PROJECTION_FILE, load_projection, projected_dir
+from catalog_artifact import CATALOG_DIR, write_catalog
+from quantization_report import quantized_copy
+from manifest import compute_hashes, diff_manifests, load_manifest, manifest_path, save_manifest
+from pinecone_io import (
+    MAX_IN_FLIGHT, connect_to_index, delete_in_batches, iter_sized_batches, print_upload_report,
+    upsert_concurrently
+)
 
 # --- Configuration ---
 NPY_FILE = "../data/fsd_embeddings.npy"
 CSV_FILE = "../data/fsd50k_with_freesound_urls.csv"
 OUTPUT_JSON = "../data/embeddings.json"
+FAILED_IDS_FILE = "../data/upload_failed_ids.txt"
 INDEX_NAME = "imitune-search"
+READ_CHUNK_ROWS = 1000
 
 
 def npy_csv_to_json():
     """
     Converts .npy and .csv files into a single JSON file.
     This function uses the exact format you provided.
+    Only needed for older tooling; everything in this repo reads the packed store.
     """
     print(f"Starting conversion to {OUTPUT_JSON}...")
 
@@ -51,60 +62,322 @@ def npy_csv_to_json():
     print("JSON file creation complete.")
 
 
-def upload_to_pinecone():
+def iter_csv_urls():
     """
-    Reads data from the generated JSON file and upserts it to Pinecone.
+    Yields the freesound_url column of the CSV file row by row.
     """
-    if not os.path.exists(OUTPUT_JSON):
-        print(f"Error: {OUTPUT_JSON} not found. Please create it first.")
-        return
+    with open(CSV_FILE, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            yield row["freesound_url"]
+
+
+def npy_csv_to_packed():
+    """
+    Converts .npy and .csv files into the packed format (see embedding_store.py).
+    The .npy file is memory-mapped and the CSV is streamed, so memory use stays flat.
+    The store is always full-dimension float32: every local tool reads it.
+    Also writes the id -> freesound_url side table that api/search.js resolves
+    result URLs from (catalog_artifact.py).
+    """
+    print(f"Starting conversion to {PACKED_DIR}...")
+    embeddings = np.load(NPY_FILE, mmap_mode="r")
+    ids = (f"{(i + 1):012d}" for i in range(embeddings.shape[0]))  # 12-digit zero-padded ID
+
+    write_packed(PACKED_DIR, embeddings, ids, iter_csv_urls())
+    print(f"Packed {embeddings.shape[0]} items into {PACKED_DIR}.")
+    write_catalog(PackedEmbeddings(PACKED_DIR), CATALOG_DIR)
+
 
-    # Get API Key securely and initialize Pinecone
-    api_key = os.getenv("PINECONE_API_KEY") or getpass.getpass("Please enter your Pinecone API Key: ")
-    if not api_key:
-        raise ValueError("Pinecone API Key was not provided.")
-
-    pc = Pinecone(api_key=api_key)
-    index = pc.Index(INDEX_NAME)
-    print(f"\nSuccessfully connected to Pinecone index '{INDEX_NAME}'.")
-
-    # Load data from the JSON file
-    print(f"Loading data from {OUTPUT_JSON}...")
-    with open(OUTPUT_JSON, "r", encoding="utf-8") as f:
-        embeddings_data = json.load(f)
-
-    # Upsert data in batches
-    batch_size = 100
-    print(f"Starting upsert process in batches of {batch_size}...")
-
-    for i in tqdm(range(0, len(embeddings_data), batch_size)):
-        batch = embeddings_data[i:i + batch_size]
-        vectors_to_upsert = [{
-            "id": item['id'],
-            "values": item['embedding'],
-            "metadata": {
-                "freesound_url": item['freesound_url']
+def pack_projected(projection_file):
+    """
+    Writes the packed store reduced by a projection from projection.py into
+    its own directory (see projected_dir()) and returns that directory.
+    api/search.js must apply the same artifact to incoming queries.
+    """
+    store = PackedEmbeddings(PACKED_DIR)
+    projection = load_projection(projection_file)
+    out_dir = projected_dir(projection)
+    print(f"Reducing {projection.input_dim} -> {projection.output_dim} dims with {projection_file} into {out_dir}...")
+    ids = (store.id(i) for i in range(len(store)))
+    urls = (store.url(i) for i in range(len(store)))
+    write_packed(out_dir, projection.view(store.vectors), ids, urls)
+    return out_dir
+
+
+def iter_vectors(store, start=0, end=None, chunk_rows=READ_CHUNK_ROWS):
+    """
+    Yields upsert entries for rows [start, end) straight from the memory-mapped
+    packed store. Rows are converted chunk by chunk, so memory use stays flat
+    regardless of the catalog size.
+    """
+    end = len(store) if end is None else end
+    for chunk_start in range(start, end, chunk_rows):
+        chunk_end = min(chunk_start + chunk_rows, end)
+        values = np.asarray(store.vectors[chunk_start:chunk_end], dtype=np.float32).tolist()
+        for i, vector in zip(range(chunk_start, chunk_end), values):
+            yield {
+                "id": store.id(i),
+                "values": vector,
+                "metadata": {
+                    "freesound_url": store.url(i)
+                }
             }
-        } for item in batch]
 
-        try:
-            index.upsert(vectors=vectors_to_upsert)
-        except Exception as e:
-            print(f"An error occurred during upsert for batch {i // batch_size + 1}: {e}")
+
+def iter_range_batches(store, ranges):
+    """
+    Yields ((start, end), batch) pairs covering the given row ranges, with
+    each batch sized by iter_sized_batches().
+    """
+    for start, end in ranges:
+        row = start
+        for batch in iter_sized_batches(iter_vectors(store, start, end)):
+            yield (row, row + len(batch)), batch
+            row += len(batch)
+
+
+def rows_to_ranges(rows):
+    """
+    Collapses sorted row indices into contiguous [start, end) ranges.
+    """
+    ranges = []
+    for row in rows:
+        if ranges and ranges[-1][1] == row:
+            ranges[-1][1] = row + 1
+        else:
+            ranges.append([row, row + 1])
+    return [tuple(r) for r in ranges]
+
+
+def dataset_fingerprint(store, index_name=INDEX_NAME):
+    """
+    Identifies the packed dataset and target index, so a journal is never
+    replayed against different data.
+    """
+    stat = os.stat(os.path.join(store.path, "vectors.npy"))
+    return {
+        "index": index_name,
+        "count": len(store),
+        "dim": store.dim,
+        "size": stat.st_size,
+        "mtime": int(stat.st_mtime),
+    }
+
+
+def open_upload_store(packed_dir=PACKED_DIR):
+    """
+    Opens the packed store that feeds Pinecone, refusing quantised stores
+    (written by older versions of --quantize) so the index only ever
+    receives float32 vectors.
+    """
+    store = PackedEmbeddings(packed_dir)
+    if store.dtype != "float32":
+        raise ValueError(f"{packed_dir} is stored as {store.dtype}; repack it as float32 before uploading.")
+    return store
+
+
+def print_journal_status(packed_dir=PACKED_DIR, index_name=INDEX_NAME):
+    """
+    Summarises the checkpoint journal of the current or last upload run to an index.
+    """
+    journal_file = journal_path(index_name)
+    if not os.path.exists(journal_file) or not os.path.exists(packed_dir):
+        print(f"No upload journal found at {journal_file}.")
+        return
+
+    store = PackedEmbeddings(packed_dir)
+    journal = UploadJournal(journal_file, dataset_fingerprint(store, index_name), read_only=True)
+    if journal.mismatch:
+        print(f"Warning: {journal_file} was written for a different dataset or index; "
+              "the next --resume run will start over.")
+        print(f"  journal: {journal.recorded_fingerprint}")
+        print(f"  current: {journal.fingerprint}")
+    done = journal.acknowledged_count()
+    print(f"Acknowledged: {done}/{len(store)} vectors ({100 * done / max(len(store), 1):.1f}%)")
+    print(f"Pending ranges: {journal.pending_ranges(len(store))[:10]}")
+    print(f"Failed ranges: {journal.failed_ranges()[:10]}")
+
+
+def upload_to_pinecone(
+    packed_dir=PACKED_DIR, index_name=INDEX_NAME, max_in_flight=MAX_IN_FLIGHT, resume=False, show_progress=True
+):
+    """
+    Reads data from the packed store and upserts it to the `index_name` Pinecone index with several
+    size-capped batches in flight at once. Every acknowledged batch is written
+    to the checkpoint journal; with `resume=True` only rows that were never
+    acknowledged (including failed ranges) are sent again.
+    """
+    if not os.path.exists(packed_dir):
+        print(f"Error: {packed_dir} not found. Please create it first.")
+        return
+
+    store = open_upload_store(packed_dir)
+    index = connect_to_index(index_name)
+    journal_file = journal_path(index_name)
+    journal = UploadJournal(journal_file, dataset_fingerprint(store, index_name), resume=resume)
+
+    pending = journal.pending_ranges(len(store))
+    remaining = sum(end - start for start, end in pending)
+    if not remaining:
+        print(f"All {len(store)} vectors are already acknowledged in {journal_file}.")
+        return
+    if remaining < len(store):
+        print(f"Resuming: {len(store) - remaining} vectors already acknowledged, {remaining} to go.")
+
+    def record(batch_range, batch, error):
+        journal.record(*batch_range, ok=error is None, error=error)
+
+    print(f"Starting upsert process of {remaining} vectors with {max_in_flight} batches in flight...")
+    report = upsert_concurrently(
+        index, iter_range_batches(store, pending), total=remaining,
+        max_in_flight=max_in_flight, on_batch_done=record, show_progress=show_progress
+    )
+    print_upload_report(report, FAILED_IDS_FILE)
+    if report["failed_ids"]:
+        print("Run again with --resume to retry only the failed ranges.")
+
+    # Record what the index now holds, so the next --incremental run only sends the diff.
+    # Entries of the previous manifest are kept: IDs dropped from the catalog are
+    # still in the index until an --incremental run deletes them.
+    hashes = list(compute_hashes(store).items())
+    manifest_file = manifest_path(index_name)
+    manifest = load_manifest(manifest_file, index_name)
+    manifest.update(
+        (vector_id, digest) for start, end in journal.acknowledged for vector_id, digest in hashes[start:end]
+    )
+    stale = len(manifest.keys() - dict(hashes).keys())
+    save_manifest(manifest, manifest_file, index_name)
+    if stale:
+        print(f"{stale} IDs in the index are no longer in the catalog; run --incremental to delete them.")
 
     print("\nData upsert process has been completed.")
     print(index.describe_index_stats())
 
 
+def incremental_upload(
+    packed_dir=PACKED_DIR, index_name=INDEX_NAME, max_in_flight=MAX_IN_FLIGHT, show_progress=True
+):
+    """
+    Upserts only the rows whose vector or metadata changed since the last
+    upload, and deletes IDs that disappeared, by diffing per-ID content hashes
+    against the manifest. The manifest is updated only for acknowledged
+    writes, so failures are picked up again by the next run.
+    """
+    if not os.path.exists(packed_dir):
+        print(f"Error: {packed_dir} not found. Please create it first.")
+        return
+
+    store = open_upload_store(packed_dir)
+    print("Hashing the packed store...")
+    new_hashes = compute_hashes(store)
+    manifest_file = manifest_path(index_name)
+    manifest = load_manifest(manifest_file, index_name)
+    if not manifest:
+        print(f"No manifest found at {manifest_file}; every vector counts as changed.")
+
+    changed, removed = diff_manifests(manifest, new_hashes)
+    print(f"{len(changed)} vectors to upsert, {len(removed)} to delete, "
+          f"{len(new_hashes) - len(changed)} unchanged.")
+    if not changed and not removed:
+        return
+
+    index = connect_to_index(index_name)
+
+    row_of = {vector_id: i for i, vector_id in enumerate(new_hashes)}
+
+    def record(batch_range, batch, error):
+        if error is None:
+            for vector in batch:
+                manifest[vector["id"]] = new_hashes[vector["id"]]
+
+    report = upsert_concurrently(
+        index, iter_range_batches(store, rows_to_ranges(sorted(row_of[i] for i in changed))),
+        total=len(changed), max_in_flight=max_in_flight, on_batch_done=record, show_progress=show_progress
+    )
+    print_upload_report(report, FAILED_IDS_FILE)
+
+    deleted, failed_deletes = delete_in_batches(index, removed)
+    for vector_id in deleted:
+        manifest.pop(vector_id, None)
+    print(f"Deleted {len(deleted)} vectors, {len(failed_deletes)} deletions failed.")
+
+    save_manifest(manifest, manifest_file, index_name)
+    print(f"Manifest updated: {manifest_file}")
+
+
 if __name__ == "__main__":
-    should_create_json = True
-    if os.path.exists(OUTPUT_JSON):
-        overwrite = input(f"{OUTPUT_JSON} already exists. Overwrite? [y/N]: ").lower().strip()
-        if overwrite != 'y':
-            print("Skipping JSON file creation.")
-            should_create_json = False
+    parser = argparse.ArgumentParser(description="Upload FSD50K embeddings to Pinecone.")
+    parser.add_argument(
+        "--export-json", action="store_true",
+        help=f"Also write the legacy {OUTPUT_JSON} file for older tooling."
+    )
+    parser.add_argument(
+        "--max-in-flight", type=int, default=MAX_IN_FLIGHT,
+        help="Number of upsert requests sent to Pinecone concurrently."
+    )
+    parser.add_argument(
+        "--resume", action="store_true",
+        help=f"Reuse the existing packed store and skip batches acknowledged in {journal_path('<index>')}."
+    )
+    parser.add_argument(
+        "--incremental", action="store_true",
+        help=f"Only upsert changed rows and delete removed ones, based on {manifest_path('<index>')}."
+    )
+    parser.add_argument(
+        "--no-progress", action="store_true",
+        help="Disable the progress bar (for background runs; check --status instead)."
+    )
+    parser.add_argument(
+        "--quantize", choices=STORAGE_DTYPES[1:],
+        help="Also write a quantised copy of the packed store for local search "
+             "(e.g. ../data/embeddings_packed.int8). Pinecone always receives the float32 vectors."
+    )
+    parser.add_argument(
+        "--projection", nargs="?", const=PROJECTION_FILE,
+        help=f"Upload vectors reduced by a projection artifact (default: {PROJECTION_FILE}). "
+             "They are packed into ../data/embeddings_packed.<dim>; the full store is kept. Requires --index."
+    )
+    parser.add_argument(
+        "--index",
+        help=f"Pinecone index to upload to (default: {INDEX_NAME}). Required with --projection: "
+             "the index must have the reduced dimension."
+    )
+    parser.add_argument(
+        "--status", action="store_true",
+        help="Print the progress recorded in the upload journal and exit."
+    )
+    args = parser.parse_args()
+    if args.projection and not args.index:
+        parser.error(f"--projection requires --index: '{INDEX_NAME}' holds the full-dimension vectors.")
+    index_name = args.index or INDEX_NAME
+
+    packed_dir = projected_dir(load_projection(args.projection)) if args.projection else PACKED_DIR
+    if args.status:
+        print_journal_status(packed_dir, index_name)
+    else:
+        should_pack = not args.resume
+        if should_pack and os.path.exists(PACKED_DIR):
+            overwrite = input(f"{PACKED_DIR} already exists. Overwrite? [y/N]: ").lower().strip()
+            if overwrite != 'y':
+                print("Skipping packed file creation.")
+                should_pack = False
+
+        if should_pack:
+            npy_csv_to_packed()
+        if args.projection and (should_pack or not os.path.exists(packed_dir)):
+            pack_projected(args.projection)
+        if args.quantize:
+            quantized_copy(PackedEmbeddings(PACKED_DIR), args.quantize)
 
-    if should_create_json:
-        npy_csv_to_json()
+        if args.export_json:
+            npy_csv_to_json()
 
-    upload_to_pinecone()
+        if args.incremental:
+            incremental_upload(
+                packed_dir, index_name, max_in_flight=args.max_in_flight, show_progress=not args.no_progress
+            )
+        else:
+            upload_to_pinecone(
+                packed_dir, index_name, max_in_flight=args.max_in_flight, resume=args.resume,
+                show_progress=not args.no_progress
+            )
@@ -0,0 +1,133 @@
+import os
+import json
+import time
+
+# --- Configuration ---
+# One journal per target index, like the manifest
+JOURNAL_FILE = "../data/upload_journal.{index}.jsonl"
+
+
+def journal_path(index_name):
+    """
+    Path of the checkpoint journal for uploads to one Pinecone index.
+    """
+    return JOURNAL_FILE.format(index=index_name)
+
+
+def _merge_ranges(ranges):
+    """
+    Merges overlapping or adjacent [start, end) ranges.
+    """
+    merged = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return [tuple(r) for r in merged]
+
+
+def _subtract_ranges(ranges, covered):
+    """
+    Returns the parts of `ranges` that are not inside any `covered` range.
+    """
+    remaining = []
+    for start, end in ranges:
+        cursor = start
+        for c_start, c_end in covered:
+            if c_end <= cursor or c_start >= end:
+                continue
+            if c_start > cursor:
+                remaining.append((cursor, c_start))
+            cursor = max(cursor, c_end)
+        if cursor < end:
+            remaining.append((cursor, end))
+    return remaining
+
+
+class UploadJournal:
+    """
+    Append-only checkpoint journal for upload.py. The first line identifies the
+    dataset/index the journal belongs to; every following line records one batch
+    of rows [start, end) as acknowledged ("ok") or failed. Each line is flushed
+    to disk as soon as Pinecone answers, so a killed run can resume from it.
+    With `read_only=True` the file is only inspected: a journal of another
+    dataset is loaded anyway and flagged with `mismatch`, never reset.
+    """
+
+    def __init__(self, path, fingerprint=None, resume=True, read_only=False):
+        self.path = path
+        self.fingerprint = fingerprint
+        self.read_only = read_only
+        self.mismatch = False
+        self.recorded_fingerprint = None
+        self.acknowledged = []
+        self.failed = []
+
+        if read_only or (resume and os.path.exists(path)):
+            self._load()
+        else:
+            self._start()
+
+    def _start(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with open(self.path, "w", encoding="utf-8") as f:
+            f.write(json.dumps({"fingerprint": self.fingerprint, "startedAt": time.time()}) + "\n")
+
+    def _load(self):
+        with open(self.path, "r", encoding="utf-8") as f:
+            lines = f.read().splitlines()
+        header = json.loads(lines[0]) if lines else {}
+        self.recorded_fingerprint = header.get("fingerprint")
+        self.mismatch = self.recorded_fingerprint != self.fingerprint
+        if self.mismatch and not self.read_only:
+            print(f"Journal {self.path} belongs to a different dataset or index. Starting over.")
+            self._start()
+            return
+
+        for line in lines[1:]:
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                # A torn final line from a killed process; that batch simply gets retried.
+                continue
+            batch_range = (entry["start"], entry["end"])
+            if entry["status"] == "ok":
+                self.acknowledged.append(batch_range)
+            else:
+                self.failed.append(batch_range)
+        self.acknowledged = _merge_ranges(self.acknowledged)
+
+    def record(self, start, end, ok, error=None):
+        """
+        Appends the outcome of one batch and syncs it to disk.
+        """
+        if self.read_only:
+            raise RuntimeError(f"Journal {self.path} was opened read-only.")
+        entry = {"start": start, "end": end, "status": "ok" if ok else "failed"}
+        if error:
+            entry["error"] = str(error)[:500]
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(entry) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+        if ok:
+            self.acknowledged = _merge_ranges(self.acknowledged + [(start, end)])
+        else:
+            self.failed.append((start, end))
+
+    def pending_ranges(self, total):
+        """
+        Row ranges of [0, total) that have not been acknowledged yet.
+        """
+        return _subtract_ranges([(0, total)], self.acknowledged)
+
+    def failed_ranges(self):
+        """
+        Ranges that failed and have not been acknowledged by a later retry.
+        """
+        return _subtract_ranges(_merge_ranges(self.failed), self.acknowledged)
+
+    def acknowledged_count(self):
+        return sum(end - start for start, end in self.acknowledged)
@@ -0,0 +1,73 @@
+"""
+Helpers for the streaming /api/feedback upload: a multipart/form-data body
+with a `metadata` part (the feedback fields as JSON) followed by the `audio`
+part. The body is generated part by part, so the recording is never loaded
+into memory.
+"""
+
+import json
+import os
+import uuid
+
+
+class MultipartFeedbackBody:
+    """
+    Iterable multipart body for requests. `audio` is bytes, an open binary
+    file, or an iterable of byte chunks. With bytes or a file the body is
+    sized and requests sends a Content-Length; chunks have no known length,
+    so the body has to be sent as iter(body), with chunked transfer encoding.
+    """
+
+    CHUNK_SIZE = 64 * 1024
+
+    def __init__(self, audio, content_type="audio/webm", **fields):
+        self.audio = audio
+        self.boundary = uuid.uuid4().hex
+        self.head = (
+            f"--{self.boundary}\r\n"
+            'Content-Disposition: form-data; name="metadata"\r\n'
+            "Content-Type: application/json\r\n\r\n"
+            f"{json.dumps(fields)}\r\n"
+            f"--{self.boundary}\r\n"
+            'Content-Disposition: form-data; name="audio"; filename="recording"\r\n'
+            f"Content-Type: {content_type}\r\n\r\n"
+        ).encode()
+        self.tail = f"\r\n--{self.boundary}--\r\n".encode()
+
+    @property
+    def content_type(self):
+        return f"multipart/form-data; boundary={self.boundary}"
+
+    @property
+    def sized(self):
+        return isinstance(self.audio, (bytes, bytearray)) or hasattr(self.audio, "fileno")
+
+    def __len__(self):
+        if isinstance(self.audio, (bytes, bytearray)):
+            audio_length = len(self.audio)
+        elif hasattr(self.audio, "fileno"):
+            audio_length = os.fstat(self.audio.fileno()).st_size - self.audio.tell()
+        else:
+            raise TypeError("the length of a chunked audio body is unknown")
+        return len(self.head) + audio_length + len(self.tail)
+
+    def __iter__(self):
+        yield self.head
+        if isinstance(self.audio, (bytes, bytearray)):
+            yield bytes(self.audio)
+        elif hasattr(self.audio, "read"):
+            while chunk := self.audio.read(self.CHUNK_SIZE):
+                yield chunk
+        else:
+            yield from self.audio
+        yield self.tail
+
+
+def stream_feedback(session, url, audio, content_type="audio/webm", timeout=30, **fields):
+    """
+    POSTs `audio` (bytes, an open binary file, or a generator of chunks) with
+    the feedback fields, e.g. stream_feedback(requests, url, f, freesound_urls=[...], ratings=[...]).
+    """
+    body = MultipartFeedbackBody(audio, content_type, **fields)
+    data = body if body.sized else iter(body)
+    return session.post(url, data=data, headers={"Content-Type": body.content_type}, timeout=timeout)
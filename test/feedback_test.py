@@ -3,6 +3,8 @@ import requests
 import base64
 import json
 
+from feedback_client import stream_feedback
+
 # --- Configuration ---
 LOCAL_API_URL = "http://localhost:3000/api/feedback"
 SAMPLE_AUDIO_FILE = "../data/sample_query.webm"
@@ -11,7 +13,7 @@ SAMPLE_AUDIO_FILE = "../data/sample_query.webm"
 def test_feedback_api():
     """
     Simulates a frontend request by sending a sample audio file and feedback
-    data to the local Vercel development server.
+    data to the local Vercel development server (base64 data URL in JSON).
     """
     # 1. Check if the sample audio file exists
     if not os.path.exists(SAMPLE_AUDIO_FILE):
@@ -66,5 +68,54 @@ def test_feedback_api():
             print("Raw server error response:", e.response.text)
 
 
+def test_feedback_api_streaming():
+    """
+    Sends the same sample as a streaming upload: a multipart body with the
+    feedback fields in a metadata part before the audio. Then checks that an
+    oversized body is rejected with 413 and an update by audioId still works.
+    """
+    if not os.path.exists(SAMPLE_AUDIO_FILE):
+        print(f"❌ Error: Sample audio file not found at '{SAMPLE_AUDIO_FILE}'.")
+        return
+
+    fields = {
+        "freesound_urls": [
+            "https://freesound.org/people/user/sounds/12345/", None, "https://freesound.org/people/user/sounds/67890/"
+        ],
+        "ratings": ["like", None, "dislike"],
+    }
+
+    print(f"\nStreaming {SAMPLE_AUDIO_FILE} to local server: {LOCAL_API_URL}...")
+    try:
+        # The open file is streamed by requests, not read into memory first
+        with open(SAMPLE_AUDIO_FILE, "rb") as f:
+            response = stream_feedback(requests, LOCAL_API_URL, f, "audio/webm", **fields)
+        response.raise_for_status()
+        response_data = response.json()
+        print("✅ Success! Streaming upload accepted.")
+        print(json.dumps(response_data, indent=2))
+
+        print("\nSending an update for the same audioId (JSON, no audio)...")
+        update = requests.post(LOCAL_API_URL, json={"audioId": response_data["audioId"], **fields}, timeout=30)
+        update.raise_for_status()
+        print(f"✅ Update accepted: {update.json()['metadataUrl']}")
+    except requests.exceptions.RequestException as e:
+        print(f"\n❌ An error occurred while communicating with the server:")
+        print(e)
+        if e.response is not None:
+            print("Raw server error response:", e.response.text)
+        return
+
+    print("\nStreaming an 11MB body (should be rejected with 413)...")
+    # A generator is sent with chunked encoding (no Content-Length), so the limit is hit mid-stream
+    chunks = (b"\x00" * 65536 for _ in range(176))
+    response = stream_feedback(requests, LOCAL_API_URL, chunks, "audio/webm", **fields)
+    if response.status_code == 413:
+        print(f"✅ PASS: {response.json()['error']}")
+    else:
+        print(f"❌ FAIL: expected 413, got {response.status_code}: {response.text}")
+
+
 if __name__ == "__main__":
     test_feedback_api()
+    test_feedback_api_streaming()
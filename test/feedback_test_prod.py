@@ -3,6 +3,8 @@ import requests
 import base64
 import json
 
+from feedback_client import stream_feedback
+
 # --- Production Configuration ---
 PROD_API_URL = "https://imitune-backend-bptzlaz7e-chris-projects-3c0d9932.vercel.app/api/feedback"  # Replace with your actual Vercel URL
 SAMPLE_AUDIO_FILE = "../data/sample_query.webm"
@@ -60,6 +62,36 @@ def test_feedback_api_prod():
         print("4. Check Vercel logs for any deployment errors")
 
 
+def test_feedback_api_prod_streaming():
+    """
+    Same submission as a streaming upload (multipart body, fields in a metadata part before the audio).
+    Vercel caps request bodies at 4.5MB, so keep the sample below that
+    """
+    if not os.path.exists(SAMPLE_AUDIO_FILE):
+        print(f"❌ Error: Sample audio file not found at '{SAMPLE_AUDIO_FILE}'.")
+        return
+
+    print(f"Streaming {SAMPLE_AUDIO_FILE} to production server: {PROD_API_URL}...")
+    try:
+        with open(SAMPLE_AUDIO_FILE, "rb") as f:
+            response = stream_feedback(
+                requests, PROD_API_URL, f, "audio/webm", timeout=60,
+                freesound_urls=[
+                    "https://freesound.org/people/user/sounds/12345/", None,
+                    "https://freesound.org/people/user/sounds/67890/"
+                ],
+                ratings=["like", None, "dislike"],
+            )
+        response.raise_for_status()
+        print("\n✅ Success! Streaming upload accepted by production.")
+        print(json.dumps(response.json(), indent=2))
+    except requests.exceptions.RequestException as e:
+        print(f"\n❌ Streaming upload failed: {e}")
+        if hasattr(e, 'response') and e.response is not None:
+            print(f"Status Code: {e.response.status_code}")
+            print("Error Response:", e.response.text)
+
+
 def test_without_audio_file():
     """
     Alternative test without audio file - just test the API connectivity
@@ -89,8 +121,9 @@ if __name__ == "__main__":
     print(f"API URL: {PROD_API_URL}")
     print("-" * 50)
 
-    # Run the main test
+    # Run the main tests
     test_feedback_api_prod()
+    test_feedback_api_prod_streaming()
 
     print("\n" + "=" * 50)
 
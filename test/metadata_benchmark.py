@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Before/after benchmark for serving freesound_url from the catalog side table.
+
+Sends the same sampled embeddings straight to the Pinecone index host, once
+with `includeMetadata: true` (before: URLs come from Pinecone) and once with
+`includeMetadata: false` (after: api/search.js resolves URLs locally),
+interleaved so both modes see the same network conditions. Reports latency
+percentiles and response sizes per mode and writes a JSON result file.
+
+    PINECONE_API_KEY=... python metadata_benchmark.py --host https://<index-host> --queries 300
+
+The local lookup that replaces the metadata costs one array access per match
+(api/utils/catalog.js); end to end, compare search_benchmark.py runs with
+SEARCH_URLS_FROM_CATALOG=false and the default.
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import argparse
+
+import numpy as np
+import requests
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "db_manager"))
+from embedding_store import PackedEmbeddings  # noqa: E402
+from projection import load_projection  # noqa: E402
+from search_benchmark import PACKED_DIR, RESULTS_DIR, REQUEST_TIMEOUT_SECONDS, percentiles  # noqa: E402
+
+# --- Configuration ---
+TOP_K_MATCHES = 4
+MODES = {"metadata": True, "catalog": False}
+
+
+def sample_queries(args):
+    store = PackedEmbeddings(args.packed)
+    rows = random.Random(args.seed).sample(range(len(store)), min(args.queries, len(store)))
+    vectors = np.asarray([store.vector(row) for row in rows], dtype=np.float32)
+    if args.projection:
+        vectors = load_projection(args.projection).apply(vectors)
+    return vectors
+
+
+def timed_query(session, url, vector, top_k, include_metadata):
+    body = {"topK": top_k, "vector": vector.tolist(), "includeMetadata": include_metadata}
+    started = time.perf_counter()
+    response = session.post(url, json=body, timeout=REQUEST_TIMEOUT_SECONDS)
+    latency_ms = (time.perf_counter() - started) * 1000
+    response.raise_for_status()
+    return latency_ms, len(response.content)
+
+
+def run(args, vectors):
+    url = f"{args.host.rstrip('/')}/query"
+    session = requests.Session()
+    session.headers.update({"Api-Key": args.api_key, "Content-Type": "application/json"})
+
+    # Open the connection and let the index warm up before measuring
+    for vector in vectors[:args.warmup]:
+        timed_query(session, url, vector, args.top_k, True)
+
+    latencies = {mode: [] for mode in MODES}
+    sizes = {mode: [] for mode in MODES}
+    for i, vector in enumerate(vectors):
+        # Alternate which mode goes first so neither always gets the warmer cache
+        order = list(MODES) if i % 2 == 0 else list(reversed(MODES))
+        for mode in order:
+            latency_ms, size = timed_query(session, url, vector, args.top_k, MODES[mode])
+            latencies[mode].append(latency_ms)
+            sizes[mode].append(size)
+
+    return {
+        mode: {**percentiles(latencies[mode]), "mean_response_bytes": float(np.mean(sizes[mode]))}
+        for mode in MODES
+    }
+
+
+def print_summary(summary):
+    before, after = summary["metadata"], summary["catalog"]
+    print(f"\n{'':<22}{'p50':>8}{'p95':>8}{'p99':>8}{'bytes':>9}")
+    for label, stats in (("with metadata", before), ("catalog side table", after)):
+        print(f"{label:<22}{stats['p50']:>8.1f}{stats['p95']:>8.1f}{stats['p99']:>8.1f}"
+              f"{stats['mean_response_bytes']:>9.0f}")
+    print(f"p50 change: {after['p50'] - before['p50']:+.1f} ms, response size "
+          f"{100 * (1 - after['mean_response_bytes'] / before['mean_response_bytes']):.0f}% smaller")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare Pinecone query latency with and without metadata.")
+    parser.add_argument("--host", default=os.getenv("PINECONE_INDEX_HOST"), help="Index host (default: PINECONE_INDEX_HOST).")
+    parser.add_argument("--queries", type=int, default=200, help="Number of sampled embeddings.")
+    parser.add_argument("--warmup", type=int, default=10, help="Unmeasured queries sent first.")
+    parser.add_argument("--top-k", type=int, default=TOP_K_MATCHES)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--packed", default=PACKED_DIR)
+    parser.add_argument("--projection", help="Projection artifact, for indexes that store reduced vectors.")
+    parser.add_argument("--output", help="Result file (default: ../data/bench/metadata-<timestamp>.json).")
+    args = parser.parse_args()
+    args.api_key = os.getenv("PINECONE_API_KEY")
+    if not args.host or not args.api_key:
+        parser.error("Set PINECONE_API_KEY and --host (or PINECONE_INDEX_HOST).")
+    if not args.host.startswith(("http://", "https://")):
+        args.host = f"https://{args.host}"
+
+    vectors = sample_queries(args)
+    print(f"Benchmarking {args.host} with {len(vectors)} queries per mode...")
+    summary = run(args, vectors)
+    print_summary(summary)
+
+    output = args.output or os.path.join(RESULTS_DIR, f"metadata-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    config = {k: v for k, v in vars(args).items() if k not in ("output", "api_key")}
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump({"config": config, "summary": summary}, f, indent=2)
+    print(f"\nResults written to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,285 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the Pinecone data plane, for hermetic load testing.
+
+Implements the endpoints this repo uses (/query, /vectors/upsert,
+/vectors/delete, /vectors/fetch, /vectors/list, /describe_index_stats) on top
+of an in-memory vector matrix, with optional injected latency and errors.
+Point PINECONE_INDEX_HOST (or the hosts in PINECONE_DEV_INDEXES_JSON) at it:
+
+    python pinecone_standin.py --port 5080 --latency-ms 20 --error-rate 0.01
+    PINECONE_INDEX_HOST=http://localhost:5080 PINECONE_API_KEY=local vercel dev
+    PINECONE_STANDIN_HOST=http://localhost:5080 PINECONE_API_KEY=local python ../db_manager/reconcile.py
+
+Run one process per port to stand in for several dev-mode indexes.
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "db_manager"))
+from embedding_store import PackedEmbeddings  # noqa: E402
+from local_search import normalize_rows, top_k_blocked  # noqa: E402
+
+PACKED_DIR = "../data/embeddings_packed"
+DEFAULT_PORT = 5080
+
+
+class VectorTable:
+    """
+    In-memory vectors with an id -> row map. Deletes move the last row into
+    the freed slot, so the matrix stays dense and queries stay one matmul.
+    """
+
+    def __init__(self, dimension):
+        self.dimension = dimension
+        self.lock = threading.Lock()
+        self.ids = []
+        self.rows = {}
+        self.metadata = []
+        self.values = np.zeros((0, dimension), dtype=np.float32)
+        self.normalized = np.zeros((0, dimension), dtype=np.float32)
+        self.size = 0
+
+    def _reserve(self, extra):
+        needed = self.size + extra
+        if needed <= self.values.shape[0]:
+            return
+        capacity = max(needed, 2 * self.values.shape[0], 1024)
+        for name in ("values", "normalized"):
+            grown = np.zeros((capacity, self.dimension), dtype=np.float32)
+            grown[:self.size] = getattr(self, name)[:self.size]
+            setattr(self, name, grown)
+
+    def upsert(self, vectors):
+        with self.lock:
+            self._reserve(len(vectors))
+            for vector in vectors:
+                values = np.asarray(vector["values"], dtype=np.float32)
+                if values.shape != (self.dimension,):
+                    raise ValueError(
+                        f"Vector dimension {values.shape[-1]} does not match the index dimension {self.dimension}"
+                    )
+                row = self.rows.get(vector["id"])
+                if row is None:
+                    row = self.size
+                    self.size += 1
+                    self.rows[vector["id"]] = row
+                    self.ids.append(vector["id"])
+                    self.metadata.append(None)
+                self.values[row] = values
+                self.normalized[row] = normalize_rows(values)
+                self.metadata[row] = vector.get("metadata")
+            return len(vectors)
+
+    def delete(self, ids=None, delete_all=False):
+        with self.lock:
+            if delete_all:
+                self.ids, self.rows, self.metadata, self.size = [], {}, [], 0
+                return
+            for vector_id in ids or []:
+                row = self.rows.pop(vector_id, None)
+                if row is None:
+                    continue
+                last = self.size - 1
+                if row != last:
+                    moved_id = self.ids[last]
+                    self.values[row] = self.values[last]
+                    self.normalized[row] = self.normalized[last]
+                    self.metadata[row] = self.metadata[last]
+                    self.ids[row] = moved_id
+                    self.rows[moved_id] = row
+                self.ids.pop()
+                self.metadata.pop()
+                self.size -= 1
+
+    def entry(self, row, include_values=True, include_metadata=True):
+        entry = {"id": self.ids[row]}
+        if include_values:
+            entry["values"] = self.values[row].tolist()
+        if include_metadata and self.metadata[row] is not None:
+            entry["metadata"] = self.metadata[row]
+        return entry
+
+    def query(self, vector, top_k, include_values=False, include_metadata=False):
+        with self.lock:
+            if not self.size:
+                return []
+            query = normalize_rows(np.asarray(vector, dtype=np.float32)[None, :])
+            rows, scores = top_k_blocked(query, self.normalized[:self.size], top_k)
+            matches = []
+            for row, score in zip(rows[0], scores[0]):
+                match = self.entry(int(row), include_values, include_metadata)
+                match["score"] = float(score)
+                matches.append(match)
+            return matches
+
+    def fetch(self, ids):
+        with self.lock:
+            return {i: self.entry(self.rows[i]) for i in ids if i in self.rows}
+
+    def list_ids(self, prefix, limit, token):
+        with self.lock:
+            ids = sorted(i for i in self.ids if i.startswith(prefix or ""))
+        start = int(token or 0)
+        page = ids[start:start + limit]
+        next_token = str(start + limit) if start + limit < len(ids) else None
+        return page, next_token
+
+
+class StandinHandler(BaseHTTPRequestHandler):
+    # Keep-alive like the real service, so connection pooling can be measured
+    protocol_version = "HTTP/1.1"
+    # Headers and body go out as separate writes; without this, reused connections stall on delayed ACKs
+    disable_nagle_algorithm = True
+    table = None
+    latency_ms = 0.0
+    latency_jitter_ms = 0.0
+    error_rate = 0.0
+    error_statuses = (503,)
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, body):
+        payload = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _inject_faults(self):
+        """
+        Sleeps for the configured latency and returns an error status to send
+        instead of a real answer, or None.
+        """
+        delay = self.latency_ms + random.uniform(-self.latency_jitter_ms, self.latency_jitter_ms)
+        if delay > 0:
+            time.sleep(delay / 1000)
+        if self.error_rate and random.random() < self.error_rate:
+            return random.choice(self.error_statuses)
+        return None
+
+    def _read_json(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        return json.loads(self.rfile.read(length) or b"{}")
+
+    def _stats(self):
+        count = self.table.size
+        return {
+            "namespaces": {"": {"vectorCount": count}} if count else {},
+            "dimension": self.table.dimension,
+            "indexFullness": 0.0,
+            "totalVectorCount": count,
+        }
+
+    def do_GET(self):
+        error_status = self._inject_faults()
+        if error_status:
+            return self._send(error_status, {"code": error_status, "message": "Injected error"})
+
+        url = urlparse(self.path)
+        params = parse_qs(url.query)
+        if url.path == "/vectors/fetch":
+            return self._send(200, {"vectors": self.table.fetch(params.get("ids", [])), "namespace": ""})
+        if url.path == "/vectors/list":
+            limit = int(params.get("limit", ["100"])[0])
+            ids, next_token = self.table.list_ids(
+                params.get("prefix", [""])[0], limit, params.get("paginationToken", [None])[0]
+            )
+            body = {"vectors": [{"id": i} for i in ids], "namespace": ""}
+            if next_token:
+                body["pagination"] = {"next": next_token}
+            return self._send(200, body)
+        if url.path == "/describe_index_stats":
+            return self._send(200, self._stats())
+        return self._send(404, {"message": f"Unknown path {url.path}"})
+
+    def do_POST(self):
+        error_status = self._inject_faults()
+        if error_status:
+            return self._send(error_status, {"code": error_status, "message": "Injected error"})
+
+        path = urlparse(self.path).path
+        try:
+            body = self._read_json()
+            if path == "/query":
+                if "vector" not in body and "id" in body:
+                    fetched = self.table.fetch([body["id"]])
+                    if not fetched:
+                        return self._send(200, {"matches": [], "namespace": ""})
+                    body["vector"] = fetched[body["id"]]["values"]
+                matches = self.table.query(
+                    body["vector"], int(body.get("topK", 10)),
+                    include_values=bool(body.get("includeValues")),
+                    include_metadata=bool(body.get("includeMetadata")),
+                )
+                return self._send(200, {"matches": matches, "namespace": ""})
+            if path == "/vectors/upsert":
+                return self._send(200, {"upsertedCount": self.table.upsert(body.get("vectors", []))})
+            if path == "/vectors/delete":
+                self.table.delete(body.get("ids"), bool(body.get("deleteAll")))
+                return self._send(200, {})
+            if path == "/describe_index_stats":
+                return self._send(200, self._stats())
+        except (KeyError, TypeError, ValueError) as e:
+            return self._send(400, {"code": 3, "message": str(e)})
+        return self._send(404, {"message": f"Unknown path {path}"})
+
+
+def load_table(packed_dir, dimension):
+    """
+    Seeds the table from the packed store when it exists, otherwise starts empty.
+    """
+    if packed_dir and os.path.exists(packed_dir):
+        store = PackedEmbeddings(packed_dir)
+        table = VectorTable(store.dim)
+        table.values = np.array(store.vectors, dtype=np.float32)
+        table.normalized = normalize_rows(table.values)
+        table.ids = [store.id(i) for i in range(len(store))]
+        table.rows = {vector_id: i for i, vector_id in enumerate(table.ids)}
+        table.metadata = [{"freesound_url": store.url(i)} for i in range(len(store))]
+        table.size = len(store)
+        print(f"Loaded {len(store)} vectors from {packed_dir}.")
+        return table
+    print(f"Starting with an empty index of dimension {dimension}.")
+    return VectorTable(dimension)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local Pinecone data-plane stand-in.")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--packed", default=PACKED_DIR, help="Packed store to seed the index with.")
+    parser.add_argument("--dimension", type=int, default=960, help="Dimension when starting empty.")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Injected latency per request.")
+    parser.add_argument("--latency-jitter-ms", type=float, default=0.0, help="Uniform +/- jitter on the latency.")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with an error.")
+    parser.add_argument("--error-statuses", default="503", help="Comma-separated statuses to inject, e.g. 429,503.")
+    args = parser.parse_args()
+
+    StandinHandler.table = load_table(args.packed, args.dimension)
+    StandinHandler.latency_ms = args.latency_ms
+    StandinHandler.latency_jitter_ms = args.latency_jitter_ms
+    StandinHandler.error_rate = args.error_rate
+    StandinHandler.error_statuses = tuple(int(s) for s in args.error_statuses.split(",") if s.strip())
+
+    server = ThreadingHTTPServer(("127.0.0.1", args.port), StandinHandler)
+    print(f"Pinecone stand-in listening on http://localhost:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\nStopped.")
+
+
+if __name__ == "__main__":
+    main()
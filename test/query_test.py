@@ -1,31 +1,35 @@
 import os
+import sys
 import json
 import requests
 import random
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "db_manager"))
+from embedding_store import PackedEmbeddings  # noqa: E402
+from search_client import embedding_payload  # noqa: E402
+
 # --- Configuration ---
 VERCEL_API_URL = "http://localhost:3000/api/search"
-JSON_FILE = "../data/embeddings.json"
+PACKED_DIR = "../data/embeddings_packed"
 
 
 def test_api_query():
     """
-    Loads a random embedding from the JSON file, sends it as a query to the
+    Loads a random embedding from the packed store, sends it as a query to the
     Vercel API, and prints the search results.
     """
-    if not os.path.exists(JSON_FILE):
-        print(f"Error: {JSON_FILE} not found. Please create it first.")
+    if not os.path.exists(PACKED_DIR):
+        print(f"Error: {PACKED_DIR} not found. Please create it first (db_manager/upload.py).")
         return
 
-    print(f"Loading query data from {JSON_FILE}...")
-    with open(JSON_FILE, "r", encoding="utf-8") as f:
-        all_data = json.load(f)
+    print(f"Loading query data from {PACKED_DIR}...")
+    store = PackedEmbeddings(PACKED_DIR)
 
-    if not all_data:
-        print("Error: The JSON file is empty.")
+    if not len(store):
+        print("Error: The packed store is empty.")
         return
 
-    query_item = random.choice(all_data)
+    query_item = store[random.randrange(len(store))]
     query_vector = query_item['embedding']
 
     print("-" * 50)
@@ -34,7 +38,8 @@ def test_api_query():
     print(f"  Freesound URL: {query_item.get('freesound_url', 'N/A')}")
     print("-" * 50)
 
-    payload = {"embedding": query_vector}
+    # Compact transport: base64 little-endian float32 instead of a JSON number array
+    payload = embedding_payload(query_vector)
 
     print(f"Sending query to {VERCEL_API_URL}...")
     try:
@@ -1,34 +1,38 @@
 import os
+import sys
 import json
 import requests
 import random
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "db_manager"))
+from embedding_store import PackedEmbeddings  # noqa: E402
+from search_client import embedding_payload  # noqa: E402
+
 # --- Configuration ---
 # This is the real, deployed production URL for your Vercel API
 VERCEL_API_URL = "https://imitune-backend-qugw2srzk-chris-projects-3c0d9932.vercel.app/api/search"
-JSON_FILE = "../data/embeddings.json"
+PACKED_DIR = "../data/embeddings_packed"
 
 
 def test_production_api_query():
     """
-    Loads a random embedding from the local JSON file, sends it as a query
+    Loads a random embedding from the local packed store, sends it as a query
     to the DEPLOYED Vercel API, and prints the search results.
     """
-    # 1. Check if the JSON file exists
-    if not os.path.exists(JSON_FILE):
-        print(f"Error: {JSON_FILE} not found. Please create it first.")
+    # 1. Check if the packed store exists
+    if not os.path.exists(PACKED_DIR):
+        print(f"Error: {PACKED_DIR} not found. Please create it first (db_manager/upload.py).")
         return
 
-    # 2. Load the data and select a random item to use as the query
-    print(f"Loading query data from {JSON_FILE}...")
-    with open(JSON_FILE, "r", encoding="utf-8") as f:
-        all_data = json.load(f)
+    # 2. Open the store and select a random item to use as the query
+    print(f"Loading query data from {PACKED_DIR}...")
+    store = PackedEmbeddings(PACKED_DIR)
 
-    if not all_data:
-        print("Error: The JSON file is empty.")
+    if not len(store):
+        print("Error: The packed store is empty.")
         return
 
-    query_item = random.choice(all_data)
+    query_item = store[random.randrange(len(store))]
     query_vector = query_item['embedding']
 
     print("-" * 50)
@@ -38,7 +42,8 @@ def test_production_api_query():
     print("-" * 50)
 
     # 3. Prepare the request payload
-    payload = {"embedding": query_vector}
+    # Compact transport: base64 little-endian float32 instead of a JSON number array
+    payload = embedding_payload(query_vector)
 
     # 4. Send the POST request to the Vercel API
     print(f"Sending query to production URL: {VERCEL_API_URL}...")
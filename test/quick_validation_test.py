@@ -6,9 +6,13 @@ without requiring actual Pinecone or Blob storage credentials.
 
 import base64
 import json
+import struct
 
 import requests
 
+from feedback_client import stream_feedback
+from search_client import binary_request
+
 BASE_URL = "http://localhost:3000"
 SEARCH_URL = f"{BASE_URL}/api/search"
 FEEDBACK_URL = f"{BASE_URL}/api/feedback"
@@ -55,6 +59,40 @@ try:
 except Exception as e:
     print(f"Error: {e}")
 
+# Test 2b: Compact (base64 float32) embedding containing NaN
+print("\n🔍 Test 2b: Base64 float32 embedding with a NaN value")
+print("Sending 512 packed float32 values, one of them NaN (should reject)...")
+try:
+    packed = struct.pack("<512f", *([0.1] * 511 + [float("nan")]))
+    response = requests.post(
+        SEARCH_URL,
+        json={"embedding": base64.b64encode(packed).decode("ascii"), "dtype": "float32"},
+        timeout=5,
+    )
+    print(f"Status: {response.status_code}")
+    print(f"Response: {json.dumps(response.json(), indent=2)}")
+    if response.status_code == 400 and "invalid values" in response.json().get("error", ""):
+        print("✅ PASS: Non-finite value correctly rejected!")
+    else:
+        print("❌ FAIL: Should have been rejected")
+except Exception as e:
+    print(f"Error: {e}")
+
+# Test 2c: Raw application/octet-stream (float16) embedding containing NaN
+print("\n🔍 Test 2c: Binary float16 embedding with a NaN value")
+print("Sending 512 raw float16 values, one of them NaN (should reject)...")
+try:
+    data, headers = binary_request([0.1] * 511 + [float("nan")], dtype="float16")
+    response = requests.post(SEARCH_URL, data=data, headers=headers, timeout=5)
+    print(f"Status: {response.status_code}")
+    print(f"Response: {json.dumps(response.json(), indent=2)}")
+    if response.status_code == 400 and "invalid values" in response.json().get("error", ""):
+        print("✅ PASS: Binary body decoded and non-finite value correctly rejected!")
+    else:
+        print("❌ FAIL: Should have been rejected")
+except Exception as e:
+    print(f"Error: {e}")
+
 # Test 3: Invalid MIME type
 print("\n🔍 Test 3: Audio with invalid MIME type")
 print("Sending video/mp4 instead of audio (should reject)...")
@@ -144,13 +182,52 @@ try:
 except Exception as e:
     print(f"Error: {e}")
 
+# Test 6: Streaming upload with invalid MIME type
+print("\n🔍 Test 6: Streaming upload with invalid MIME type")
+print("Streaming video/mp4 instead of audio (should reject)...")
+try:
+    response = stream_feedback(
+        requests, FEEDBACK_URL, b"\x00" * 1024, "video/mp4", timeout=5,
+        freesound_urls=[None, None, None], ratings=[None, None, None],
+    )
+    print(f"Status: {response.status_code}")
+    print(f"Response: {json.dumps(response.json(), indent=2)}")
+    if (
+        response.status_code == 400
+        and "Unsupported audio format" in response.json().get("error", "")
+    ):
+        print("✅ PASS: Invalid MIME type correctly rejected!")
+    else:
+        print("❌ FAIL: Should have been rejected")
+except Exception as e:
+    print(f"Error: {e}")
+
+# Test 7: Oversized streaming upload
+print("\n🔍 Test 7: Oversized streaming upload")
+print("Streaming 12MB without Content-Length (should reject mid-stream)...")
+try:
+    response = stream_feedback(
+        requests, FEEDBACK_URL, (b"\x00" * 65536 for _ in range(192)), "audio/webm", timeout=30,
+        freesound_urls=[None, None, None], ratings=[None, None, None],
+    )
+    print(f"Status: {response.status_code}")
+    print(f"Response: {json.dumps(response.json(), indent=2)}")
+    if response.status_code == 413:
+        print("✅ PASS: Oversized stream correctly rejected!")
+    else:
+        print("❌ FAIL: Should have been rejected with 413")
+except Exception as e:
+    print(f"Error: {e}")
+
 print("\n" + "=" * 60)
 print("  TEST SUMMARY")
 print("=" * 60)
 print("\nKey things to verify:")
 print("✅ Invalid embedding sizes are rejected (Test 1)")
+print("✅ Non-finite values in compact and binary embeddings are rejected (Tests 2b, 2c)")
 print("✅ Invalid MIME types are rejected (Test 3)")
 print("✅ Oversized files are rejected (Test 4)")
+print("✅ Streaming uploads check MIME type and size while streaming (Tests 6, 7)")
 print("✅ Valid inputs pass validation (Tests 2, 5)")
 print("\nNote: Pinecone/Blob errors AFTER validation are expected!")
 print("=" * 60 + "\n")
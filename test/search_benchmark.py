@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+"""
+Load generator and latency benchmark for /api/search.
+
+Replays embeddings sampled from the packed store, either open-loop at a
+target request rate (--rps) or closed-loop with a fixed number of concurrent
+clients (--concurrency), and reports latency percentiles, throughput and a
+status breakdown. In dev mode it also reports per-index latency from the
+`latencyMs` field of each row. Results are written as JSON so runs can be
+compared across deploys with --compare.
+
+    python search_benchmark.py --rps 20 --duration 30
+    python search_benchmark.py --concurrency 8 --requests 500 --dev --compare ../data/bench/previous.json
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+from collections import Counter, defaultdict
+
+import aiohttp
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "db_manager"))
+from embedding_store import PackedEmbeddings  # noqa: E402
+from search_client import DTYPES, embedding_payload  # noqa: E402
+
+# --- Configuration ---
+DEFAULT_URL = "http://localhost:3000/api/search"
+DEFAULT_ORIGIN = "http://localhost:3000"
+PACKED_DIR = "../data/embeddings_packed"
+RESULTS_DIR = "../data/bench"
+REQUEST_TIMEOUT_SECONDS = 20
+
+
+def percentiles(values):
+    if not values:
+        return {"p50": None, "p95": None, "p99": None, "mean": None, "max": None}
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return {
+        "p50": float(p50), "p95": float(p95), "p99": float(p99),
+        "mean": float(np.mean(values)), "max": float(np.max(values)),
+    }
+
+
+class Recorder:
+    """
+    Collects per-request outcomes while the benchmark runs.
+    """
+
+    def __init__(self):
+        self.latencies_ms = []
+        self.statuses = Counter()
+        self.index_latencies_ms = defaultdict(list)
+        self.index_errors = Counter()
+        self.connections = Counter()
+
+    def record(self, status, latency_ms, body=None, connection=None):
+        self.statuses[status] += 1
+        if connection:
+            self.connections[connection] += 1
+        if status == 200:
+            self.latencies_ms.append(latency_ms)
+        for row in (body or {}).get("rows", []):
+            if row.get("error"):
+                self.index_errors[row["indexId"]] += 1
+            elif row.get("latencyMs") is not None:
+                self.index_latencies_ms[row["indexId"]].append(row["latencyMs"])
+
+    def summary(self, elapsed_seconds):
+        total = sum(self.statuses.values())
+        ok = self.statuses.get(200, 0)
+        return {
+            "requests": total,
+            "elapsed_seconds": elapsed_seconds,
+            "throughput_rps": total / elapsed_seconds if elapsed_seconds else 0.0,
+            "success_rps": ok / elapsed_seconds if elapsed_seconds else 0.0,
+            "latency_ms": percentiles(self.latencies_ms),
+            "statuses": {str(k): v for k, v in sorted(self.statuses.items(), key=lambda kv: str(kv[0]))},
+            "rate_limited": self.statuses.get(429, 0),
+            "error_rate": (total - ok) / total if total else 0.0,
+            "pinecone_connections": dict(self.connections),
+            "per_index": {
+                index_id: {**percentiles(self.index_latencies_ms.get(index_id, [])),
+                           "errors": self.index_errors.get(index_id, 0)}
+                for index_id in sorted(set(self.index_latencies_ms) | set(self.index_errors))
+            },
+        }
+
+
+async def send_query(session, url, payload, recorder):
+    started = time.perf_counter()
+    connection = None
+    try:
+        async with session.post(url, json=payload) as response:
+            connection = response.headers.get("X-Pinecone-Connection")
+            body = await response.json(content_type=None)
+            status = response.status
+    except asyncio.TimeoutError:
+        body, status = None, "timeout"
+    except aiohttp.ClientError as e:
+        body, status = None, f"client_error:{type(e).__name__}"
+    except json.JSONDecodeError:
+        body, status = None, "invalid_json"
+    recorder.record(status, (time.perf_counter() - started) * 1000,
+                    body if isinstance(body, dict) else None, connection)
+
+
+async def run_open_loop(session, url, payloads, recorder, rps, total):
+    """
+    Sends requests on a fixed schedule regardless of how fast answers come back,
+    so queueing delay shows up in the latency numbers.
+    """
+    started = time.perf_counter()
+    tasks = []
+    for i in range(total):
+        delay = started + i / rps - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        tasks.append(asyncio.create_task(send_query(session, url, payloads[i % len(payloads)], recorder)))
+    await asyncio.gather(*tasks)
+
+
+async def run_closed_loop(session, url, payloads, recorder, concurrency, total):
+    """
+    Runs `concurrency` clients that each send the next request as soon as the
+    previous one finishes.
+    """
+    counter = iter(range(total))
+
+    async def client():
+        for i in counter:
+            await send_query(session, url, payloads[i % len(payloads)], recorder)
+
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+
+
+async def run_benchmark(args, payloads):
+    recorder = Recorder()
+    connector = aiohttp.TCPConnector(limit=args.connections)
+    timeout = aiohttp.ClientTimeout(total=REQUEST_TIMEOUT_SECONDS)
+    headers = {"Origin": args.origin}
+    async with aiohttp.ClientSession(connector=connector, timeout=timeout, headers=headers) as session:
+        started = time.perf_counter()
+        if args.rps:
+            total = args.requests or int(args.rps * args.duration)
+            await run_open_loop(session, args.url, payloads, recorder, args.rps, total)
+        else:
+            total = args.requests or args.concurrency * 50
+            await run_closed_loop(session, args.url, payloads, recorder, args.concurrency, total)
+        elapsed = time.perf_counter() - started
+    return recorder.summary(elapsed)
+
+
+def build_payloads(args):
+    store = PackedEmbeddings(args.packed)
+    rows = random.Random(args.seed).sample(range(len(store)), min(args.sample, len(store)))
+    payloads = []
+    for row in rows:
+        vector = np.asarray(store.vector(row), dtype=np.float32)
+        if args.dtype == "json":
+            payload = {"embedding": vector.tolist()}
+        else:
+            payload = embedding_payload(vector, args.dtype)
+        if args.dev:
+            payload["mode"] = "dev"
+        payloads.append(payload)
+    return payloads
+
+
+def print_summary(summary, baseline=None):
+    latency = summary["latency_ms"]
+    print(f"\nRequests: {summary['requests']} in {summary['elapsed_seconds']:.1f}s "
+          f"({summary['throughput_rps']:.1f} req/s, {summary['success_rps']:.1f} ok/s)")
+    print(f"Statuses: {summary['statuses']}  (error rate {100 * summary['error_rate']:.1f}%)")
+    if latency["p50"] is not None:
+        line = f"Latency ms: p50 {latency['p50']:.1f}  p95 {latency['p95']:.1f}  p99 {latency['p99']:.1f}"
+        if baseline and baseline["latency_ms"]["p50"] is not None:
+            base = baseline["latency_ms"]
+            line += (f"   (baseline p50 {base['p50']:.1f}  p95 {base['p95']:.1f}  p99 {base['p99']:.1f})")
+        print(line)
+    if summary.get("pinecone_connections"):
+        print(f"Pinecone connections: {summary['pinecone_connections']}")
+    for index_id, stats in summary["per_index"].items():
+        if stats["p50"] is None:
+            print(f"  [{index_id}] no successful queries, errors {stats['errors']}")
+            continue
+        print(f"  [{index_id}] p50 {stats['p50']:.1f}  p95 {stats['p95']:.1f}  p99 {stats['p99']:.1f}  "
+              f"errors {stats['errors']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark /api/search latency and throughput.")
+    parser.add_argument("--url", default=DEFAULT_URL)
+    parser.add_argument("--origin", default=DEFAULT_ORIGIN, help="Origin header (must be allowed by CORS).")
+    parser.add_argument("--rps", type=float, help="Open-loop target request rate.")
+    parser.add_argument("--concurrency", type=int, default=4, help="Closed-loop clients when --rps is not set.")
+    parser.add_argument("--duration", type=float, default=30, help="Seconds to run in --rps mode.")
+    parser.add_argument("--requests", type=int, help="Total number of requests (overrides --duration).")
+    parser.add_argument("--connections", type=int, default=32, help="HTTP connection pool size.")
+    parser.add_argument("--sample", type=int, default=200, help="Number of embeddings sampled from the dataset.")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--dev", action="store_true", help="Send dev multi-index requests.")
+    parser.add_argument("--dtype", choices=["json", *DTYPES], default="float32",
+                        help="Embedding transport: JSON number array or base64 float32/float16.")
+    parser.add_argument("--packed", default=PACKED_DIR)
+    parser.add_argument("--output", help="Result file (default: ../data/bench/search-<timestamp>.json).")
+    parser.add_argument("--compare", help="Previous result file to compare against.")
+    args = parser.parse_args()
+
+    payloads = build_payloads(args)
+    mode = f"open loop at {args.rps} req/s" if args.rps else f"closed loop with {args.concurrency} clients"
+    print(f"Benchmarking {args.url} ({mode}, {len(payloads)} sampled embeddings)...")
+    started_at = time.time()
+    summary = asyncio.run(run_benchmark(args, payloads))
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)["summary"]
+    print_summary(summary, baseline)
+
+    output = args.output or os.path.join(RESULTS_DIR, f"search-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    config = {k: v for k, v in vars(args).items() if k not in ("output", "compare")}
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump({"config": config, "startedAt": started_at, "summary": summary}, f, indent=2)
+    print(f"\nResults written to {output}")
+
+
+if __name__ == "__main__":
+    main()
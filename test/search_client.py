@@ -0,0 +1,32 @@
+"""
+Helpers for sending embeddings to /api/search in the compact transport
+(base64 of little-endian float32/float16) instead of JSON number arrays.
+"""
+
+import base64
+
+import numpy as np
+
+DTYPES = {"float32": "<f4", "float16": "<f2"}
+
+
+def encode_embedding(vector, dtype="float32"):
+    """
+    Returns the base64 string of `vector` as little-endian `dtype` values.
+    """
+    return base64.b64encode(np.asarray(vector, dtype=DTYPES[dtype]).tobytes()).decode("ascii")
+
+
+def embedding_payload(vector, dtype="float32", **fields):
+    """
+    Request body for one embedding, e.g. embedding_payload(v, mode="dev").
+    """
+    return {"embedding": encode_embedding(vector, dtype), "dtype": dtype, **fields}
+
+
+def binary_request(vector, dtype="float32"):
+    """
+    (data, headers) for sending `vector` as a raw application/octet-stream body.
+    """
+    data = np.asarray(vector, dtype=DTYPES[dtype]).tobytes()
+    return data, {"Content-Type": "application/octet-stream", "X-Embedding-Dtype": dtype}